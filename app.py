@@ -2,8 +2,11 @@ import os, threading, asyncio, json
 from flask import Flask, render_template, request, jsonify, abort
 import jwt
 from datetime import datetime, timedelta
+from chatbot.config import ADMIN_USERS, MCP_HOST, MCP_PORT
 from chatbot.database import auth_user, init_db
-from chatbot.mcp.client_sse import InteractiveBankingAssistant
+from chatbot.mcp.client_sse import InteractiveBankingAssistant, TOOL_RESULTS
+from chatbot.mcp.session_pool import MCPSessionPool, sse_connector
+from chatbot.sessions import SessionManager
 
 # Initialize Flask app pointing to local templates/ and static/
 app = Flask(__name__, template_folder="templates", static_folder="static")
@@ -13,8 +16,17 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 
-# Instantiate & initialize the agent at startup
-assistant = InteractiveBankingAssistant()
+# The MCP session pool exists from the start, so chats arriving before it has connected wait for it
+pool = MCPSessionPool(sse_connector(f"http://{MCP_HOST}:{MCP_PORT}/sse"))
+
+# Instantiate & initialize the agent at startup, it starts the pool
+assistant = InteractiveBankingAssistant(pool=pool)
+
+# Each signed-in user gets their own assistant, sharing the pool
+def _new_assistant(user_id: str) -> InteractiveBankingAssistant:
+    return InteractiveBankingAssistant(user_id=user_id, session=pool, allow_user_switch=False)
+
+sessions = SessionManager(_new_assistant)
 
 # Spin up a dedicated loop in a background thread
 background_loop = asyncio.new_event_loop()
@@ -45,6 +57,17 @@ def verify_access_token(token: str) -> str:
     except jwt.InvalidTokenError:
         abort(401, "Invalid token")
 
+
+def require_admin() -> str:
+    """Authenticate the request and refuse it unless the user is one of ``ADMIN_USERS``."""
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        abort(401, "Missing token")
+    user = verify_access_token(auth_header.split(" ", 1)[1])
+    if user not in ADMIN_USERS:
+        abort(403, "Only operators can read this report")
+    return user
+
 # Routes
 @app.route("/", methods=["GET"])
 def index():
@@ -79,9 +102,9 @@ def chat():
     if not msg:
         return jsonify({"reply": "💡 I didn’t get any text."}), 400
 
-    # 5) Schedule your send_message onto the background loop
+    # 5) Schedule the message onto the background loop, in this user's session
     future = asyncio.run_coroutine_threadsafe(
-        assistant.send_message(msg),
+        sessions.send_message(user, msg),
         background_loop
     )
     try:
@@ -102,6 +125,16 @@ def chat():
     # Otherwise, just stringify the payload
     return jsonify({"reply": json.dumps(result, indent=2)})
 
+@app.route("/sessions/report", methods=["GET"])
+def sessions_report():
+    require_admin()
+    return jsonify(sessions.memory_report())
+
+@app.route("/mcp/metrics", methods=["GET"])
+def mcp_metrics():
+    require_admin()
+    return jsonify({**pool.metrics(), "tool_cache": TOOL_RESULTS.stats()})
+
 if __name__ == "__main__":
     init_db()
     # Turn off the reloader
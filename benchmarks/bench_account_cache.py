@@ -0,0 +1,107 @@
+"""Balance and account-list lookups with and without the per-user account cache.
+
+Replays a mix of balance lookups, account listings, target listings and transfers
+for a few users, first straight against the database and then through
+``chatbot.account``, and prints the cache's own stats.  Then runs rounds of concurrent
+transfers from threads and checks the cached balances against the database after each.
+
+Usage: python benchmarks/bench_account_cache.py [operations]
+"""
+import contextlib
+import io
+import random
+import sys
+import threading
+
+from common import use_temp_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.account import (
+    account_cache, list_accounts, get_account, list_transfer_target_accounts,
+    transfer_between_accounts, account_cache_stats
+)
+from chatbot.database import (
+    init_db, load_account, load_accounts, load_transfer_target_accounts, transfer_fund_between_accounts
+)
+
+USERS = {
+    "test1": ["1234567890", "2345678901", "3456789012"],
+    "test2": ["4567890123", "5678901234", "6789012345"],
+    "test3": ["7890123456", "8901234567", "9012345678"],
+}
+
+
+def uncached_balance(user_id, account_number):
+    """The previous get_account_balance: load every account and scan for the one asked for."""
+    for account in load_accounts(user_id):
+        if account.account_number == account_number:
+            return account
+
+
+def workload(balance, accounts, targets, transfer, operations):
+    rng = random.Random(3)
+
+    def step():
+        user_id = rng.choice(list(USERS))
+        numbers = USERS[user_id]
+        roll = rng.random()
+        if roll < 0.6:
+            balance(user_id, rng.choice(numbers))
+        elif roll < 0.8:
+            accounts(user_id)
+        elif roll < 0.95:
+            targets(user_id, numbers[0])
+        else:
+            transfer(user_id, numbers[0], numbers[1], "0.01")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return summarize(time_calls(step, operations))
+
+
+def concurrent_transfers(rounds: int, threads: int) -> int:
+    """Count the rounds after which the cache held a balance the database no longer has."""
+    user_id, (first, second, _) = "test1", USERS["test1"]
+    stale_rounds = 0
+    for _ in range(rounds):
+        list_accounts(user_id)
+        barrier = threading.Barrier(threads)
+
+        def transfer(n):
+            barrier.wait()
+            source, target = (first, second) if n % 2 else (second, first)
+            transfer_between_accounts(user_id, source, target, f"0.{n + 1:02d}")
+
+        workers = [threading.Thread(target=transfer, args=(n,)) for n in range(threads)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        stale_rounds += any(get_account(user_id, number).balance_cents != load_account(user_id, number).balance_cents
+                            for number in (first, second))
+    return stale_rounds
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    init_db()
+    results = {
+        "database only": workload(uncached_balance, load_accounts, load_transfer_target_accounts,
+                                  transfer_fund_between_accounts, operations),
+        "account cache": workload(get_account, list_accounts, list_transfer_target_accounts,
+                                  transfer_between_accounts, operations),
+    }
+    print_table(f"Mixed account workload ({operations} operations, 5% transfers)", results)
+    print("\nCache stats:", account_cache_stats())
+
+    # Entries must outlive the rounds, or expiry would hide a stale balance
+    account_cache.ttl = 3600
+    stale_rounds = concurrent_transfers(30, 16)
+    print(f"\n30 rounds of 16 concurrent transfers: {stale_rounds} ended with a stale cached balance")
+    if stale_rounds:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Load and serialize 100k accounts: the previous dict-backed model built from
+sqlite3.Row against the slotted model built by ``account_row_factory``.  Serializing
+means producing the JSON a tool result is sent as.
+
+Usage: python benchmarks/bench_account_model.py [accounts]
+"""
+import json
+import sqlite3
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+from common import use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, load_accounts
+
+SQL = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
+
+
+class LegacyAccount:
+    """The model as it was: a dict-backed instance filled in attribute by attribute."""
+
+    def __init__(self):
+        self.account_number = ""
+        self.account_name = ""
+        self.balance = Decimal("0")
+
+
+def legacy_load(user_id):
+    con = sqlite3.connect(DB_FILE)
+    con.row_factory = sqlite3.Row
+    rows = con.execute(SQL, {"user_id": user_id}).fetchall()
+    accounts = []
+    for row in rows:
+        account = LegacyAccount()
+        account.account_number = row['AccountNumber']
+        account.account_name = row['AccountName']
+        account.balance = Decimal(str(row['Balance']))
+        accounts.append(account)
+    con.close()
+    return accounts
+
+
+def measure(func):
+    """Run ``func`` and return (milliseconds, KiB still held by its result, result)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, held / 1024, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    init_db()
+    con = sqlite3.connect(DB_FILE)
+    con.executemany("INSERT INTO Accounts VALUES (?, 'bulk', ?, ?, 'CAD')",
+                    ((f"B{n:09d}", "Chequing" if n % 2 else "Saving", n * 137) for n in range(count)))
+    con.commit()
+    con.close()
+
+    # Warm the page cache and the connection pool
+    legacy_load("bulk")
+    load_accounts("bulk")
+
+    print(f"\n{count} accounts{'load ms':>14}{'held KiB':>12}{'serialize ms':>16}{'total ms':>12}")
+    for label, load, serialize in (
+        ("legacy", legacy_load, lambda accounts: json.dumps([a.__dict__ for a in accounts], default=str)),
+        ("slotted", load_accounts, lambda accounts: json.dumps([a.to_dict() for a in accounts])),
+    ):
+        load_ms, held_kib, accounts = measure(lambda: load("bulk"))
+        start = time.perf_counter()
+        serialize(accounts)
+        serialize_ms = (time.perf_counter() - start) * 1000
+        print(f"{label:<14}{load_ms:>14.1f}{held_kib:>12.0f}{serialize_ms:>16.1f}{load_ms + serialize_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
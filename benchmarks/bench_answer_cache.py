@@ -0,0 +1,143 @@
+"""Hit rates and LLM calls avoided by the RAG answer cache on a replayed query log.
+
+Generates a log of banking questions: popular topics asked in several phrasings (case,
+punctuation, contractions, lead-ins such as "can you tell me", rewording) with a
+Zipf-like skew, plus one-off questions from a long tail.  The log is replayed through
+``AnswerCache`` the way ``RBCChatbot`` uses it, counting the answers that would have
+needed the LLM.  Every hit is checked against the topic of the question, so an answer
+served for a different topic (e.g. a TFSA answer to an RRSP question) counts as a wrong
+hit.  Half way through, the vector store version changes as if the store was rebuilt;
+answers from before it must not be served after.
+
+The Gemini embeddings need an API key and are not used here: questions are embedded
+with hashed word and character trigram counts, a crude local stand-in whose similarity
+scale differs from ``embedding-001``, hence its own ``--similarity`` default.
+
+Usage: python benchmarks/bench_answer_cache.py [queries] [--similarity S] [--exact-only]
+"""
+import hashlib
+import random
+import sys
+import time
+
+from common import summarize, print_table
+
+from chatbot.rag.answer_cache import AnswerCache
+
+TOPICS = {
+    "tfsa": ["What is a TFSA?", "whats a tfsa", "Can you explain what a TFSA is?",
+             "what is a tax free savings account", "What's a TFSA"],
+    "rrsp": ["What is an RRSP?", "whats an rrsp", "Can you explain what an RRSP is?",
+             "what is a registered retirement savings plan", "What's an RRSP"],
+    "tfsa_limit": ["What is the TFSA contribution limit?", "tfsa contribution limit",
+                   "How much can I contribute to my TFSA?", "what's the tfsa contribution limit this year"],
+    "rrsp_limit": ["What is the RRSP contribution limit?", "rrsp contribution limit",
+                   "How much can I contribute to my RRSP?", "what's the rrsp contribution limit this year"],
+    "tfsa_withdrawal": ["What are the TFSA withdrawal rules?", "tfsa withdrawal rules",
+                        "Can I withdraw money from my TFSA?"],
+    "rrsp_withdrawal": ["What are the RRSP withdrawal rules?", "rrsp withdrawal rules",
+                        "Can I withdraw money from my RRSP?"],
+    "wire_fee": ["How much does an international wire transfer cost?", "international wire transfer fee",
+                 "What is the fee for an international wire transfer?"],
+    "etransfer_limit": ["What is the Interac e-Transfer limit?", "interac e-transfer limit",
+                        "How much can I send by Interac e-Transfer?"],
+    "lost_card": ["What do I do if I lose my credit card?", "I lost my credit card",
+                  "how do i report a lost credit card", "Lost credit card, what should I do?"],
+    "overdraft": ["How does overdraft protection work?", "what is overdraft protection",
+                  "How does overdraft protection work"],
+    "mortgage_prepay": ["Can I make prepayments on my mortgage?", "mortgage prepayment options",
+                        "how do mortgage prepayments work"],
+    "gic": ["What is a GIC?", "whats a gic", "What's a GIC and how does it work?"],
+    "hours": ["What are your branch hours?", "branch hours", "When are branches open?"],
+    "fx_rate": ["What exchange rate do you use for US dollars?", "usd exchange rate",
+                "What is the exchange rate for US dollars?"],
+    "avion": ["How do I redeem Avion points?", "redeem avion points", "How can I redeem my Avion points?"],
+}
+TAIL_SUBJECTS = ["student line of credit", "safety deposit box", "joint account", "power of attorney",
+                 "estate account", "business chequing", "foreign cheque", "direct deposit form",
+                 "credit score", "RESP grant", "car loan", "travel insurance", "stop payment",
+                 "void cheque", "account closure", "mobile cheque deposit"]
+TAIL_ASKS = ["How do I set up a {}?", "What do I need for a {}?", "Is there a fee for a {}?",
+             "Where can I get a {}?", "How long does a {} take?"]
+PREFIXES = ["", "", "", "Hi, ", "Please tell me: ", "Can you tell me ", "I'd like to know ", "Quick question - "]
+SUFFIXES = ["", "", "", " thanks", " please", "??"]
+
+
+def embed(text: str, dimensions: int = 512) -> list:
+    """Hashed counts of words and character trigrams."""
+    vector = [0.0] * dimensions
+    words = text.split()
+    features = [f"w:{word}" for word in words] + [
+        f"c:{word[i:i + 3]}" for word in (f" {word} " for word in words) for i in range(len(word) - 2)
+    ]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimensions] += 1.0 if digest[4] & 1 else -1.0
+    return vector
+
+
+def query_log(count: int, seed: int):
+    """``(topic, question)`` pairs, 80% popular topics with Zipf-like weights, 20% long tail."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+    for _ in range(count):
+        if rng.random() < 0.8:
+            topic = rng.choices(topics, weights)[0]
+            question = rng.choice(PREFIXES) + rng.choice(TOPICS[topic]) + rng.choice(SUFFIXES)
+            yield topic, question.lower() if rng.random() < 0.3 else question
+        else:
+            subject, ask = rng.choice(TAIL_SUBJECTS), rng.choice(TAIL_ASKS)
+            yield f"tail:{ask}:{subject}", ask.format(subject)
+
+
+def replay(count: int, cache):
+    """Replay the log, returning LLM calls, wrong hits, stale hits and lookup latencies."""
+    llm_calls = wrong = stale = 0
+    version = 1
+    latencies = []
+    for n, (topic, question) in enumerate(query_log(count, seed=7)):
+        if n == count // 2:
+            version += 1
+        if cache is not None:
+            cache.sync_version(version)
+            start = time.perf_counter()
+            cached = cache.get(question)
+            latencies.append(time.perf_counter() - start)
+            if cached is not None:
+                wrong += cached["topic"] != topic
+                stale += cached["version"] != version
+                continue
+        llm_calls += 1
+        if cache is not None:
+            cache.put(question, {"answer": f"About {topic}", "topic": topic, "version": version})
+    return llm_calls, wrong, stale, latencies
+
+
+def main():
+    args = [arg for n, arg in enumerate(sys.argv[1:]) if not arg.startswith("--") and sys.argv[n] != "--similarity"]
+    count = int(args[0]) if args else 5000
+    similarity = float(sys.argv[sys.argv.index("--similarity") + 1]) if "--similarity" in sys.argv else 0.75
+    exact_only = "--exact-only" in sys.argv
+
+    uncached_calls, _, _, _ = replay(count, None)
+    cache = AnswerCache(embed=None if exact_only else embed, similarity=similarity)
+    llm_calls, wrong, stale, latencies = replay(count, cache)
+    stats = cache.stats()
+
+    print(f"\n{count} questions, {len(TOPICS)} popular topics and a long tail, store rebuilt half way")
+    print(f"Tiers: exact{'' if exact_only else f' + similar (cosine >= {similarity})'}")
+    print(f"LLM calls: {uncached_calls} uncached, {llm_calls} cached "
+          f"({uncached_calls - llm_calls} avoided, {1 - llm_calls / uncached_calls:.0%})")
+    print(f"Hit rate: {stats['hit_rate']:.1%} ({stats['exact_hits'] / count:.1%} exact, "
+          f"{stats['similar_hits'] / count:.1%} similar)")
+    print("Cache: " + ", ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                                 for key, value in stats.items()))
+    print(f"Wrong-topic hits: {wrong}, hits from before the rebuild: {stale}")
+    print_table("Cache lookup latency (embedding included)", {"lookup": summarize(latencies)})
+    if wrong or stale:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Hot-table size against query latency as old transfers move to monthly archives.
+
+Generates a skewed two-year dataset, then archives with a shrinking horizon (everything
+live, then 365, 90 and 30 days), compacting the database after each step.  Each step
+reports the live row count and file size, and times transfers, the first history page,
+a full 30 day history (live rows only) and a full 365 day history (which attaches the
+archives it overlaps).
+
+Usage: python benchmarks/bench_archive.py [users] [transfers] [calls]
+"""
+import contextlib
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from common import use_temp_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from datagen import DatasetSpec, build_database, user_id
+from chatbot.archive import archive_transfers, compact_database
+from chatbot.database import iter_transaction_history, transfer_fund_between_accounts
+from chatbot.pool import close_pools
+
+
+def measure(dataset, calls: int) -> dict:
+    rng = random.Random(3)
+
+    def pick():
+        n = dataset.pick_user(rng)
+        return (user_id(n), *dataset.pick_accounts(rng, n))
+
+    def transfer():
+        user, source, target = pick()
+        if rng.random() < 0.5:
+            source, target = target, source
+        transfer_fund_between_accounts(user, source, target, "0.01")
+
+    def history(days, limit=None):
+        user, source, _ = pick()
+        list(iter_transaction_history(source, days, limit=limit, user_id=user))
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        return {
+            "transfer": summarize(time_calls(transfer, calls)),
+            "history page, 30 days": summarize(time_calls(lambda: history(30, 6), calls)),
+            "history, 30 days": summarize(time_calls(lambda: history(30), calls)),
+            "history, 365 days": summarize(time_calls(lambda: history(365), max(1, calls // 10))),
+        }
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    transfers = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    calls = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    print(f"Generating {users} users and {transfers} transfers over two years...")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        dataset = build_database(DatasetSpec(users=users, transfers=transfers, days=730))
+    print(f"Built in {time.perf_counter() - start:.1f}s")
+
+    for horizon in (None, 365, 90, 30):
+        label = "everything live" if horizon is None else f"archived after {horizon} days"
+        if horizon is not None:
+            start = time.perf_counter()
+            archived = sum(archive_transfers(horizon).values())
+            # Release the pooled connections so VACUUM can rebuild the file
+            close_pools()
+            compact_database(DB_FILE, 0.0)
+            print(f"\nArchived {archived} transfers and compacted in {time.perf_counter() - start:.1f}s")
+        con = sqlite3.connect(DB_FILE)
+        live = con.execute("SELECT COUNT(*) FROM Transfers").fetchone()[0]
+        con.close()
+        print_table(f"{label}: {live} live transfers, {os.path.getsize(DB_FILE) / 2**20:.0f} MiB",
+                    measure(dataset, calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Tail latency of balance lookups on an event loop while heavy history queries run.
+
+Several tasks keep reading a full year of history for busy accounts while one task issues
+balance lookups back to back.  With the blocking functions called straight from coroutines,
+as synchronous MCP tools are, every lookup waits behind whole history queries.  With
+``chatbot.async_database`` the queries run on the database executor and the loop stays free.
+
+Usage: python benchmarks/bench_async_tools.py [transfers] [heavy_tasks] [lookups]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from common import use_temp_database, build_transfers_database, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+import chatbot.async_database as async_database
+import chatbot.database as database
+
+
+async def run_scenario(numbers: list[str], heavy_tasks: int, lookups: int, use_executor: bool) -> dict:
+    rng = random.Random(3)
+    stop = asyncio.Event()
+
+    async def history_reader():
+        while not stop.is_set():
+            account_number = rng.choice(numbers)
+            if use_executor:
+                await async_database.load_transaction_history(account_number, 365, "bench")
+            else:
+                database.load_transaction_history(account_number, 365, "bench")
+            await asyncio.sleep(0)
+
+    async def balance_lookups():
+        samples = []
+        for _ in range(lookups):
+            account_number = rng.choice(numbers)
+            start = time.perf_counter()
+            if use_executor:
+                await async_database.load_account("bench", account_number)
+            else:
+                database.load_account("bench", account_number)
+                await asyncio.sleep(0)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    readers = [asyncio.create_task(history_reader()) for _ in range(heavy_tasks)]
+    # Let the readers get going before measuring
+    await asyncio.sleep(0.05)
+    samples = await balance_lookups()
+    stop.set()
+    await asyncio.gather(*readers)
+    return summarize(samples)
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    heavy_tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    lookups = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    print(f"Building synthetic database with {transfers} transfers over 50 accounts...")
+    numbers = build_transfers_database(DB_FILE, transfers, accounts=50)
+    database.init_db()
+
+    results = {
+        "idle loop": asyncio.run(run_scenario(numbers, 0, lookups, True)),
+        "blocking calls": asyncio.run(run_scenario(numbers, heavy_tasks, lookups, False)),
+        "db executor": asyncio.run(run_scenario(numbers, heavy_tasks, lookups, True)),
+    }
+    async_database.shutdown_db_executor()
+    print_table(f"Balance lookups with {heavy_tasks} concurrent 365-day history readers", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Timings of bulk transfer loads and dumps through ``chatbot.bulk``.
+
+Writes a CSV of synthetic transfers, imports it into a fresh database with the indexes
+deferred (with and without posting the ledger), exports it back to CSV and JSON lines,
+and, on a smaller slice, compares against inserting with the indexes in place.
+
+Usage: python benchmarks/bench_bulk.py [rows] [comparison_rows]
+"""
+import csv
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.bulk import import_file, export_file, read_records, TABLES, _to_row
+from chatbot.database import init_db
+
+ACCOUNTS = 2000
+
+
+def write_transfers_csv(path: str, rows: int):
+    rng = random.Random(11)
+    numbers = [f"{n:010d}" for n in range(1000000000, 1000000000 + ACCOUNTS)]
+    start = datetime(2024, 1, 1)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(TABLES["transfers"].field_names)
+        for n in range(rows):
+            src, dst = rng.sample(numbers, 2)
+            when = (start + timedelta(seconds=n * 3)).isoformat()
+            writer.writerow((f"bulk-{n}", src, dst, when, f"{rng.randrange(1, 100000) / 100:.2f}", "1000.00", "1000.00"))
+    return rows
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44}{elapsed:>9.1f}s  {result}")
+    return elapsed
+
+
+def fresh_database():
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_FILE + suffix):
+            os.remove(DB_FILE + suffix)
+    init_db()
+
+
+def insert_with_indexes(path: str) -> int:
+    """Insert the same rows with the secondary indexes left in place."""
+    spec = TABLES["transfers"]
+    con = sqlite3.connect(DB_FILE, isolation_level=None)
+    sql = f"INSERT OR IGNORE INTO Transfers VALUES ({', '.join('?' * len(spec.fields))})"
+    batch, count = [], 0
+    for number, record in enumerate(read_records(path), 1):
+        batch.append(_to_row(spec, record, number))
+        if len(batch) == 50000:
+            con.execute("BEGIN")
+            con.executemany(sql, batch)
+            con.execute("COMMIT")
+            count += len(batch)
+            batch.clear()
+    con.execute("BEGIN")
+    con.executemany(sql, batch)
+    con.execute("COMMIT")
+    con.close()
+    return count + len(batch)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    comparison_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    directory = os.path.dirname(DB_FILE)
+    source = os.path.join(directory, "transfers.csv")
+    small = os.path.join(directory, "transfers-small.csv")
+
+    print(f"\nBulk load of {rows} transfers")
+    timed(f"write {rows} rows of CSV", lambda: write_transfers_csv(source, rows))
+    print(f"{'':<44}{os.path.getsize(source) / 2**20:>9.0f} MiB")
+
+    fresh_database()
+    timed("import, indexes deferred, no ledger", lambda: import_file("transfers", source, post_ledger=False))
+    timed("export to CSV", lambda: export_file("transfers", os.path.join(directory, "out.csv")))
+    timed("export to JSON lines", lambda: export_file("transfers", os.path.join(directory, "out.jsonl")))
+    fresh_database()
+    timed("import, indexes deferred, ledger + rollups", lambda: import_file("transfers", source))
+    print(f"{'':<44}{os.path.getsize(DB_FILE) / 2**20:>9.0f} MiB database")
+
+    print(f"\nInserting {comparison_rows} transfers, no ledger")
+    timed(f"write {comparison_rows} rows of CSV", lambda: write_transfers_csv(small, comparison_rows))
+    fresh_database()
+    timed("indexes kept in place", lambda: insert_with_indexes(small))
+    fresh_database()
+    timed("indexes deferred and rebuilt", lambda: import_file("transfers", small, post_ledger=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Prompt size and build time over long conversations, by history strategy.
+
+Replays synthetic 200-turn banking conversations (short questions, replies from a line
+to a long product answer) and builds the prompt of every turn four ways: the latest
+message only (what the client sent before), the full transcript, the conversation
+memory, and the memory's window with the summary recomputed from every folded message
+on each turn.  Reports estimated prompt tokens at several turns, the total sent, the
+build time per turn, and on how many turns the assistant's previous reply was in the
+prompt (what a follow-up like "savings" needs).
+
+Usage: python benchmarks/bench_conversation_memory.py [turns] [conversations]
+"""
+import random
+import sys
+import time
+
+from common import summarize, print_table
+
+from chatbot.config_client import SYSTEM_INSTRUCTIONS
+from chatbot.memory import ConversationMemory, estimate_tokens, summarize_message
+
+SYSTEM = SYSTEM_INSTRUCTIONS.format(user_id="test1")
+QUESTIONS = [
+    "What's my checking balance?",
+    "Transfer 50 dollars to savings",
+    "Which account?",
+    "savings",
+    "Show my credit card transactions for the last two weeks",
+    "What are the fees on the RBC Signature RBC Rewards Visa and how does the annual fee compare?",
+    "How do TFSA contribution limits work if I withdrew money last year?",
+    "thanks",
+]
+REPLY_SENTENCE = "Your savings account 2345678901 earns interest monthly, and transfers post the same business day. "
+
+
+def conversation(rng, turns):
+    for _ in range(turns):
+        yield {"role": "user", "content": rng.choice(QUESTIONS)}
+        yield {"role": "assistant", "content": REPLY_SENTENCE * rng.choice([1, 1, 2, 4, 12])}
+
+
+def transcript(messages):
+    return "\n".join(f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in messages)
+
+
+class LatestOnly:
+    def __init__(self):
+        self.last = ""
+
+    def append(self, message):
+        self.last = message["content"]
+
+    def render(self):
+        return self.last
+
+
+class FullTranscript:
+    def __init__(self):
+        self.messages = []
+
+    def append(self, message):
+        self.messages.append(message)
+
+    def render(self):
+        return transcript(self.messages)
+
+
+class RecomputedSummary(ConversationMemory):
+    """The memory's window, with the summary rebuilt from every folded message each turn."""
+
+    def __init__(self):
+        super().__init__()
+        self.everything = []
+
+    def append(self, message):
+        self.everything.append(message)
+        super().append(message)
+
+    def render(self):
+        folded = self.everything[:len(self.everything) - len(self)]
+        lines, tokens = [], 0
+        for line in reversed([summarize_message(message) for message in folded]):
+            tokens += estimate_tokens(line)
+            if lines and tokens > self.summary_tokens:
+                break
+            lines.append(line)
+        summary = "\n".join(reversed(lines))
+        return f"Summary of the earlier conversation:\n{summary}\n\nRecent conversation:\n{transcript(self)}"
+
+
+STRATEGIES = {
+    "latest message only": LatestOnly,
+    "full transcript": FullTranscript,
+    "memory, recomputed summary": RecomputedSummary,
+    "conversation memory": ConversationMemory,
+}
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    conversations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    checkpoints = [t for t in (1, 10, 50, 100, 200, 500, 1000) if t <= turns]
+
+    tokens_at = {name: {t: 0 for t in checkpoints} for name in STRATEGIES}
+    total_tokens = {name: 0 for name in STRATEGIES}
+    in_context = {name: 0 for name in STRATEGIES}
+    samples = {name: [] for name in STRATEGIES}
+    for n in range(conversations):
+        messages = list(conversation(random.Random(n), turns))
+        for name, strategy in STRATEGIES.items():
+            memory = strategy()
+            previous_reply = None
+            for turn in range(turns):
+                question, reply = messages[2 * turn], messages[2 * turn + 1]
+                start = time.perf_counter()
+                memory.append(question)
+                prompt = SYSTEM + "\n\n" + memory.render()
+                samples[name].append(time.perf_counter() - start)
+                memory.append(reply)
+
+                tokens = estimate_tokens(prompt)
+                total_tokens[name] += tokens
+                if turn + 1 in tokens_at[name]:
+                    tokens_at[name][turn + 1] += tokens
+                if previous_reply is None or previous_reply in prompt:
+                    in_context[name] += 1
+                previous_reply = reply["content"]
+
+    print(f"\n{conversations} conversations of {turns} turns, estimated prompt tokens (4 characters a token)")
+    print(f"{'':<28}" + "".join(f"{'turn ' + str(t):>11}" for t in checkpoints) + f"{'total':>12}{'context':>9}")
+    for name in STRATEGIES:
+        print(f"{name:<28}" + "".join(f"{tokens_at[name][t] // conversations:>11}" for t in checkpoints)
+              + f"{total_tokens[name] // conversations:>12}{in_context[name] / (turns * conversations):>9.0%}")
+    print_table("Prompt build per turn", {name: summarize(samples[name]) for name in STRATEGIES})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare the original OR-predicate history query with the migrated, indexed history read.
+
+Builds a synthetic database with 1M transfers (override with the first argument),
+times the original query against the unmigrated schema, then applies the migrations
+and times ``load_transaction_history``.
+
+Usage: python benchmarks/bench_history_index.py [transfers] [queries]
+"""
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from common import use_temp_database, build_transfers_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import load_transaction_history
+from chatbot.migrations import migrate
+
+ORIGINAL_SQL = """
+    SELECT TransactionNumber, TransferDateTime,
+        CASE WHEN FromAccountNumber = :account_number THEN 'debit' ELSE 'credit' END,
+        CASE WHEN FromAccountNumber = :account_number THEN -Amount ELSE Amount END,
+        CASE WHEN FromAccountNumber = :account_number THEN 'Transfer to ' || ToAccountNumber
+             ELSE 'Transfer from ' || FromAccountNumber END,
+        CASE WHEN FromAccountNumber = :account_number THEN FromAccountBalance ELSE ToAccountBalance END
+    FROM Transfers
+    WHERE (FromAccountNumber = :account_number OR ToAccountNumber = :account_number)
+    AND TransferDateTime >= :start_date
+    ORDER BY TransferDateTime DESC
+"""
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"Building synthetic database with {transfers} transfers...")
+    accounts = build_transfers_database(DB_FILE, transfers)
+    con = sqlite3.connect(DB_FILE, isolation_level=None)
+    rng = random.Random(7)
+    start_date = (datetime.now() - timedelta(days=30)).isoformat()
+
+    def original():
+        params = {"account_number": rng.choice(accounts), "start_date": start_date}
+        con.execute(ORIGINAL_SQL, params).fetchall()
+
+    def migrated():
+        load_transaction_history(rng.choice(accounts), 30, "bench")
+
+    plan = con.execute("EXPLAIN QUERY PLAN " + ORIGINAL_SQL,
+                       {"account_number": accounts[0], "start_date": start_date}).fetchall()
+    print("Original plan:", "; ".join(row[-1] for row in plan))
+    results = {"OR query, no indexes": summarize(time_calls(original, queries))}
+
+    migrate(con)
+    con.close()
+    results["migrated, indexed"] = summarize(time_calls(migrated, queries))
+    print_table(f"30-day history over {transfers} transfers ({queries} queries each)", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Show that a history page costs the same no matter how busy the account is.
+
+For accounts with increasing numbers of transfers in the window, compares reading
+the whole window into a list (the previous behaviour) with reading one page from
+``iter_transaction_history``, reporting latency and peak Python memory.
+
+Usage: python benchmarks/bench_history_pagination.py [page_size]
+"""
+import itertools
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from common import use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, iter_transaction_history, load_transaction_history
+
+ACTIVITY_LEVELS = [100, 1000, 10000, 100000]
+
+
+def build_database():
+    """Give each benchmark account the number of transfers in its activity level."""
+    init_db()
+    con = sqlite3.connect(DB_FILE, isolation_level=None)
+    now = datetime.now()
+    con.execute("BEGIN")
+    for level in ACTIVITY_LEVELS:
+        account = f"{level:010d}"
+        con.execute("INSERT INTO Accounts VALUES (?, 'bench', 'Bench', 0, 'CAD')", (account,))
+        con.executemany(
+            "INSERT INTO Transfers VALUES (?, ?, '0000000002', ?, 1, 0, 0)",
+            ((f"{account}-{n}", account, (now - timedelta(seconds=n * 20)).isoformat())
+             for n in range(level))
+        )
+    con.execute("COMMIT")
+    con.close()
+
+
+def measure(func):
+    """Run ``func`` once and return (milliseconds, peak KiB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    build_database()
+    print(f"\n{'transfers':>10}{'full ms':>12}{'full KiB':>12}{'page ms':>12}{'page KiB':>12}")
+    for level in ACTIVITY_LEVELS:
+        account = f"{level:010d}"
+        # Warm the page cache so both variants read from memory
+        load_transaction_history(account, 30, "bench")
+        full_ms, full_kib = measure(lambda: load_transaction_history(account, 30, "bench"))
+        page_ms, page_kib = measure(lambda: list(itertools.islice(
+            iter_transaction_history(account, 30, limit=page_size + 1, user_id="bench"), page_size + 1
+        )))
+        print(f"{level:>10}{full_ms:>12.2f}{full_kib:>12.0f}{page_ms:>12.3f}{page_kib:>12.1f}")
+
+    # Another user must not see the history of an account they do not own
+    foreign = list(iter_transaction_history(f"{ACTIVITY_LEVELS[-1]:010d}", 30, limit=page_size, user_id="other"))
+    print(f"\nRows read by a user who does not own the account: {len(foreign)}")
+    if foreign:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Duplicate concurrent transfer submissions with one idempotency key, and the key's cost.
+
+Fires the same keyed transfer many times at once through every transfer path (direct
+database calls from threads, the group-commit writer, the async layer and several
+processes), and checks each burst moved the money exactly once and every caller got the
+same receipt.  Then checks that reusing a key for a different transfer is refused and an
+expired key transfers again, and times transfers with and without a key and replays.
+
+Usage: python benchmarks/bench_idempotency.py [duplicates] [calls]
+"""
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+
+from common import use_temp_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import (
+    init_db, transfer_fund_between_accounts, IdempotencyKeyReusedError
+)
+
+USER_ID = "test1"
+FROM_ACCOUNT = "1234567890"
+TO_ACCOUNT = "2345678901"
+
+
+def balances() -> tuple[int, int]:
+    con = sqlite3.connect(DB_FILE)
+    rows = dict(con.execute(
+        "SELECT AccountNumber, Balance FROM Accounts WHERE AccountNumber IN (?, ?)", (FROM_ACCOUNT, TO_ACCOUNT)
+    ).fetchall())
+    con.close()
+    return rows[FROM_ACCOUNT], rows[TO_ACCOUNT]
+
+
+def transfers_count() -> int:
+    con = sqlite3.connect(DB_FILE)
+    count = con.execute("SELECT COUNT(*) FROM Transfers").fetchone()[0]
+    con.close()
+    return count
+
+
+def check(label: str, submit_all, duplicates: int):
+    """Fire one burst of duplicates and check it moved 1.00 exactly once."""
+    before, count = balances(), transfers_count()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        receipts = submit_all(f"{label}-{uuid.uuid4()}")
+    after = balances()
+    assert len(receipts) == duplicates, (label, len(receipts))
+    assert len({receipt.transaction_number for receipt in receipts}) == 1, label
+    assert sum(not receipt.replayed for receipt in receipts) == 1, label
+    assert transfers_count() == count + 1, (label, transfers_count() - count)
+    assert (before[0] - after[0], after[1] - before[1]) == (100, 100), (label, before, after)
+    print(f"{label:<28}{duplicates} submissions -> 1 transfer, {duplicates - 1} replays")
+
+
+def in_threads(duplicates: int, transfer):
+    """Submit with ``transfer`` from ``duplicates`` threads released together."""
+    def submit_all(key):
+        barrier = threading.Barrier(duplicates)
+        receipts = []
+
+        def submit():
+            barrier.wait()
+            receipts.append(transfer(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "1.00", idempotency_key=key))
+
+        threads = [threading.Thread(target=submit) for _ in range(duplicates)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return receipts
+    return submit_all
+
+
+def in_event_loop(duplicates: int):
+    """Submit through the async layer as concurrent tasks on one event loop."""
+    from chatbot.async_database import transfer_between_accounts
+
+    def submit_all(key):
+        async def burst():
+            return await asyncio.gather(*(
+                transfer_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "1.00", key)
+                for _ in range(duplicates)
+            ))
+        return asyncio.run(burst())
+    return submit_all
+
+
+def process_worker(key: str, threads: int, start, results):
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start.wait()
+        receipts = in_threads(threads, transfer_fund_between_accounts)(key)
+    results.put([(receipt.transaction_number, receipt.replayed) for receipt in receipts])
+
+
+def in_processes(duplicates: int, processes: int):
+    """Submit from several processes, each with its own connections, ``duplicates / processes`` threads each."""
+    from chatbot.models import TransferReceipt
+
+    def submit_all(key):
+        context = multiprocessing.get_context("spawn")
+        start, results = context.Event(), context.Queue()
+        workers = [context.Process(target=process_worker, args=(key, duplicates // processes, start, results))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        start.set()
+        receipts = [TransferReceipt(number, None, None, replayed)
+                    for _ in workers for number, replayed in results.get()]
+        for worker in workers:
+            worker.join()
+        return receipts
+    return submit_all
+
+
+def main():
+    duplicates = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    duplicates -= duplicates % 4
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        init_db()
+
+    from chatbot.account import transfer_between_accounts
+
+    print("\nDuplicate submissions of one keyed transfer")
+    check("threads, direct", in_threads(duplicates, transfer_fund_between_accounts), duplicates)
+    check("threads, transfer writer", in_threads(duplicates, transfer_between_accounts), duplicates)
+    check("asyncio, transfer writer", in_event_loop(duplicates), duplicates)
+    check("4 processes, direct", in_processes(duplicates, 4), duplicates)
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        key = str(uuid.uuid4())
+        first = transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "1.00", key)
+        try:
+            transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "2.00", key)
+            raise AssertionError("A reused key with another amount was accepted")
+        except IdempotencyKeyReusedError:
+            pass
+        con = sqlite3.connect(DB_FILE)
+        con.execute("UPDATE IdempotencyKeys SET ExpiresAt='2000-01-01' WHERE IdempotencyKey=?", (key,))
+        con.commit()
+        con.close()
+        again = transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "1.00", key)
+        assert not again.replayed and again.transaction_number != first.transaction_number
+    print("A reused key with another amount is refused, an expired key transfers again")
+
+    replay_key = str(uuid.uuid4())
+
+    def unkeyed():
+        transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "0.01")
+
+    def keyed():
+        transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "0.01", str(uuid.uuid4()))
+
+    def replay():
+        transfer_fund_between_accounts(USER_ID, FROM_ACCOUNT, TO_ACCOUNT, "0.01", replay_key)
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        replay()
+        results = {
+            "no key": summarize(time_calls(unkeyed, calls)),
+            "new key": summarize(time_calls(keyed, calls)),
+            "replayed key": summarize(time_calls(replay, calls)),
+        }
+    print_table(f"Direct transfers ({calls} calls each)", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Accuracy of the fast-path intent router on labelled messages, and the model time it saves.
+
+Each message is labelled with the tool call it should be answered with, or None when it
+needs the model (transfers, advice, product questions, ambiguous or compound requests).
+Reports how many of the structured requests the router answers directly (coverage), how
+many of its dispatches are exactly right (precision), every wrong dispatch, and how long
+classifying takes.  The client cannot reach the model here, so the time saved is an
+estimate: dispatched messages times an assumed model round trip (``--llm-ms``).
+
+Usage: python benchmarks/bench_intent_router.py [calls] [--llm-ms MS]
+"""
+import sys
+
+from common import time_calls, summarize, print_table
+
+from chatbot.config_client import FAST_PATH_CONFIDENCE
+from chatbot.intent_detector import IntentDetector
+
+CHECKING, SAVINGS, CREDIT = "1234567890", "2345678901", "3456789012"
+
+
+def balance(account):
+    return ("get_account_balance", {"account_number": account})
+
+
+def history(account, days=30):
+    return ("get_transaction_history", {"account_number": account, "days": days})
+
+
+ACCOUNTS = ("list_user_accounts", {})
+
+LABELLED = [
+    # Balances
+    ("What's my checking balance?", balance(CHECKING)),
+    ("checking balance", balance(CHECKING)),
+    ("Balance of my savings account please", balance(SAVINGS)),
+    ("how much money do I have in savings", balance(SAVINGS)),
+    ("How much is on my credit card?", balance(CREDIT)),
+    ("credit card balance", balance(CREDIT)),
+    ("what is the balance on 1234567890", balance(CHECKING)),
+    ("Show me the balance for my chequing account", balance(CHECKING)),
+    ("what's left in my savings", balance(SAVINGS)),
+    ("how much do i have in chequing?", balance(CHECKING)),
+    ("savings balance?", balance(SAVINGS)),
+    ("balance 2345678901", balance(SAVINGS)),
+    ("tell me my credit balance", balance(CREDIT)),
+    ("What is in my cheque account", balance(CHECKING)),
+    ("Could you check the current balance of my savings for me", balance(SAVINGS)),
+    # Account lists
+    ("show my accounts", ACCOUNTS),
+    ("List all my accounts", ACCOUNTS),
+    ("What accounts do I have?", ACCOUNTS),
+    ("my accounts", ACCOUNTS),
+    ("Can you show me all of my accounts", ACCOUNTS),
+    ("display my bank accounts", ACCOUNTS),
+    ("which are my accounts", ACCOUNTS),
+    ("list accounts", ACCOUNTS),
+    ("give me my accounts", ACCOUNTS),
+    # History
+    ("Show my checking transactions", history(CHECKING)),
+    ("savings transactions last 2 weeks", history(SAVINGS, 14)),
+    ("transaction history for my credit card", history(CREDIT)),
+    ("recent activity on chequing", history(CHECKING)),
+    ("checking history for the past 7 days", history(CHECKING, 7)),
+    ("What were my savings transactions this week?", history(SAVINGS, 7)),
+    ("credit card transactions last month", history(CREDIT, 30)),
+    ("show transfers on 2345678901 in the last 3 months", history(SAVINGS, 90)),
+    ("latest transactions on my checking account", history(CHECKING)),
+    ("savings account history last year", history(SAVINGS, 365)),
+    ("checking transactions yesterday", history(CHECKING, 2)),
+    ("recent transfers from savings", history(SAVINGS)),
+    ("credit card activity in the past 10 days", history(CREDIT, 10)),
+    ("transfer history for checking", history(CHECKING)),
+    ("chequing transactions today", history(CHECKING, 1)),
+    ("list the transactions on my savings over the past six months", history(SAVINGS, 180)),
+    # Money movement goes to the model
+    ("transfer $50 from checking to savings", None),
+    ("Move 100 dollars from savings to chequing", None),
+    ("pay off my credit card from checking", None),
+    ("send 20 to savings", None),
+    ("Can I transfer money to my credit card?", None),
+    ("deposit 200 into savings", None),
+    # Advice, products and policy go to the model
+    ("What is a balance transfer?", None),
+    ("what's the interest rate on savings", None),
+    ("Are there fees on my chequing account?", None),
+    ("What is the minimum balance for a savings account?", None),
+    ("How do I open a new savings account?", None),
+    ("should I pay my credit card now", None),
+    ("Why is my checking balance so low?", None),
+    ("how can I increase my credit limit", None),
+    ("what's my credit score", None),
+    ("tell me about RBC mortgages", None),
+    ("How much did I spend last month?", None),
+    ("summary of my spending this month", None),
+    ("what is my average balance", None),
+    ("close my credit card", None),
+    # Ambiguous, compound or chit-chat goes to the model
+    ("balance", None),
+    ("what's my balance", None),
+    ("show my transactions", None),
+    ("checking and savings balance", None),
+    ("Show my accounts and the balance of savings", None),
+    ("compare checking with savings", None),
+    ("balance of checking or savings", None),
+    ("history", None),
+    ("hello", None),
+    ("thanks!", None),
+    ("who are you", None),
+    ("I don't want my savings balance, show me checking history", None),
+    ("what's the weather", None),
+    ("Show me my savings balance then transfer 5 to checking", None),
+    ("balance transfer offers for credit card", None),
+    ("statement for checking last month", None),
+]
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 200
+    llm_ms = float(sys.argv[sys.argv.index("--llm-ms") + 1]) if "--llm-ms" in sys.argv else 1500.0
+
+    dispatched, correct, wrong, missed = 0, 0, [], []
+    for text, expected in LABELLED:
+        intent = IntentDetector.detect_intent(text)
+        if intent is None or intent.confidence < FAST_PATH_CONFIDENCE:
+            if expected is not None:
+                missed.append(text)
+            continue
+        dispatched += 1
+        if expected == (intent.name, intent.arguments):
+            correct += 1
+        else:
+            wrong.append((text, intent, expected))
+
+    structured = sum(expected is not None for _, expected in LABELLED)
+    print(f"\n{len(LABELLED)} labelled messages, {structured} answerable by one tool call, "
+          f"fast path at confidence >= {FAST_PATH_CONFIDENCE}")
+    print(f"Coverage:  {correct}/{structured} structured requests answered without the model "
+          f"({correct / structured:.0%})")
+    print(f"Precision: {correct}/{dispatched} dispatches correct ({correct / max(dispatched, 1):.0%})")
+    for text, intent, expected in wrong:
+        print(f"  wrong dispatch: {text!r} -> {intent.name} {intent.arguments}, expected {expected}")
+    for text in missed:
+        print(f"  sent to the model: {text!r}")
+
+    texts = [text for text, _ in LABELLED]
+    results = {
+        "detect_intent": summarize(time_calls(lambda: [IntentDetector.detect_intent(t) for t in texts], calls)),
+    }
+    per_message_us = results["detect_intent"]["mean_us"] / len(texts)
+    print_table(f"Classifying all {len(texts)} messages ({calls} rounds)", results)
+    print(f"\n{per_message_us:.1f} us per message")
+
+    # Every message pays for classification, dispatched ones skip a model round trip
+    saved_ms = (correct * llm_ms - len(texts) * per_message_us / 1000) / len(texts)
+    print(f"Estimated model time saved, assuming {llm_ms:.0f} ms per model call: "
+          f"{saved_ms:.0f} ms per message on this mix ({correct}/{len(texts)} messages skip the model)")
+
+
+if __name__ == "__main__":
+    main()
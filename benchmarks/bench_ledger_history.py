@@ -0,0 +1,89 @@
+"""History read from Transfers (UNION ALL over both covering indexes) against the
+single-account range scan on the Transactions ledger.
+
+Builds a synthetic database with 1M transfers, migrates it (which backfills the
+ledger), puts back the Transfers covering indexes the migrations dropped once history
+moved to the ledger, then times a first page and a full 30-day window with both queries.
+
+Usage: python benchmarks/bench_ledger_history.py [transfers] [queries]
+"""
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import use_temp_database, build_transfers_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, HISTORY_CURSOR_START
+from chatbot.migrations import MIGRATIONS
+
+TRANSFERS_SQL = """
+    SELECT TransactionNumber, TransferDateTime, 'debit', -Amount,
+           'Transfer to ' || ToAccountNumber, FromAccountBalance
+    FROM Transfers
+    WHERE FromAccountNumber=:account_number AND TransferDateTime>=:start_date
+      AND (TransferDateTime, TransactionNumber) < (:cursor_datetime, :cursor_number)
+    UNION ALL
+    SELECT TransactionNumber, TransferDateTime, 'credit', Amount,
+           'Transfer from ' || FromAccountNumber, ToAccountBalance
+    FROM Transfers
+    WHERE ToAccountNumber=:account_number AND TransferDateTime>=:start_date
+      AND FromAccountNumber!=:account_number
+      AND (TransferDateTime, TransactionNumber) < (:cursor_datetime, :cursor_number)
+    ORDER BY TransferDateTime DESC, TransactionNumber DESC
+    LIMIT :page_size
+"""
+
+LEDGER_SQL = """
+    SELECT TransactionNumber, TransactionDateTime, TransactionTypeCode,
+           Amount, OtherAccountNumber, BalanceAfter
+    FROM Transactions
+    WHERE AccountNumber=:account_number AND TransactionDateTime>=:start_date
+      AND (TransactionDateTime, TransactionNumber) < (:cursor_datetime, :cursor_number)
+    ORDER BY TransactionDateTime DESC, TransactionNumber DESC
+    LIMIT :page_size
+"""
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"Building synthetic database with {transfers} transfers...")
+    accounts = build_transfers_database(DB_FILE, transfers)
+    start = time.perf_counter()
+    init_db()
+    print(f"Migrated and backfilled the ledger in {time.perf_counter() - start:.1f}s")
+
+    con = sqlite3.connect(DB_FILE)
+    # The old read path as it ran, with the indexes of migrations 1 and 2
+    for version, _, statements in MIGRATIONS:
+        if version in (1, 2):
+            for statement in statements:
+                con.execute(statement)
+    rng = random.Random(7)
+    start_date = (datetime.now() - timedelta(days=30)).isoformat()
+
+    def query(sql, page_size):
+        params = {"account_number": rng.choice(accounts), "start_date": start_date,
+                  "cursor_datetime": HISTORY_CURSOR_START[0], "cursor_number": HISTORY_CURSOR_START[1],
+                  "page_size": page_size}
+        return lambda: con.execute(sql, params).fetchall()
+
+    for sql in (TRANSFERS_SQL, LEDGER_SQL):
+        plan = con.execute("EXPLAIN QUERY PLAN " + sql, {
+            "account_number": accounts[0], "start_date": start_date, "cursor_datetime": "",
+            "cursor_number": "", "page_size": 1}).fetchall()
+        print("Plan:", "; ".join(row[-1] for row in plan))
+
+    results = {}
+    for label, page_size in (("first page of 6", 6), ("full 30-day window", 10000)):
+        results[f"Transfers, {label}"] = summarize(time_calls(lambda: query(TRANSFERS_SQL, page_size)(), queries))
+        results[f"ledger, {label}"] = summarize(time_calls(lambda: query(LEDGER_SQL, page_size)(), queries))
+    print_table(f"History over {transfers} transfers ({queries} queries each)", results)
+
+
+if __name__ == "__main__":
+    main()
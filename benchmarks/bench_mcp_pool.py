@@ -0,0 +1,229 @@
+"""Kill and restart the MCP server under load, through the client session pool.
+
+Starts a local server, runs concurrent balance lookups through an ``MCPSessionPool``,
+kills the server with SIGKILL part way through and starts it again a few seconds later.
+Reports calls per second and failures over time, how long after the restart calls
+succeed again and every session is back, and the pool metrics.  Finally drains the pool
+under load and checks every call in flight finished.
+
+``--server real`` (the default) runs ``chatbot/mcp/server_sse.py`` on a scratch database
+and needs the server's dependencies.  ``--server stub`` runs a small JSON-lines TCP
+server in a subprocess instead, which exercises the pool's probing, reconnects and
+draining without them.
+
+Usage: python benchmarks/bench_mcp_pool.py [seconds] [workers] [--server real|stub]
+"""
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from common import ROOT_DIR, use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.mcp.session_pool import MCPSessionPool, sse_connector
+
+TOOL = "get_account_balance"
+ARGUMENTS = {"user_id": "test1", "account_number": "1234567890"}
+
+
+async def serve_stub(port: int):
+    """Answer ``call_tool`` and ``ping`` requests, one JSON object per line."""
+    async def handle(reader, writer):
+        async def answer(request):
+            if request["method"] == "call_tool":
+                await asyncio.sleep(0.005)
+                result = {"content": f"{request['name']} {request['arguments']}"}
+            else:
+                result = {}
+            writer.write(json.dumps({"id": request["id"], "result": result}).encode() + b"\n")
+
+        while line := await reader.readline():
+            asyncio.create_task(answer(json.loads(line)))
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    async with server:
+        await server.serve_forever()
+
+
+class StubClientSession:
+    """The client side of the stub protocol, with ``call_tool`` and ``send_ping`` like ``ClientSession``."""
+
+    def __init__(self, reader, writer):
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.reader_task = asyncio.create_task(self.read(reader))
+
+    async def read(self, reader):
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self.pending.pop(response["id"], None)
+                if future and not future.done():
+                    future.set_result(response["result"])
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self.pending.clear()
+
+    async def request(self, method, **fields):
+        if self.reader_task.done():
+            raise ConnectionError("Connection closed")
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        request_id = self.next_id
+        self.pending[request_id] = future
+        try:
+            self.writer.write(json.dumps({"id": request_id, "method": method, **fields}).encode() + b"\n")
+            await self.writer.drain()
+            return await future
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def call_tool(self, name, arguments):
+        return await self.request("call_tool", name=name, arguments=arguments)
+
+    async def send_ping(self):
+        return await self.request("ping")
+
+
+def stub_connector(port: int):
+    async def connect():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        session = StubClientSession(reader, writer)
+
+        async def close():
+            session.reader_task.cancel()
+            writer.close()
+
+        return session, close
+    return connect
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, MCP_HOST="127.0.0.1", MCP_PORT=str(port), CHATBOT_MAINTENANCE_INTERVAL="0")
+    if kind == "stub":
+        command = [sys.executable, __file__, "--serve-stub", str(port)]
+    else:
+        command = [sys.executable, os.path.join(ROOT_DIR, "chatbot", "mcp", "server_sse.py")]
+    process = subprocess.Popen(command, env=env, cwd=ROOT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.2):
+            return process
+        if process.poll() is not None:
+            raise RuntimeError(f"The {kind} server exited with code {process.returncode}")
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"The {kind} server did not start listening on port {port}")
+
+
+async def load(pool, workers, stop, outcomes):
+    """Keep ``workers`` callers busy, recording ``(time, succeeded)`` for every call."""
+    async def worker():
+        while not stop.is_set():
+            try:
+                await pool.call_tool(TOOL, ARGUMENTS)
+                outcomes.append((time.monotonic(), True))
+            except Exception:
+                outcomes.append((time.monotonic(), False))
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.01)
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def run(kind, seconds, workers):
+    port = free_port()
+    server = start_server(kind, port)
+    connect = stub_connector(port) if kind == "stub" else sse_connector(f"http://127.0.0.1:{port}/sse")
+    pool = MCPSessionPool(connect, size=4, probe_interval=0.5, probe_timeout=0.5, call_timeout=2.0,
+                          backoff_base=0.1, backoff_max=1.0)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        await pool.start()
+    print(f"\n{kind} server on port {port}, pool of 4 sessions, {workers} callers, {seconds}s")
+
+    kill_at, restart_at = seconds / 4, seconds / 2
+    outcomes, stop = [], asyncio.Event()
+    started = time.monotonic()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        load_task = asyncio.create_task(load(pool, workers, stop, outcomes))
+        await asyncio.sleep(kill_at)
+        server.send_signal(signal.SIGKILL)
+        server.wait()
+        killed = time.monotonic()
+        await asyncio.sleep(restart_at - kill_at)
+        # Start it off the event loop, so the pool keeps probing and callers keep waiting meanwhile
+        server = await asyncio.to_thread(start_server, kind, port)
+        restarted = time.monotonic()
+        all_healthy = None
+        while time.monotonic() - started < seconds:
+            if all_healthy is None and pool.metrics()["healthy"] == 4:
+                all_healthy = time.monotonic()
+            await asyncio.sleep(0.05)
+        stop.set()
+        await load_task
+
+    per_second = collections.defaultdict(lambda: [0, 0])
+    for when, ok in outcomes:
+        per_second[int(when - started)][0 if ok else 1] += 1
+    print(f"{'second':>8}{'ok':>10}{'failed':>10}")
+    for second in sorted(per_second):
+        mark = " <- killed" if second == int(killed - started) else " <- restarted" if second == int(restarted - started) else ""
+        print(f"{second:>8}{per_second[second][0]:>10}{per_second[second][1]:>10}{mark}")
+
+    first_ok = min((when for when, ok in outcomes if ok and when > restarted), default=None)
+    last_ok_before = max((when for when, ok in outcomes if ok and when < restarted), default=killed)
+    print(f"\nLast success {max(0.0, last_ok_before - killed):.2f}s after the kill, "
+          f"first success {first_ok - restarted:.2f}s after the server was listening again"
+          if first_ok else "\nNo call succeeded after the restart")
+    print("All 4 sessions healthy " + (f"{all_healthy - restarted:.2f}s after the restart" if all_healthy else "never"))
+    metrics = pool.metrics()
+    print("Pool: " + ", ".join(f"{key} {value}" for key, value in metrics.items() if key != "sessions"))
+
+    # Drain while callers are busy: calls in flight finish, new ones are refused
+    stop = asyncio.Event()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        load_task = asyncio.create_task(load(pool, workers, stop, []))
+        await asyncio.sleep(0.5)
+        in_flight = pool.metrics()["in_flight"]
+        drained = await pool.drain(timeout=5)
+        stop.set()
+        await load_task
+    print(f"Drained with {in_flight} calls in flight: {'all finished' if drained else 'timed out'}, "
+          f"{pool.metrics()['in_flight']} left")
+
+    server.terminate()
+    server.wait()
+    return first_ok is not None and drained
+
+
+def main():
+    if "--serve-stub" in sys.argv:
+        asyncio.run(serve_stub(int(sys.argv[sys.argv.index("--serve-stub") + 1])))
+        return
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--") and arg not in ("real", "stub")]
+    seconds = float(args[0]) if args else 12.0
+    workers = int(args[1]) if len(args) > 1 else 16
+    kind = sys.argv[sys.argv.index("--server") + 1] if "--server" in sys.argv else "real"
+    if not asyncio.run(run(kind, seconds, workers)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
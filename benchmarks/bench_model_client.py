@@ -0,0 +1,118 @@
+"""Per-request model client overhead before and after caching, against a local stub model.
+
+The old path built a client and formatted the system instructions on every message, then
+ran the blocking ``generate_content`` on a worker thread.  The new path takes the client
+from a ``ModelCache``, the instructions from a per-user cache, and awaits
+``generate_content_async``.  The stub builds its tools by converting the declarations to
+JSON and back, a lower bound on the real client's conversion into protobuf messages, and
+its replies take a fixed delay, so the numbers isolate the client's own overhead.
+
+Reports per-request latency with an instant model, then wall time and threads used for
+a burst of concurrent requests with a slow model, where the old path is capped by the
+default executor's worker count.
+
+Usage: python benchmarks/bench_model_client.py [calls] [concurrent] [--llm-ms MS]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+from common import summarize, print_table
+
+from chatbot.config_client import SYSTEM_INSTRUCTIONS, TOOL_DEFINITIONS, MODEL_CONFIG
+from chatbot.model_cache import ModelCache, system_instructions
+
+USER_ID = "test1"
+
+
+class StubModel:
+    """Stands in for ``genai.GenerativeModel``, replying after ``delay`` seconds."""
+
+    delay = 0.0
+
+    def __init__(self, model_name, temperature, tool_calling_config):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.tool_config = {"function_calling_config": dict(tool_calling_config)}
+        self.tools = [{"function_declarations": json.loads(json.dumps(TOOL_DEFINITIONS))}]
+
+    def generate_content(self, contents):
+        time.sleep(self.delay)
+        return contents[-1]
+
+    async def generate_content_async(self, contents):
+        await asyncio.sleep(self.delay)
+        return contents[-1]
+
+
+async def old_request(message):
+    model = StubModel(**MODEL_CONFIG)
+    instructions = SYSTEM_INSTRUCTIONS.format(user_id=USER_ID)
+    return await asyncio.to_thread(model.generate_content, [instructions, message])
+
+
+async def new_request(models, message):
+    model = models.get(**MODEL_CONFIG)
+    return await model.generate_content_async([system_instructions(USER_ID), message])
+
+
+async def time_requests(request, calls):
+    samples = []
+    for n in range(calls):
+        start = time.perf_counter()
+        await request(f"message {n}")
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def burst(request, concurrent):
+    """Run ``concurrent`` requests at once, return the wall time and the most extra threads seen."""
+    baseline = peak = threading.active_count()
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, threading.active_count())
+            await asyncio.sleep(0.001)
+
+    sampler = asyncio.create_task(sample())
+    start = time.perf_counter()
+    await asyncio.gather(*(request(f"message {n}") for n in range(concurrent)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return elapsed, peak - baseline
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    calls = int(args[0]) if len(args) > 0 else 2000
+    concurrent = int(args[1]) if len(args) > 1 else 64
+    llm_ms = float(sys.argv[sys.argv.index("--llm-ms") + 1]) if "--llm-ms" in sys.argv else 200.0
+    models = ModelCache(StubModel)
+
+    def cached(message):
+        return new_request(models, message)
+
+    StubModel.delay = 0.0
+    results = {
+        "build per request, thread": asyncio.run(time_requests(old_request, calls)),
+        "cached, async": asyncio.run(time_requests(cached, calls)),
+    }
+    print_table(f"Per-request overhead with an instant model ({calls} requests)", results)
+    saved = results["build per request, thread"]["mean_us"] - results["cached, async"]["mean_us"]
+    print(f"\n{saved:.0f} us less per request, {models.misses} client built, {models.hits} reused")
+
+    # Each run gets a fresh event loop, so a fresh default executor
+    StubModel.delay = llm_ms / 1000
+    print(f"\n{concurrent} concurrent requests, model replies after {llm_ms:.0f} ms")
+    print(f"{'':<28}{'wall ms':>12}{'threads':>12}")
+    for label, request in (("build per request, thread", old_request), ("cached, async", cached)):
+        runs = [asyncio.run(burst(request, concurrent)) for _ in range(3)]
+        print(f"{label:<28}{statistics.median(t for t, _ in runs) * 1000:>12.0f}{max(p for _, p in runs):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Cost of the money representation, and an exactness property check for integer cents.
+
+Part one times turning stored rows into API values: the previous REAL column read
+through ``Decimal(str(value))`` against integer cents rendered with ``format_cents``.
+
+Part two applies random transfers in SQLite, once to REAL balances and once to
+integer-cent balances, and checks the cents ledger against an exact Decimal model:
+every balance must match and the total across accounts must be conserved.
+
+Part three starts two processes migrating the same unmigrated database at once, several
+times over, and checks every balance was converted to cents exactly once.
+
+Usage: python benchmarks/bench_money.py [rows] [transfers]
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from common import ROOT_DIR
+
+from chatbot.config import DB_INIT_SQL
+from chatbot.migrations import migrate
+from chatbot.money import to_cents, from_cents, format_cents
+
+ACCOUNTS = 1000
+BATCH = 100000
+
+
+def conversion_cost(rows: int):
+    rng = random.Random(1)
+    cents = [rng.randrange(-10**9, 10**9) for _ in range(rows)]
+    reals = [c / 100 for c in cents]
+
+    start = time.perf_counter()
+    old = [str(Decimal(str(value))) for value in reals]
+    old_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [format_cents(value) for value in cents]
+    new_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    [from_cents(value) for value in cents]
+    decimal_elapsed = time.perf_counter() - start
+
+    mismatches = sum(Decimal(a) != Decimal(b) for a, b in zip(old, new))
+    print(f"\nConverting {rows} stored amounts to API strings")
+    print(f"  REAL -> Decimal(str()) -> str   {old_elapsed * 1e9 / rows:8.0f} ns/row")
+    print(f"  cents -> format_cents            {new_elapsed * 1e9 / rows:8.0f} ns/row")
+    print(f"  cents -> from_cents (Decimal)    {decimal_elapsed * 1e9 / rows:8.0f} ns/row")
+    print(f"  value mismatches: {mismatches}")
+
+
+def exactness(transfers: int):
+    rng = random.Random(2)
+    opening = [rng.randrange(0, 10**9) for _ in range(ACCOUNTS)]
+    expected = [from_cents(c) for c in opening]
+
+    con = sqlite3.connect(":memory:", isolation_level=None)
+    con.execute("CREATE TABLE Cents (AccountNumber INTEGER PRIMARY KEY, Balance NUMERIC NOT NULL)")
+    con.execute("CREATE TABLE Reals (AccountNumber INTEGER PRIMARY KEY, Balance NUMERIC NOT NULL)")
+    con.executemany("INSERT INTO Cents VALUES (?, ?)", enumerate(opening))
+    con.executemany("INSERT INTO Reals VALUES (?, ?)", ((n, c / 100) for n, c in enumerate(opening)))
+
+    start = time.perf_counter()
+    done = 0
+    while done < transfers:
+        batch = []
+        for _ in range(min(BATCH, transfers - done)):
+            src, dst = rng.sample(range(ACCOUNTS), 2)
+            amount = Decimal(rng.randrange(1, 10**7)).scaleb(-2)
+            expected[src] -= amount
+            expected[dst] += amount
+            batch.append((src, dst, amount))
+        con.execute("BEGIN")
+        for table, encode in (("Cents", to_cents), ("Reals", float)):
+            con.executemany(f"UPDATE {table} SET Balance = Balance - ? WHERE AccountNumber=?",
+                            ((encode(amount), src) for src, _, amount in batch))
+            con.executemany(f"UPDATE {table} SET Balance = Balance + ? WHERE AccountNumber=?",
+                            ((encode(amount), dst) for _, dst, amount in batch))
+        con.execute("COMMIT")
+        done += len(batch)
+    elapsed = time.perf_counter() - start
+
+    cents = [row[0] for row in con.execute("SELECT Balance FROM Cents ORDER BY AccountNumber")]
+    reals = [row[0] for row in con.execute("SELECT Balance FROM Reals ORDER BY AccountNumber")]
+    cents_wrong = sum(from_cents(c) != e for c, e in zip(cents, expected))
+    reals_wrong = sum(Decimal(str(r)) != e for r, e in zip(reals, expected))
+    conserved = sum(cents) == sum(opening)
+
+    print(f"\nApplied {transfers} random transfers across {ACCOUNTS} accounts in {elapsed:.1f}s")
+    print(f"  integer cents: {cents_wrong} balances differ from the Decimal model, total conserved: {conserved}")
+    print(f"  REAL:          {reals_wrong} balances differ from the Decimal model")
+    if cents_wrong or not conserved:
+        raise SystemExit("Integer cents ledger is not exact")
+
+
+def migrate_worker(db_file: str, barrier):
+    con = sqlite3.connect(db_file, isolation_level=None, timeout=30)
+    barrier.wait()
+    migrate(con)
+    con.close()
+
+
+def concurrent_migrations(runs: int = 10, processes: int = 2):
+    directory = tempfile.mkdtemp(prefix="finassist-bench-")
+    wrong_runs = 0
+    try:
+        for run in range(runs):
+            db_file = os.path.join(directory, f"migrate-{run}.db")
+            con = sqlite3.connect(db_file, isolation_level=None)
+            con.executescript(DB_INIT_SQL.read_text())
+            con.execute("PRAGMA journal_mode=WAL")
+            expected = {number: to_cents(Decimal(str(balance))) for number, balance in
+                        con.execute("SELECT AccountNumber, Balance FROM Accounts")}
+            con.close()
+
+            barrier = multiprocessing.Barrier(processes)
+            workers = [multiprocessing.Process(target=migrate_worker, args=(db_file, barrier))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if any(worker.exitcode for worker in workers):
+                raise SystemExit(f"A migrating process failed in run {run}")
+
+            con = sqlite3.connect(db_file)
+            actual = dict(con.execute("SELECT AccountNumber, Balance FROM Accounts"))
+            con.close()
+            wrong_runs += actual != expected
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\nMigrated an unmigrated database from {processes} processes at once, {runs} times")
+    print(f"  runs with balances not converted exactly once: {wrong_runs}")
+    if wrong_runs:
+        raise SystemExit("Concurrent migrations corrupted balances")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    transfers = int(sys.argv[2]) if len(sys.argv) > 2 else 2000000
+    conversion_cost(rows)
+    exactness(transfers)
+    concurrent_migrations()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Period summaries from the DailyBalances rollups against aggregating the raw ledger.
+
+Builds a synthetic database whose transfers are concentrated on a few busy accounts,
+migrates it (which backfills the ledger and the rollups), checks both methods agree and
+that another user's account cannot be summarized, then times 30, 90 and 365 day summaries with each.
+
+Usage: python benchmarks/bench_period_summary.py [transfers] [accounts] [queries]
+"""
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+from common import use_temp_database, build_transfers_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, load_period_summary
+from chatbot.money import format_cents
+
+RAW_SCAN_SQL = """
+    SELECT SUM(CASE WHEN Amount < 0 THEN -Amount ELSE 0 END),
+           SUM(CASE WHEN Amount > 0 THEN Amount ELSE 0 END),
+           COUNT(*)
+    FROM Transactions
+    WHERE AccountNumber=:account_number AND TransactionDateTime>=:start_date
+"""
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    print(f"Building synthetic database with {transfers} transfers over {accounts} accounts...")
+    numbers = build_transfers_database(DB_FILE, transfers, accounts=accounts)
+    start = time.perf_counter()
+    init_db()
+    print(f"Migrated, backfilled the ledger and built the rollups in {time.perf_counter() - start:.1f}s")
+
+    con = sqlite3.connect(DB_FILE)
+    rng = random.Random(7)
+
+    def raw_scan(account_number, days):
+        start_date = (date.today() - timedelta(days=days - 1)).isoformat()
+        return con.execute(RAW_SCAN_SQL, {"account_number": account_number, "start_date": start_date}).fetchone()
+
+    for days in (30, 365):
+        summary = load_period_summary(numbers[0], days, "bench")
+        debits, credits, count = raw_scan(numbers[0], days)
+        assert (summary["total_debits"], summary["total_credits"], summary["transaction_count"]) == \
+            (format_cents(debits or 0), format_cents(credits or 0), count), (summary, debits, credits, count)
+    print("Rollup totals match the raw ledger")
+    assert load_period_summary("1234567890", 30, "test2") is None, "test2 summarized test1's account"
+    assert load_period_summary(numbers[0], 30, "test1") is None, "test1 summarized a bench account"
+    assert load_period_summary("1234567890", 30, "test1") is not None
+    print("Accounts of other users are not summarized")
+
+    results = {}
+    for days in (30, 90, 365):
+        results[f"raw scan, {days} days"] = summarize(time_calls(lambda: raw_scan(rng.choice(numbers), days), queries))
+        results[f"rollups, {days} days"] = summarize(time_calls(lambda: load_period_summary(rng.choice(numbers), days, "bench"), queries))
+    print_table(f"Period summary over {transfers} transfers ({queries} queries each)", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare a fresh sqlite3.connect per call with pooled connections.
+
+Usage: python benchmarks/bench_pool.py [iterations]
+"""
+import sqlite3
+import sys
+
+from common import use_temp_database, time_calls, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, auth_user, load_accounts
+
+ACCOUNTS_SQL = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
+AUTH_SQL = "SELECT UserId FROM UserCredentials WHERE UserId=:user_id AND Password=:password"
+
+
+def connect_per_call_auth():
+    con = sqlite3.connect(DB_FILE)
+    con.execute(AUTH_SQL, {"user_id": "test1", "password": "password1"}).fetchone()
+    con.close()
+
+
+def connect_per_call_accounts():
+    con = sqlite3.connect(DB_FILE)
+    con.execute(ACCOUNTS_SQL, {"user_id": "test1"}).fetchall()
+    con.close()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    init_db()
+
+    results = {
+        "auth: connect per call": summarize(time_calls(connect_per_call_auth, iterations)),
+        "auth: pooled": summarize(time_calls(lambda: auth_user("test1", "password1"), iterations)),
+        "accounts: connect per call": summarize(time_calls(connect_per_call_accounts, iterations)),
+        "accounts: pooled": summarize(time_calls(lambda: load_accounts("test1"), iterations)),
+    }
+    print_table(f"Connection pool micro-benchmark ({iterations} calls each)", results)
+
+
+if __name__ == "__main__":
+    main()
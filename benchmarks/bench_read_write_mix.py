@@ -0,0 +1,90 @@
+"""Read latency while transfers are committing, read-only pool against the read-write pool.
+
+Reader threads alternate account listings and history pages while client threads push
+transfers through the transfer writer as fast as it commits them.  The same reads are
+timed with no writes, on the read-only pool during writes, and on the shared read-write
+pool during writes.
+
+Usage: python benchmarks/bench_read_write_mix.py [transfers] [readers] [writers] [seconds]
+"""
+import random
+import sys
+import threading
+import time
+
+from common import use_temp_database, build_transfers_database, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+import chatbot.database as database
+from chatbot.pool import get_pool, get_read_pool
+from chatbot.transfer_writer import get_transfer_writer
+
+
+def run_mix(numbers: list[str], readers: int, writers: int, seconds: float) -> tuple[dict, int]:
+    stop = threading.Event()
+    samples = []
+    committed = [0]
+    lock = threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            if rng.random() < 0.5:
+                database.load_accounts("bench")
+            else:
+                list(database.iter_transaction_history(rng.choice(numbers), 30, limit=20, user_id="bench"))
+            local.append(time.perf_counter() - start)
+        with lock:
+            samples.extend(local)
+
+    def writer(seed):
+        rng = random.Random(seed)
+        writer = get_transfer_writer()
+        count = 0
+        while not stop.is_set():
+            src, dst = rng.sample(numbers, 2)
+            try:
+                writer.transfer("bench", src, dst, "0.01")
+                count += 1
+            except database.TransferError:
+                pass
+        with lock:
+            committed[0] += count
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(100 + n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return summarize(samples), committed[0]
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 5
+    print(f"Building synthetic database with {transfers} transfers...")
+    numbers = build_transfers_database(DB_FILE, transfers, accounts=200)
+    database.init_db()
+
+    results = {}
+    results["read-only, no writes"], _ = run_mix(numbers, readers, 0, seconds)
+    results["read-only, writing"], committed_ro = run_mix(numbers, readers, writers, seconds)
+    # Send the same reads through the read-write pool the writer uses
+    database.get_read_pool = get_pool
+    results["read-write, writing"], committed_rw = run_mix(numbers, readers, writers, seconds)
+    database.get_read_pool = get_read_pool
+    print_table(f"{readers} readers, {writers} transfer clients, {seconds:.0f}s each", results)
+    print(f"\nTransfers committed: {committed_ro / seconds:.0f}/s with the read-only pool, "
+          f"{committed_rw / seconds:.0f}/s with the read-write pool")
+
+
+if __name__ == "__main__":
+    main()
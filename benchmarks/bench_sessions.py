@@ -0,0 +1,92 @@
+"""Memory and concurrency of per-user chat sessions, with stub assistants.
+
+Replays messages from many users through a ``SessionManager`` whose assistants keep a
+capped history and reply after a fixed delay, as the model would.  Reports the memory
+the sessions hold against one shared, uncapped history (the old single assistant), the
+lookup cost, and the wall time of a burst of concurrent messages from different users
+and from one user, whose messages run one at a time.
+
+Usage: python benchmarks/bench_sessions.py [users] [messages] [--llm-ms MS]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from common import time_calls, summarize, print_table
+
+from chatbot.config import SESSION_HISTORY_LIMIT
+from chatbot.memory import ConversationMemory
+from chatbot.sessions import SessionManager
+
+
+class StubAssistant:
+    """Keeps history like ``InteractiveBankingAssistant`` (or in ``history``) and replies after ``delay`` seconds."""
+
+    delay = 0.0
+
+    def __init__(self, user_id, history=None):
+        self.user_id = user_id
+        self.conversation_history = ConversationMemory(max_messages=SESSION_HISTORY_LIMIT) if history is None else history
+
+    async def send_message(self, message):
+        self.conversation_history.append({"role": "user", "content": message})
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        reply = f"Your checking balance is $1,234.56 ({self.user_id}, {len(message)} chars)"
+        self.conversation_history.append({"role": "assistant", "content": reply})
+        return reply
+
+
+def message(rng):
+    return "What is my checking balance and my last few transactions? " * rng.randint(1, 4)
+
+
+async def replay(manager, users, messages, rng):
+    """Four messages in five come from the most active fifth of the users."""
+    for _ in range(messages):
+        n = rng.randrange(max(1, users // 5)) if rng.random() < 0.8 else rng.randrange(users)
+        await manager.send_message(f"user{n}", message(rng))
+
+
+async def burst(manager, user_ids):
+    start = time.perf_counter()
+    await asyncio.gather(*(manager.send_message(user, "balance") for user in user_ids))
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    users = int(args[0]) if len(args) > 0 else 5000
+    messages = int(args[1]) if len(args) > 1 else 100000
+    llm_ms = float(sys.argv[sys.argv.index("--llm-ms") + 1]) if "--llm-ms" in sys.argv else 100.0
+    rng = random.Random(7)
+
+    old = SessionManager(lambda user: StubAssistant(user, history=[]))
+    asyncio.run(replay(old, 1, messages, random.Random(7)))
+    manager = SessionManager(StubAssistant, max_users=users // 2)
+    asyncio.run(replay(manager, users, messages, rng))
+
+    print(f"\n{messages} messages from {users} users, {users // 2} sessions kept, "
+          f"{SESSION_HISTORY_LIMIT} messages of history each at most")
+    print(f"{'':<28}{'sessions':>12}{'messages':>12}{'MiB':>12}")
+    for label, report in (("one shared history", old.memory_report()), ("per-user sessions", manager.memory_report())):
+        print(f"{label:<28}{report['sessions']:>12}{report['messages']:>12}{report['history_bytes'] / 2**20:>12.1f}")
+    report = manager.memory_report()
+    print(f"created {report['created']}, evicted {report['evicted_lru']} least recently used, "
+          f"{report['evicted_idle']} idle")
+
+    print_table("Session lookup", {
+        "existing session": summarize(time_calls(lambda: manager.get(f"user{rng.randrange(50)}"), 20000)),
+        "new session, evicting": summarize(time_calls(lambda: manager.get(f"new{rng.random()}"), 20000)),
+    })
+
+    StubAssistant.delay = llm_ms / 1000
+    concurrent = 64
+    print(f"\n{concurrent} concurrent messages, model replies after {llm_ms:.0f} ms")
+    print(f"{'different users':<28}{asyncio.run(burst(manager, [f'burst{n}' for n in range(concurrent)])):>12.0f} ms")
+    print(f"{'one user, in order':<28}{asyncio.run(burst(manager, ['burst0'] * concurrent)):>12.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Transfer throughput of several processes writing to 1, 2 and 4 shards.
+
+Each process commits transfers for its own slice of users through
+``transfer_fund_between_accounts``, as independent server processes would.  Processes
+are dealt out over the shards and only take users of their own shard, so with one shard
+every commit queues on the same SQLite write lock while with more shards the writers
+only contend with the others on their file.
+
+Runs are repeated with ``synchronous=NORMAL`` and ``FULL``.  With NORMAL a commit costs
+little more than CPU, so scaling needs a core per process; on fewer cores the processes
+take turns on the CPU and sharding only saves the time lost waiting on a busy lock.
+With FULL every commit waits for an fsync while holding its shard's lock and other
+shards commit during that wait, which shows on a disk with a real flush cost but not on
+tmpfs.  Use at least as many processes as the largest shard count, 4.
+
+Usage: python benchmarks/bench_shards.py [processes] [seconds] [users]
+"""
+import contextlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import ROOT_DIR
+
+
+def setup(users: int):
+    """Create every shard and give each user two accounts on its own shard."""
+    import sqlite3
+    from chatbot.database import init_db
+    from chatbot.shards import db_file_for_user
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        init_db()
+    for n in range(users):
+        user_id = f"user{n}"
+        con = sqlite3.connect(db_file_for_user(user_id))
+        con.execute("INSERT INTO UserCredentials VALUES (?, 'password')", (user_id,))
+        con.executemany(
+            "INSERT INTO Accounts VALUES (?, ?, 'Bench', 100000000, 'CAD')",
+            [(f"{n:08d}A", user_id), (f"{n:08d}B", user_id)]
+        )
+        con.commit()
+        con.close()
+
+
+def worker(index: int, processes: int, shards: int, users: int, seconds: float, results):
+    from chatbot.database import transfer_fund_between_accounts
+    from chatbot.shards import shard_for_user
+
+    rng = random.Random(index)
+    # Stay on one shard, sharing its users with the other processes dealt the same shard
+    shard = index % shards
+    peers = len(range(shard, processes, shards))
+    mine = [n for n in range(users) if shard_for_user(f"user{n}", shards) == shard][index // shards::peers]
+    count = 0
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            n = rng.choice(mine)
+            src, dst = (f"{n:08d}A", f"{n:08d}B") if rng.random() < 0.5 else (f"{n:08d}B", f"{n:08d}A")
+            transfer_fund_between_accounts(f"user{n}", src, dst, "0.01")
+            count += 1
+    results.put(count)
+
+
+def run(shards: int, synchronous: str, processes: int, seconds: float, users: int) -> float:
+    directory = tempfile.mkdtemp(prefix="finassist-shards-")
+    os.environ["CHATBOT_DB_FILE"] = os.path.join(directory, "bank.db")
+    os.environ["CHATBOT_DB_SHARDS"] = str(shards)
+    os.environ["CHATBOT_DB_SYNCHRONOUS"] = synchronous
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(target=setup, args=(users,))
+    process.start()
+    process.join()
+
+    results = context.Queue()
+    workers = [context.Process(target=worker, args=(n, processes, shards, users, seconds, results))
+               for n in range(processes)]
+    for process in workers:
+        process.start()
+    total = sum(results.get() for _ in workers)
+    for process in workers:
+        process.join()
+    return total / seconds
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+    os.environ["PYTHONPATH"] = ROOT_DIR
+    print(f"\n{processes} processes, {users} users, {seconds:.0f}s per run, {os.cpu_count()} CPUs")
+    if (os.cpu_count() or 1) < processes:
+        print("[WARNING] Fewer CPUs than processes: the NORMAL runs are CPU bound and will not scale with shards")
+    print(f"{'synchronous':<14}{'shards':<10}{'transfers/sec':>16}{'speedup':>10}")
+    for synchronous in ("NORMAL", "FULL"):
+        baseline = None
+        for shards in (1, 2, 4):
+            rate = run(shards, synchronous, processes, seconds, users)
+            baseline = baseline or rate
+            print(f"{synchronous:<14}{shards:<10}{rate:>16.0f}{rate / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
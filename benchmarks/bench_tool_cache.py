@@ -0,0 +1,143 @@
+"""Round trips saved by the client's tool-result cache on replayed chat sessions.
+
+Generates users and transfers, then replays chat turns (balances, account lists,
+histories, period summaries and some transfers, skewed towards active users) against a
+stub MCP session that runs the server's database calls, with and without a
+``ToolResultCache``.  Calls go through the same cache steps as the client's
+``_execute_function_call``.  A virtual clock advances between turns so TTLs expire as
+they would in conversation.  Every cached balance is checked against the database, so
+a stale read after a transfer fails the run.
+
+Usage: python benchmarks/bench_tool_cache.py [users] [turns] [--turn-gap SECONDS]
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from common import use_temp_database, summarize, print_table
+
+DB_FILE = use_temp_database()
+
+from datagen import DatasetSpec, build_database, user_id
+from chatbot.async_database import (
+    get_account, list_accounts, load_transaction_history_page, load_period_summary, transfer_between_accounts
+)
+from chatbot.mcp.tool_cache import ToolResultCache, MISSING
+
+
+class StubSession:
+    """Answers the banking tools from the database, like the server, counting round trips."""
+
+    def __init__(self):
+        self.round_trips = 0
+
+    async def call_tool(self, name, args):
+        self.round_trips += 1
+        user = args["user_id"]
+        if name == "get_account_balance":
+            account = await get_account(user, args["account_number"])
+            payload = account.to_dict() if account else {"error": "Account not found."}
+        elif name == "list_user_accounts":
+            payload = [account.to_dict() for account in await list_accounts(user)]
+        elif name == "get_transaction_history":
+            payload = {"transactions": await load_transaction_history_page(
+                args["account_number"], args["days"], None, 6, user)}
+        elif name == "get_period_summary":
+            payload = await load_period_summary(args["account_number"], args["days"], user)
+        else:
+            await transfer_between_accounts(user, args["from_account"], args["to_account"], args["amount"],
+                                            args["idempotency_key"])
+            payload = f"✅ Transferred ${args['amount']} from {args['from_account']} to {args['to_account']}."
+        text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=False)
+
+
+async def execute(session, cache, name, args):
+    """The cache steps of the client's ``_execute_function_call``."""
+    user = args["user_id"]
+    if cache is not None and cache.cacheable(name):
+        cached = cache.get(name, user, args)
+        if cached is not MISSING:
+            return cached, True
+    version = cache.version if cache is not None else 0
+    try:
+        result = await session.call_tool(name, args)
+    finally:
+        if cache is not None and name == "transfer_funds":
+            cache.invalidate(user_ids=[user], accounts=[args["from_account"], args["to_account"]])
+    text = result.content[0].text
+    if cache is not None and name != "transfer_funds" and '"error"' not in text:
+        cache.put(name, user, args, result, version, text)
+    return result, False
+
+
+def turns(dataset, count, seed):
+    rng = random.Random(seed)
+    for n in range(count):
+        user = dataset.pick_user(rng)
+        source, target = dataset.pick_accounts(rng, user)
+        args = {"user_id": user_id(user)}
+        roll = rng.random()
+        if roll < 0.40:
+            yield "get_account_balance", {**args, "account_number": source}
+        elif roll < 0.60:
+            yield "list_user_accounts", args
+        elif roll < 0.80:
+            yield "get_transaction_history", {**args, "account_number": source, "days": rng.choice([7, 30.0, 30])}
+        elif roll < 0.90:
+            yield "get_period_summary", {**args, "account_number": source, "days": 30}
+        else:
+            yield "transfer_funds", {**args, "from_account": source, "to_account": target, "amount": "1.00",
+                                     "idempotency_key": f"bench-{seed}-{n}"}
+
+
+async def replay(dataset, count, cached, turn_gap):
+    now = [0.0]
+    session = StubSession()
+    cache = ToolResultCache(clock=lambda: now[0]) if cached else None
+    hits, misses, stale = [], [], 0
+    for name, args in turns(dataset, count, seed=11):
+        now[0] += turn_gap
+        start = time.perf_counter()
+        result, hit = await execute(session, cache, name, args)
+        (hits if hit else misses).append(time.perf_counter() - start)
+        if hit and name == "get_account_balance":
+            account = await get_account(args["user_id"], args["account_number"])
+            stale += json.loads(result.content[0].text)["balance"] != account.to_dict()["balance"]
+    return session.round_trips, cache, hits, misses, stale
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    users = int(args[0]) if args else 2000
+    count = int(args[1]) if len(args) > 1 else 20000
+    turn_gap = float(sys.argv[sys.argv.index("--turn-gap") + 1]) if "--turn-gap" in sys.argv else 0.05
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        dataset = build_database(DatasetSpec(users=users, transfers=users * 20))
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        uncached_trips, _, _, uncached, _ = asyncio.run(replay(dataset, count, False, turn_gap))
+        cached_trips, cache, hits, misses, stale = asyncio.run(replay(dataset, count, True, turn_gap))
+
+    print(f"\n{count} turns from {users} users, {turn_gap}s apart (virtual clock)")
+    print(f"Round trips: {uncached_trips} uncached, {cached_trips} cached "
+          f"({1 - cached_trips / uncached_trips:.0%} saved)")
+    print("Cache: " + ", ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                                 for key, value in cache.stats().items()))
+    print(f"Stale balances served: {stale}")
+    print_table("Tool call latency", {
+        "uncached": summarize(uncached),
+        "cache miss": summarize(misses),
+        "cache hit": summarize(hits),
+    })
+    if stale:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Latency of the tool calls in one model response, one after another against dispatched.
+
+A stub MCP session answers each tool after an injected delay (reads and transfers take
+different times, with jitter).  Each scenario is a list of calls as the model would emit
+them; both ways run it and the results must come back in call order.  The dispatched run
+is also checked for ordering: every mutating call starts only after all calls before it
+finished, and no later call starts before it finished.
+
+Usage: python benchmarks/bench_tool_dispatch.py [rounds] [--read-ms MS] [--write-ms MS]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+import common  # noqa: F401, puts the repository on the path
+from chatbot.tool_dispatcher import dispatch_tool_calls, is_read_only
+
+CHECKING, SAVINGS, CREDIT = "1234567890", "2345678901", "3456789012"
+
+
+def balance(account):
+    return ("get_account_balance", {"account_number": account})
+
+
+def transfer(source, target, amount):
+    return ("transfer_funds", {"from_account": source, "to_account": target, "amount": amount})
+
+
+SCENARIOS = {
+    "three balances": [balance(CHECKING), balance(SAVINGS), balance(CREDIT)],
+    "accounts, balances, history": [
+        ("list_user_accounts", {}), balance(CHECKING), balance(SAVINGS),
+        ("get_transaction_history", {"account_number": CHECKING, "days": 30}),
+        ("get_period_summary", {"account_number": SAVINGS}),
+    ],
+    "balance, transfer, balances": [
+        balance(CHECKING), balance(SAVINGS), transfer(CHECKING, SAVINGS, "50.00"),
+        balance(CHECKING), balance(SAVINGS),
+    ],
+    "two transfers": [transfer(CHECKING, SAVINGS, "10.00"), transfer(SAVINGS, CREDIT, "5.00")],
+    "single balance": [balance(CHECKING)],
+}
+
+
+class StubSession:
+    """Answers ``call_tool`` after a delay and records when each call ran."""
+
+    def __init__(self, read_ms, write_ms, rng):
+        self.read_ms = read_ms
+        self.write_ms = write_ms
+        self.rng = rng
+        self.events = []
+
+    async def call_tool(self, name, args):
+        delay = self.read_ms if is_read_only(name) else self.write_ms
+        start = time.perf_counter()
+        await asyncio.sleep(delay * self.rng.uniform(0.8, 1.2) / 1000)
+        self.events.append((name, start, time.perf_counter()))
+        return f"{name} {args}"
+
+
+async def sequential(calls, execute):
+    results = []
+    for name, args in calls:
+        results.append(await execute(name, args))
+    return results
+
+
+def check_order(calls, events):
+    """Mutating calls ran alone, after everything before them and before everything after."""
+    spans = sorted(events, key=lambda event: event[1])
+    for position, (name, start, end) in enumerate(spans):
+        if is_read_only(name):
+            continue
+        assert all(earlier_end <= start for _, _, earlier_end in spans[:position]), name
+        assert all(later_start >= end for _, later_start, _ in spans[position + 1:]), name
+    assert [name for name, _, _ in spans if not is_read_only(name)] == \
+        [name for name, _ in calls if not is_read_only(name)]
+
+
+async def run(calls, runner, session):
+    session.events = []
+    start = time.perf_counter()
+    results = await runner(calls, session.call_tool)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert results == [f"{name} {args}" for name, args in calls]
+    return elapsed
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    rounds = int(args[0]) if args else 20
+    read_ms = float(sys.argv[sys.argv.index("--read-ms") + 1]) if "--read-ms" in sys.argv else 80.0
+    write_ms = float(sys.argv[sys.argv.index("--write-ms") + 1]) if "--write-ms" in sys.argv else 150.0
+    session = StubSession(read_ms, write_ms, random.Random(5))
+
+    print(f"\nStub MCP tools: reads {read_ms:.0f} ms, transfers {write_ms:.0f} ms, +/-20%, {rounds} rounds")
+    print(f"{'':<32}{'calls':>7}{'one by one ms':>16}{'dispatched ms':>16}{'speedup':>10}")
+    for label, calls in SCENARIOS.items():
+        one_by_one, dispatched = [], []
+        for _ in range(rounds):
+            one_by_one.append(asyncio.run(run(calls, sequential, session)))
+            dispatched.append(asyncio.run(run(calls, dispatch_tool_calls, session)))
+            check_order(calls, session.events)
+        before, after = statistics.median(one_by_one), statistics.median(dispatched)
+        print(f"{label:<32}{len(calls):>7}{before:>16.0f}{after:>16.0f}{before / after:>9.1f}x")
+    print("\nResults came back in call order, transfers ran alone and in order")
+
+
+if __name__ == "__main__":
+    main()
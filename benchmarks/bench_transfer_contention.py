@@ -0,0 +1,110 @@
+"""Transfers from many competing writer processes: the original five-statement
+deferred transaction versus guarded UPDATE ... RETURNING under BEGIN IMMEDIATE.
+
+Both variants use the same short busy timeout so lock waits surface as failures.
+Reports throughput, failed transfers and statements sent per transfer.
+
+Usage: python benchmarks/bench_transfer_contention.py [transfers_per_writer] [busy_timeout_s]
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+BUSY_TIMEOUT = sys.argv[2] if len(sys.argv) > 2 else "0.05"
+os.environ["CHATBOT_DB_BUSY_TIMEOUT"] = BUSY_TIMEOUT
+
+from common import use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, transfer_fund_between_accounts
+from chatbot.pool import get_pool
+
+WRITER_COUNTS = [4, 16, 32]
+ACCOUNTS = [("test1", "1234567890", "2345678901"), ("test2", "4567890123", "5678901234"),
+            ("test3", "7890123456", "8901234567")]
+
+
+def legacy_transfer(con, user_id, from_account, to_account, amount):
+    """The transfer as it was before: deferred BEGIN, two UPDATEs, two SELECTs and an INSERT."""
+    cur = con.cursor()
+    try:
+        con.execute("BEGIN TRANSACTION")
+        cur.execute("UPDATE Accounts SET Balance = Balance - ? WHERE UserId=? AND AccountNumber=?",
+                    (amount, user_id, from_account))
+        cur.execute("UPDATE Accounts SET Balance = Balance + ? WHERE UserId=? AND AccountNumber=?",
+                    (amount, user_id, to_account))
+        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", (user_id, from_account))
+        from_balance = cur.fetchone()[0]
+        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", (user_id, to_account))
+        to_balance = cur.fetchone()[0]
+        cur.execute("INSERT INTO Transfers VALUES (hex(randomblob(16)), ?, ?, datetime('now'), ?, ?, ?)",
+                    (from_account, to_account, amount, from_balance, to_balance))
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+
+def writer(variant, n, per_writer, results):
+    user_id, from_account, to_account = ACCOUNTS[n % len(ACCOUNTS)]
+    statements = 0
+
+    def count(_):
+        nonlocal statements
+        statements += 1
+
+    if variant == "legacy":
+        con = sqlite3.connect(DB_FILE, timeout=float(BUSY_TIMEOUT), isolation_level=None)
+        con.set_trace_callback(count)
+        transfer = lambda: legacy_transfer(con, user_id, from_account, to_account, 1)
+    else:
+        con = get_pool().acquire()
+        con.set_trace_callback(count)
+        get_pool().release(con)
+        transfer = lambda: transfer_fund_between_accounts(user_id, from_account, to_account, "0.01")
+
+    failures = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(per_writer):
+            try:
+                transfer()
+            except sqlite3.OperationalError:
+                failures += 1
+    results.put((failures, statements))
+
+
+def run(variant, writers, per_writer):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(variant, n, per_writer, results))
+                 for n in range(writers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    failures = sum(f for f, _ in outcomes)
+    statements = sum(s for _, s in outcomes)
+    committed = writers * per_writer - failures
+    return committed / elapsed, failures, statements / max(1, committed)
+
+
+def main():
+    per_writer = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    init_db()
+    print(f"\nbusy timeout {BUSY_TIMEOUT}s, {per_writer} transfers per writer process")
+    print(f"{'writers':>8}{'variant':>12}{'tx/s':>10}{'failed':>10}{'stmts/tx':>10}")
+    for writers in WRITER_COUNTS:
+        for variant in ("legacy", "returning"):
+            throughput, failures, statements = run(variant, writers, per_writer)
+            print(f"{writers:>8}{variant:>12}{throughput:>10.0f}{failures:>10}{statements:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Transfer throughput with one transaction per transfer versus the group-commit writer.
+
+Usage: python benchmarks/bench_transfer_writer.py [transfers_per_client]
+"""
+import contextlib
+import io
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from common import use_temp_database
+
+DB_FILE = use_temp_database()
+
+from chatbot.database import init_db, transfer_fund_between_accounts
+from chatbot.transfer_writer import get_transfer_writer
+
+CLIENT_COUNTS = [1, 8, 64]
+ACCOUNTS = [("test1", "1234567890", "2345678901"), ("test2", "4567890123", "5678901234"),
+            ("test3", "7890123456", "8901234567")]
+
+
+def run_clients(transfer, clients: int, per_client: int) -> float:
+    """Run ``clients`` threads that each perform ``per_client`` transfers, returning transfers/sec."""
+    errors = []
+
+    def client(n):
+        user_id, from_account, to_account = ACCOUNTS[n % len(ACCOUNTS)]
+        try:
+            for _ in range(per_client):
+                transfer(user_id, from_account, to_account, Decimal("0.01"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return clients * per_client / elapsed
+
+
+def main():
+    per_client = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    init_db()
+    writer = get_transfer_writer()
+    print(f"\n{'clients':>8}{'per-transfer tx/s':>20}{'group commit tx/s':>20}{'avg batch':>12}")
+    for clients in CLIENT_COUNTS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            direct = run_clients(transfer_fund_between_accounts, clients, per_client)
+            batches_before, transfers_before = writer.batches, writer.transfers
+            grouped = run_clients(writer.transfer, clients, per_client)
+        avg_batch = (writer.transfers - transfers_before) / max(1, writer.batches - batches_before)
+        print(f"{clients:>8}{direct:>20.0f}{grouped:>20.0f}{avg_batch:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Shared helpers for the benchmark scripts.
+
+Run a benchmark from the repository root, e.g. ``python benchmarks/bench_pool.py``.
+Benchmarks never touch the shipped ``bank.db``: ``use_temp_database`` points
+``CHATBOT_DB_FILE`` at a scratch file and must be called before anything from
+``chatbot`` is imported.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """
+    Point the chatbot at a database file in a fresh temporary directory.
+
+    Worker processes started by a benchmark inherit the environment, so they reuse the
+    parent's file instead of creating their own.
+
+    :param name: File name of the database inside the temporary directory.
+    :return: The full path of the database file.
+    """
+    db_file = os.environ.get("FINASSIST_BENCH_DB")
+    if db_file is None:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="finassist-bench-"), name)
+        os.environ["FINASSIST_BENCH_DB"] = db_file
+    os.environ["CHATBOT_DB_FILE"] = db_file
+    return db_file
+
+
+def time_calls(func, iterations: int) -> list[float]:
+    """
+    Call ``func`` repeatedly and record the latency of each call.
+
+    :param func: A zero-argument callable.
+    :param iterations: How many times to call it.
+    :return: Per-call latencies in seconds.
+    """
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Summarize latency samples.
+
+    :param samples: Latencies in seconds.
+    :return: Throughput and p50/p95/p99 latencies in microseconds.
+    """
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6
+
+    return {
+        "calls": len(ordered),
+        "ops_per_sec": len(ordered) / total if total else 0.0,
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": pct(0.50),
+        "p95_us": pct(0.95),
+        "p99_us": pct(0.99),
+    }
+
+
+def print_table(title: str, results: dict[str, dict]):
+    """
+    Print named summaries side by side.
+
+    :param title: Heading for the table.
+    :param results: Mapping of row label to a dict produced by :func:`summarize`.
+    """
+    print(f"\n{title}")
+    print(f"{'':<28}{'ops/sec':>12}{'p50 us':>12}{'p95 us':>12}{'p99 us':>12}")
+    for label, stats in results.items():
+        print(f"{label:<28}{stats['ops_per_sec']:>12.0f}{stats['p50_us']:>12.1f}"
+              f"{stats['p95_us']:>12.1f}{stats['p99_us']:>12.1f}")
+
+
+def build_transfers_database(db_file: str, transfers: int, accounts: int = 2000,
+                             days: int = 730, seed: int = 42) -> list[str]:
+    """
+    Create the base schema (no migrations) and fill it with random transfers.
+
+    Transfers go between uniformly chosen accounts at random times over the last ``days``.
+    Amounts and balances are in the base schema's dollars, migrations convert them.
+
+    :param db_file: Path of the database file to create.
+    :param transfers: How many transfers to insert.
+    :param accounts: How many accounts to spread them over.
+    :param days: How far back transfers go.
+    :param seed: Seed for the random generator, the same seed builds the same data.
+    :return: The account numbers created.
+    """
+    from chatbot.config import DB_INIT_SQL
+
+    con = sqlite3.connect(db_file, isolation_level=None)
+    con.executescript(DB_INIT_SQL.read_text())
+    con.execute("PRAGMA journal_mode=WAL")
+    rng = random.Random(seed)
+    numbers = [f"{n:010d}" for n in range(1000000000, 1000000000 + accounts)]
+    con.executemany(
+        "INSERT INTO Accounts VALUES (?, 'bench', 'Bench', 100000, 'CAD')",
+        [(a,) for a in numbers]
+    )
+    now = datetime.now()
+
+    def rows():
+        for n in range(transfers):
+            src, dst = rng.sample(numbers, 2)
+            when = now - timedelta(seconds=rng.randrange(days * 86400))
+            yield (f"bench-{n}", src, dst, when.isoformat(), 10, 1000, 1000)
+
+    con.execute("BEGIN")
+    con.executemany("INSERT INTO Transfers VALUES (?, ?, ?, ?, ?, ?, ?)", rows())
+    con.execute("COMMIT")
+    con.close()
+    return numbers
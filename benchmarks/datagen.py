@@ -0,0 +1,190 @@
+"""Deterministic synthetic users, accounts and transfers with production-like skew.
+
+Activity follows a Zipf law over users, so a few hot users (and their hot chequing
+accounts) take most transfers, and transfers arrive in bursts: now and then a user makes
+several transfers seconds apart.  Transfers are generated in time order with running
+balances that never go negative, so the stored balances match the ledger.  The same
+``DatasetSpec`` always produces the same data.
+
+Usage: python benchmarks/datagen.py [users] [transfers] [seed]
+"""
+import bisect
+import itertools
+import math
+import random
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from common import use_temp_database
+
+ACCOUNT_KINDS = [
+    ("Chequing", 500000),
+    ("Saving", 2500000),
+    ("Credit Card", 100000),
+    ("US Dollar", 200000),
+]
+"""Account name and opening balance in cents, the first two kinds are always present."""
+
+PASSWORD = "password"
+"""Password of every generated user."""
+
+
+@dataclass
+class DatasetSpec:
+    """Size and shape of a generated dataset."""
+
+    users: int = 10000
+    transfers: int = 500000
+    days: int = 365
+    seed: int = 42
+    zipf_exponent: float = 1.1
+    """Skew of activity over users, 0 is uniform."""
+    hot_account_share: float = 0.7
+    """Share of transfers leaving a user's first (chequing) account."""
+    burst_probability: float = 0.02
+    """Chance that a transfer starts a burst by the same user."""
+    burst_size: int = 8
+    """Most transfers in one burst."""
+
+
+def user_id(n: int) -> str:
+    return f"user{n:06d}"
+
+
+def account_number(n: int, kind: int) -> str:
+    # The prefix keeps generated numbers clear of the seeded accounts
+    return f"G{n:07d}{kind:02d}"
+
+
+class Dataset:
+    """The records of one ``DatasetSpec``, generated on demand."""
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        rng = random.Random(spec.seed)
+        self.account_kinds = [2 + (rng.random() < 0.6) + (rng.random() < 0.2) for _ in range(spec.users)]
+        # Users are ranked by a shuffled order, so hot users are spread over the id space
+        ranks = list(range(spec.users))
+        rng.shuffle(ranks)
+        weights = [1 / (rank + 1) ** spec.zipf_exponent for rank in ranks]
+        self.cumulative_weights = list(itertools.accumulate(weights))
+        self.balances = {}
+
+    def pick_user(self, rng: random.Random) -> int:
+        """Draw a user with the dataset's skew."""
+        point = rng.random() * self.cumulative_weights[-1]
+        return min(bisect.bisect(self.cumulative_weights, point), self.spec.users - 1)
+
+    def pick_accounts(self, rng: random.Random, n: int) -> tuple[str, str]:
+        """Draw a source and a different target account of user ``n``."""
+        kinds = self.account_kinds[n]
+        source = 0 if rng.random() < self.spec.hot_account_share else rng.randrange(1, kinds)
+        target = rng.randrange(kinds - 1)
+        if target >= source:
+            target += 1
+        return account_number(n, source), account_number(n, target)
+
+    def users(self) -> Iterator[dict]:
+        for n in range(self.spec.users):
+            yield {"user_id": user_id(n), "password": PASSWORD}
+
+    def accounts(self) -> Iterator[dict]:
+        """The accounts of every user with their opening balances."""
+        for n, kinds in enumerate(self.account_kinds):
+            for kind in range(kinds):
+                name, balance = ACCOUNT_KINDS[kind]
+                yield {"account_number": account_number(n, kind), "user_id": user_id(n), "account_name": name,
+                       "balance": f"{balance / 100:.2f}", "currency": "CAD"}
+
+    def transfers(self) -> Iterator[dict]:
+        """Transfers in time order, ending about now, updating :attr:`balances` as they go."""
+        spec = self.spec
+        rng = random.Random(spec.seed + 1)
+        self.balances = {}
+        # Transfers within a burst are seconds apart, so spread the rest of the span over the others
+        starts = spec.transfers / (1 + spec.burst_probability * spec.burst_size / 2)
+        mean_gap = (spec.days * 86400 - (spec.transfers - starts) * 2.75) / max(starts, 1)
+        end = datetime.now()
+        when = end - timedelta(days=spec.days)
+        burst_user, burst_left = None, 0
+        for n in range(spec.transfers):
+            if burst_left:
+                user = burst_user
+                burst_left -= 1
+                when += timedelta(seconds=rng.uniform(0.5, 5))
+            else:
+                user = self.pick_user(rng)
+                when += timedelta(seconds=rng.expovariate(1 / mean_gap))
+                if rng.random() < spec.burst_probability:
+                    burst_user, burst_left = user, rng.randrange(1, spec.burst_size)
+            source, target = self.pick_accounts(rng, user)
+            amount = max(1, int(math.exp(rng.gauss(math.log(5000), 1.2))))
+            source_balance = self.balances.get(source, ACCOUNT_KINDS[int(source[-2:])][1])
+            if amount > source_balance:
+                source, target = target, source
+                source_balance = self.balances.get(source, ACCOUNT_KINDS[int(source[-2:])][1])
+                amount = min(amount, source_balance // 2)
+                if amount <= 0:
+                    continue
+            target_balance = self.balances.get(target, ACCOUNT_KINDS[int(target[-2:])][1])
+            self.balances[source] = source_balance - amount
+            self.balances[target] = target_balance + amount
+            # The span only ends near now on average, never let a transfer land in the future
+            yield {"transaction_number": f"gen-{spec.seed}-{n}", "from_account": source, "to_account": target,
+                   "datetime": min(when, end).isoformat(), "amount": f"{amount / 100:.2f}",
+                   "from_balance": f"{(source_balance - amount) / 100:.2f}",
+                   "to_balance": f"{(target_balance + amount) / 100:.2f}"}
+
+
+def build_database(spec: DatasetSpec) -> Dataset:
+    """
+    Create the configured database (every shard) and load a generated dataset into it.
+
+    :param spec: What to generate.
+    :return: The dataset, whose balances now match the database.
+    """
+    from chatbot.bulk import import_records
+    from chatbot.database import init_db
+    from chatbot.shards import db_file_for_user
+
+    init_db()
+    dataset = Dataset(spec)
+    import_records("users", dataset.users())
+    import_records("accounts", dataset.accounts())
+    import_records("transfers", dataset.transfers())
+    # Bring the balances forward to the end of the generated history
+    updates = {}
+    for number, balance in dataset.balances.items():
+        updates.setdefault(db_file_for_user(user_id(int(number[1:8]))), []).append((balance, number))
+    for db_file, rows in updates.items():
+        con = sqlite3.connect(db_file)
+        con.executemany("UPDATE Accounts SET Balance=? WHERE AccountNumber=?", rows)
+        con.commit()
+        con.close()
+    return dataset
+
+
+def main():
+    spec = DatasetSpec(
+        users=int(sys.argv[1]) if len(sys.argv) > 1 else DatasetSpec.users,
+        transfers=int(sys.argv[2]) if len(sys.argv) > 2 else DatasetSpec.transfers,
+        seed=int(sys.argv[3]) if len(sys.argv) > 3 else DatasetSpec.seed,
+    )
+    db_file = use_temp_database()
+    start = time.perf_counter()
+    dataset = build_database(spec)
+    print(f"Generated {spec.users} users, {sum(dataset.account_kinds)} accounts and "
+          f"{spec.transfers} transfers into {db_file} in {time.perf_counter() - start:.1f}s")
+    con = sqlite3.connect(db_file)
+    top = con.execute(
+        "SELECT AccountNumber, COUNT(*) FROM Transactions GROUP BY AccountNumber ORDER BY 2 DESC LIMIT 5"
+    ).fetchall()
+    print("Busiest accounts:", ", ".join(f"{number} ({count})" for number, count in top))
+
+
+if __name__ == "__main__":
+    main()
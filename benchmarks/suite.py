@@ -0,0 +1,182 @@
+"""Benchmark suite for the database layer on a generated, skewed dataset.
+
+Times auth, balance, transfer-target, transfer and history calls (the history page is
+what the MCP ``get_transaction_history`` tool reads), with users drawn with the same
+skew as the data.  Results are written as JSON and compared against a saved baseline;
+the exit status is 1 when any call regressed by more than the tolerance.
+
+Usage:
+    python benchmarks/suite.py [--users N] [--transfers N] [--seed N] [--iterations N]
+                               [--output results.json] [--baseline baseline.json]
+                               [--save-baseline] [--tolerance 0.2] [--db path]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+
+from common import ROOT_DIR, use_temp_database, time_calls, summarize
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+
+COMPARED = [("ops_per_sec", -1), ("p50_us", 1), ("p95_us", 1), ("p99_us", 1)]
+"""Metrics compared with the baseline, with +1 where higher is worse and -1 where lower is."""
+
+
+def build_operations(dataset, seed: int) -> dict:
+    """Build one zero-argument callable per benchmarked call."""
+    from chatbot.database import (
+        auth_user, load_account, load_transfer_target_accounts,
+        transfer_fund_between_accounts, iter_transaction_history
+    )
+    from datagen import user_id, PASSWORD
+
+    rng = random.Random(seed)
+
+    def pick():
+        n = dataset.pick_user(rng)
+        source, target = dataset.pick_accounts(rng, n)
+        return user_id(n), source, target
+
+    def auth():
+        user, _, _ = pick()
+        auth_user(user, PASSWORD)
+
+    def balance():
+        user, source, _ = pick()
+        load_account(user, source)
+
+    def targets():
+        user, source, _ = pick()
+        load_transfer_target_accounts(user, source)
+
+    def transfer():
+        user, source, target = pick()
+        # Alternate the direction so hot accounts never run dry
+        if rng.random() < 0.5:
+            source, target = target, source
+        transfer_fund_between_accounts(user, source, target, "0.01")
+
+    def history_page():
+        user, source, _ = pick()
+        list(iter_transaction_history(source, 30, limit=6, user_id=user))
+
+    def history_year():
+        user, source, _ = pick()
+        list(iter_transaction_history(source, 365, user_id=user))
+
+    return {
+        "auth": auth,
+        "balance": balance,
+        "target_accounts": targets,
+        "transfer": transfer,
+        "history_page": history_page,
+        "history_365_days": history_year,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Print each metric next to its baseline value and collect the regressions.
+
+    :return: One description per metric that is worse than the baseline by more than ``tolerance``.
+    """
+    regressions = []
+    print(f"\n{'call':<20}{'metric':<14}{'baseline':>12}{'now':>12}{'change':>10}")
+    for name, stats in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        for metric, direction in COMPARED:
+            old, new = before[metric], stats[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change * direction > tolerance:
+                flag = "  REGRESSED"
+                regressions.append(f"{name} {metric} {change:+.0%}")
+            print(f"{name:<20}{metric:<14}{old:>12.1f}{new:>12.1f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--transfers", type=int, default=500000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--db", help="Reuse this database file, generating it only if it does not exist")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["FINASSIST_BENCH_DB"] = os.path.abspath(args.db)
+    db_file = use_temp_database()
+
+    from datagen import Dataset, DatasetSpec, build_database
+    from chatbot.database import init_db
+
+    spec = DatasetSpec(users=args.users, transfers=args.transfers, seed=args.seed)
+    if os.path.exists(db_file):
+        init_db()
+        dataset = Dataset(spec)
+    else:
+        print(f"Generating {args.users} users and {args.transfers} transfers...", file=sys.stderr)
+        dataset = build_database(spec)
+
+    results = {
+        "meta": {
+            "users": args.users,
+            "transfers": args.transfers,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": {},
+    }
+    stdout = sys.stdout
+    for name, operation in build_operations(dataset, args.seed).items():
+        # Warm the caches, then keep the database layer's debug output out of the report
+        sys.stdout = open(os.devnull, "w")
+        try:
+            time_calls(operation, max(1, args.iterations // 10))
+            samples = time_calls(operation, args.iterations)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        results["results"][name] = {key: round(value, 1) for key, value in summarize(samples).items()}
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            file.write(report + "\n")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["meta"]["users"] != args.users or baseline["meta"]["transfers"] != args.transfers:
+            print("Baseline was recorded on a different dataset size, comparison skipped", file=sys.stderr)
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions: " + ", ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions beyond the tolerance.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,213 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import date
 from datetime import timedelta
 from decimal import Decimal
 import chatbot.database
-from chatbot.models import Account
-from chatbot.database import load_accounts, load_transfer_target_accounts, transfer_fund_between_accounts
+from chatbot.config import ACCOUNT_CACHE_TTL, ACCOUNT_CACHE_MAX_USERS
+from chatbot.models import Account, TransferReceipt
+from chatbot.database import load_accounts, load_account
+from chatbot.shards import db_file_for_user
+from chatbot.transfer_writer import get_transfer_writer
+
+
+class _CacheEntry:
+    """The cached accounts of one user."""
+
+    __slots__ = ("expires_at", "accounts", "complete")
+
+    def __init__(self, expires_at: float, accounts: dict[str, Account], complete: bool):
+        self.expires_at = expires_at
+        self.accounts = accounts
+        self.complete = complete
+
+
+class AccountCache:
+    """
+    Cache of accounts keyed by user, bounded by a time to live and a least recently used size.
+
+    An entry is ``complete`` once every account of the user has been loaded; single accounts
+    found by number are cached in a partial entry that can serve them but not a full listing.
+    A transfer drops its user's entry, and a load of that user that raced with the transfer
+    is not stored, so the cache never goes back to a pre-transfer balance however concurrent
+    transfers finish.  Write versions are kept per user, so a transfer only discards the
+    loads of its own user.
+    """
+
+    def __init__(self, ttl: float = ACCOUNT_CACHE_TTL, max_users: int = ACCOUNT_CACHE_MAX_USERS):
+        """
+        :param ttl: Seconds an entry stays valid after it is loaded.
+        :param max_users: Most users kept before the least recently used one is evicted.
+        """
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by a full invalidation; with the per-user counters it identifies a user's state
+        self._epoch = 0
+        self._write_versions: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def _lookup(self, user_id: str) -> _CacheEntry:
+        """Return the live entry of a user and mark it recently used, must hold the lock."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _write_version(self, user_id: str) -> tuple[int, int]:
+        """The version of a user's accounts, which changes with every write, must hold the lock."""
+        return self._epoch, self._write_versions.get(user_id, 0)
+
+    def _bump(self, user_id: str):
+        """Record a write to a user's accounts, must hold the lock."""
+        self._write_versions[user_id] = self._write_versions.pop(user_id, 0) + 1
+        if len(self._write_versions) > 4 * self.max_users:
+            # Forgetting a user's counter could let its in-flight load match again, so the
+            # epoch moves on instead, discarding every load in flight
+            self._write_versions.clear()
+            self._epoch += 1
+
+    def _store(self, user_id: str, accounts: dict[str, Account], complete: bool, version: tuple[int, int]):
+        """Cache accounts loaded while the user's write version was ``version``, must hold the lock."""
+        if version != self._write_version(user_id):
+            return
+        entry = self._lookup(user_id)
+        if entry is not None and not complete:
+            entry.accounts.update(accounts)
+            return
+        self._entries[user_id] = _CacheEntry(time.monotonic() + self.ttl, accounts, complete)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _record(self, hit: bool, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += elapsed
+            else:
+                self.misses += 1
+                self.miss_seconds += elapsed
+
+    def list(self, user_id: str) -> list[Account]:
+        """
+        Get every account of a user, loading them on a miss.
+
+        :param user_id: The user ID of the account owner.
+        :return: The user's accounts.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._lookup(user_id)
+            if entry is not None and entry.complete:
+                accounts = list(entry.accounts.values())
+            else:
+                accounts = None
+            version = self._write_version(user_id)
+        if accounts is not None:
+            self._record(True, started)
+            return accounts
+
+        accounts = load_accounts(user_id)
+        with self._lock:
+            self._store(user_id, {a.account_number: a for a in accounts}, True, version)
+        self._record(False, started)
+        return accounts
+
+    def get(self, user_id: str, account_number: str) -> Account:
+        """
+        Get one account of a user, falling back to a primary key lookup on a miss.
+
+        :param user_id: The user ID of the account owner.
+        :param account_number: The account number to look up.
+        :return: The account, or None if the user has no such account.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._lookup(user_id)
+            account = entry.accounts.get(account_number) if entry is not None else None
+            known_missing = account is None and entry is not None and entry.complete
+            version = self._write_version(user_id)
+        if account is not None or known_missing:
+            self._record(True, started)
+            return account
+
+        account = load_account(user_id, account_number)
+        if account is not None:
+            with self._lock:
+                self._store(user_id, {account_number: account}, False, version)
+        self._record(False, started)
+        return account
+
+    def invalidate(self, user_id: str = None):
+        """
+        Drop the cached accounts of one user, or of every user.
+
+        :param user_id: The user to drop, None clears the whole cache.
+        """
+        with self._lock:
+            if user_id is None:
+                self._epoch += 1
+                self._write_versions.clear()
+                self._entries.clear()
+            else:
+                self._bump(user_id)
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        """
+        Report the size, hit ratio and mean lookup latency of the cache.
+
+        :return: A dict of counters and latencies in microseconds.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "mean_hit_us": self.hit_seconds / self.hits * 1e6 if self.hits else 0.0,
+                "mean_miss_us": self.miss_seconds / self.misses * 1e6 if self.misses else 0.0
+            }
+
+
+account_cache = AccountCache()
+"""The process-wide account cache used by the functions below."""
 
 
 def list_accounts(user_id: str) -> list[Account]:
     """
     List all of the user's accoutns.
-    
+
     :param user_id: The user ID of the account owner.
     :return: All accounts that are avaialbe for transfering.
     """
-    return load_accounts(user_id)
+    return account_cache.list(user_id)
+
+
+def get_account(user_id: str, account_number: str) -> Account:
+    """
+    Get one of the user's accounts by its account number.
+
+    :param user_id: The user ID of the account owner.
+    :param account_number: The account number to look up.
+    :return: The account, or None if the user has no such account.
+    """
+    return account_cache.get(user_id, account_number)
 
 
 def list_transfer_target_accounts(user_id: str,
@@ -25,16 +219,36 @@ def list_transfer_target_accounts(user_id: str,
     :param from_account: The account number or account name that the fund will be transfered from.
     :return: All the accounts that funds can be transfered from the specified account.
     """
-    return load_transfer_target_accounts(user_id, from_account)
+    return [account for account in account_cache.list(user_id)
+            if account.account_number != from_account]
 
 
 def transfer_between_accounts(user_id: str,
                               from_account: str, to_account: str,
-                              amount: Decimal, description: str=""):
+                              amount: Decimal, description: str="",
+                              idempotency_key: str = None) -> TransferReceipt:
     """ Transfer specific amount of fund from one account to the other of the same owner.
 
     :param user_id: The user ID of the account owner.
     :param from_account: The account number or account name that the fund will be transfered from.
     :param to_account: The account number or account name that the fund will be transfered to.
+    :param idempotency_key: Client-chosen key that makes retries safe, see :func:`chatbot.database.apply_transfer`.
+    :return: The transaction number and the balances of both accounts after the transfer.
+    """
+    # Queue behind concurrent transfers on the user's shard so they share one commit, then wait for ours
+    receipt = get_transfer_writer(db_file_for_user(user_id)).transfer(
+        user_id, from_account, to_account, amount, idempotency_key
+    )
+    # Receipts of concurrent transfers arrive in any order, so the next read reloads instead
+    if not receipt.replayed:
+        account_cache.invalidate(user_id)
+    return receipt
+
+
+def account_cache_stats() -> dict:
+    """
+    Report how well the account cache is doing.
+
+    :return: See :meth:`AccountCache.stats`.
     """
-    transfer_fund_between_accounts(user_id, from_account, to_account, amount)
+    return account_cache.stats()
@@ -0,0 +1,326 @@
+"""Monthly archive databases for old transfers, and the compaction of the live files.
+
+Transfers older than ``ARCHIVE_HORIZON_DAYS`` move, with their two ledger rows, out of
+each shard's ``Transfers`` and ``Transactions`` tables into one database file per calendar
+month under ``ARCHIVE_DIR``.  The live tables and their indexes then only grow with recent
+activity.  History reads ``ATTACH`` an archive only when the requested window overlaps its
+month.  Archives are keyed by account, not by shard, so all shards share them and moving
+users between shards leaves them untouched.
+
+The ``DailyBalances`` rollups stay in the shards and keep covering archived days.
+Exports and the ledger backfill only see the live tables.
+"""
+import calendar
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from chatbot.config import (
+    DB_FILE, DB_BUSY_TIMEOUT, ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS, ARCHIVE_BATCH_SIZE,
+    MAINTENANCE_INTERVAL, VACUUM_FREE_RATIO
+)
+from chatbot.shards import shard_files
+
+ARCHIVED_TABLES = ["Transfers", "Transactions"]
+"""Tables whose old rows move to the archives, created there with the live schema."""
+
+ARCHIVE_MOVE_STATEMENTS = [
+    """
+    INSERT INTO temp.ArchivingTransfers
+    SELECT rowid FROM main.Transfers
+    WHERE TransferDateTime >= :start AND TransferDateTime < :end
+    LIMIT :batch_size
+    """,
+    """
+    INSERT OR IGNORE INTO archive.Transfers
+    SELECT * FROM main.Transfers WHERE rowid IN (SELECT rowid FROM temp.ArchivingTransfers)
+    """,
+    """
+    INSERT OR IGNORE INTO archive.Transactions
+    SELECT * FROM main.Transactions WHERE TransactionNumber IN (
+        SELECT TransactionNumber FROM main.Transfers
+        WHERE rowid IN (SELECT rowid FROM temp.ArchivingTransfers)
+    )
+    """,
+    """
+    DELETE FROM main.Transactions WHERE TransactionNumber IN (
+        SELECT TransactionNumber FROM main.Transfers
+        WHERE rowid IN (SELECT rowid FROM temp.ArchivingTransfers)
+    )
+    """,
+    "DELETE FROM main.Transfers WHERE rowid IN (SELECT rowid FROM temp.ArchivingTransfers)",
+]
+"""Move one batch of a month's transfers, and their ledger rows, into the attached ``archive``."""
+
+
+def archive_file(month: str) -> str:
+    """
+    Get the archive database file of a month.
+
+    :param month: The month as ``YYYY-MM``.
+    :return: The path of that month's archive, which may not exist yet.
+    """
+    return str(Path(ARCHIVE_DIR) / f"{Path(DB_FILE).stem}-{month}.db")
+
+
+def _month_end(month: str) -> str:
+    """First day of the month after ``month``, as an ISO date."""
+    year, number = map(int, month.split("-"))
+    return (date(year, number, calendar.monthrange(year, number)[1]) + timedelta(days=1)).isoformat()
+
+
+_archive_bounds: dict[str, tuple[int, str]] = {}
+"""Per archive file, its modification time and the day every row in it is older than."""
+
+
+def _archived_before(path: str, mtime_ns: int) -> str:
+    """Read the day an archive's rows are all older than, stored by the archiver as its ``user_version``."""
+    cached = _archive_bounds.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    con = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        con.close()
+    # Archives written before the bound was recorded could hold any day of their month
+    bound = f"{version // 10000:04d}-{version // 100 % 100:02d}-{version % 100:02d}" if version else "9999-12-31"
+    _archive_bounds[path] = (mtime_ns, bound)
+    return bound
+
+
+def archive_files_between(start: str, end: str) -> list[str]:
+    """
+    List the existing archives that may hold rows in a time range, newest first.
+
+    An archive is skipped when its month is outside the range, or when everything archived
+    into it is older than ``start``.  The latter is the common case of a window shorter
+    than the archive horizon, which then reads no archive at all.
+
+    :param start: Start of the range, an ISO date or datetime.
+    :param end: End of the range, an ISO date or datetime.
+    :return: The paths of the archives that may hold a transfer in the range.
+    """
+    files = []
+    year, month = int(start[:4]), int(start[5:7])
+    last = (int(end[:4]), int(end[5:7]))
+    while (year, month) <= last:
+        path = archive_file(f"{year:04d}-{month:02d}")
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns is not None and _archived_before(path, mtime_ns) > start:
+            files.append(path)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    files.reverse()
+    return files
+
+
+def attach_archive(con: sqlite3.Connection, path: str) -> str:
+    """
+    Attach an archive to a connection unless it already is, detaching the oldest when full.
+
+    Attachments are kept on pooled connections, so the archives of a busy window are only
+    attached once per connection.  Must be called outside of a transaction.
+
+    :param con: The connection to attach to.
+    :param path: The archive file.
+    :return: The schema name the archive is attached as.
+    """
+    schema = "archive_" + Path(path).stem[-7:].replace("-", "_")
+    archives = [name for _, name, _ in con.execute("PRAGMA database_list") if name.startswith("archive_")]
+    if schema in archives:
+        return schema
+    if len(archives) >= con.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        con.execute(f"DETACH DATABASE {archives[0]}")
+    # Read-only connections are opened from a URI, so attach the archive read-only too
+    if con.execute("PRAGMA main.query_only").fetchone()[0]:
+        con.execute(f"ATTACH DATABASE ? AS {schema}", (f"{Path(path).absolute().as_uri()}?mode=ro",))
+    else:
+        con.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+    return schema
+
+
+def _create_archive_schema(con: sqlite3.Connection):
+    """Create the archived tables and the ledger's indexes in the attached ``archive`` from the live schema."""
+    for table in ARCHIVED_TABLES:
+        sql = con.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type='table' AND name=?", (table,)
+        ).fetchone()[0]
+        con.execute(sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS archive.{table}", 1))
+    # History reads the archived ledger by account and time, nothing reads archived transfers by account
+    for name, sql in con.execute(
+        "SELECT name, sql FROM main.sqlite_master WHERE type='index' AND tbl_name='Transactions' AND sql IS NOT NULL"
+    ).fetchall():
+        con.execute(sql.replace(f"CREATE INDEX {name}", f"CREATE INDEX IF NOT EXISTS archive.{name}", 1))
+
+
+def _archive_month(con: sqlite3.Connection, month: str, end: str, batch_size: int) -> int:
+    """Move a month's transfers before ``end`` from the main database into its archive."""
+    path = Path(archive_file(month))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con.execute("ATTACH DATABASE ? AS archive", (str(path),))
+    try:
+        # Rarely written and read-only attached, so a rollback journal rather than WAL
+        con.execute("PRAGMA archive.journal_mode=DELETE")
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            _create_archive_schema(con)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        moved = 0
+        params = {"start": month, "end": min(end, _month_end(month)), "batch_size": batch_size}
+        while True:
+            # One short write transaction per batch, so transfers keep committing meanwhile
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute("DELETE FROM temp.ArchivingTransfers")
+                for statement in ARCHIVE_MOVE_STATEMENTS:
+                    con.execute(statement, params)
+                batch = con.execute("SELECT COUNT(*) FROM temp.ArchivingTransfers").fetchone()[0]
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            moved += batch
+            if batch < batch_size:
+                break
+        # Record the day every archived row is older than, see archive_files_between
+        bound = int(params["end"][:10].replace("-", ""))
+        if bound > con.execute("PRAGMA archive.user_version").fetchone()[0]:
+            con.execute(f"PRAGMA archive.user_version={bound}")
+        return moved
+    finally:
+        con.execute("DETACH DATABASE archive")
+
+
+def archive_transfers(horizon_days: int = ARCHIVE_HORIZON_DAYS,
+                      batch_size: int = ARCHIVE_BATCH_SIZE) -> dict[str, int]:
+    """
+    Move transfers older than the horizon from every shard into the monthly archives.
+
+    The horizon is rounded down to midnight, so a day's transfers are never split between
+    a shard and an archive.  Each batch is copied and deleted in one transaction; rows are
+    copied with ``INSERT OR IGNORE``, so rerunning after a crash between the archive's and
+    the shard's commit only finishes the move.
+
+    :param horizon_days: Transfers older than this many days are archived.
+    :param batch_size: Transfers moved per transaction.
+    :return: How many transfers were archived into each month, as ``{"YYYY-MM": count}``.
+    """
+    cutoff = (date.today() - timedelta(days=horizon_days)).isoformat()
+    archived = {}
+    for db_file in shard_files():
+        con = sqlite3.connect(db_file, timeout=DB_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS ArchivingTransfers (rowid INTEGER PRIMARY KEY)")
+            months = [month for month, in con.execute(
+                "SELECT DISTINCT substr(TransferDateTime, 1, 7) FROM Transfers WHERE TransferDateTime < ?",
+                (cutoff,)
+            )]
+            for month in sorted(months):
+                moved = _archive_month(con, month, cutoff, batch_size)
+                archived[month] = archived.get(month, 0) + moved
+        finally:
+            con.close()
+    return archived
+
+
+def compact_database(db_file: str, min_free_ratio: float = VACUUM_FREE_RATIO) -> bool:
+    """
+    ``VACUUM`` a database file once enough of it is free pages, e.g. after archiving.
+
+    :param db_file: The database file.
+    :param min_free_ratio: Share of free pages from which the file is rebuilt.
+    :return: Whether the file was vacuumed.
+    """
+    con = sqlite3.connect(db_file, timeout=DB_BUSY_TIMEOUT, isolation_level=None)
+    try:
+        pages = con.execute("PRAGMA page_count").fetchone()[0]
+        free = con.execute("PRAGMA freelist_count").fetchone()[0]
+        if not pages or free / pages < min_free_ratio:
+            return False
+        con.execute("VACUUM")
+        # Give the space back to the file system instead of leaving it in the WAL
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+    finally:
+        con.close()
+
+
+def run_maintenance(horizon_days: int = ARCHIVE_HORIZON_DAYS) -> dict:
+    """
+    Forget expired idempotency keys and archive old transfers, then compact every shard
+    that this left with free pages.
+
+    :param horizon_days: Transfers older than this many days are archived.
+    :return: The number of expired keys, the archived counts per month and the files that were vacuumed.
+    """
+    # chatbot.database imports this module, so import it when first needed
+    from chatbot.database import expire_idempotency_keys
+
+    expired = expire_idempotency_keys()
+    archived = archive_transfers(horizon_days)
+    vacuumed = [db_file for db_file in shard_files() if Path(db_file).exists() and compact_database(db_file)]
+    return {"expired_keys": expired, "archived": archived, "vacuumed": vacuumed}
+
+
+class MaintenanceScheduler:
+    """Run :func:`run_maintenance` on a background thread at a fixed interval."""
+
+    def __init__(self, interval: float = MAINTENANCE_INTERVAL):
+        """
+        :param interval: Seconds between the end of one run and the start of the next.
+        """
+        self.interval = interval
+        self.runs = 0
+        self.last_result = None
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+
+    def start(self):
+        """Start the background thread, the first run happens one interval from now."""
+        self._thread.start()
+
+    def close(self):
+        """Stop scheduling runs and wait for a run in progress to finish."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_result = run_maintenance()
+                self.last_run = datetime.now()
+                self.runs += 1
+                print(f"[DEBUG] Maintenance: archived {sum(self.last_result['archived'].values())} transfers, "
+                      f"vacuumed {len(self.last_result['vacuumed'])} files")
+            except Exception as e:
+                print(f"[ERROR] Database maintenance failed: {str(e)}")
+
+
+_scheduler: MaintenanceScheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_maintenance_scheduler(interval: float = MAINTENANCE_INTERVAL) -> MaintenanceScheduler:
+    """
+    Start the shared maintenance scheduler unless it runs already or the interval is 0.
+
+    :param interval: Seconds between runs.
+    :return: The running scheduler, None when disabled.
+    """
+    global _scheduler
+    if interval <= 0:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MaintenanceScheduler(interval)
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,135 @@
+"""Async counterparts of the database and account functions for use on an event loop.
+
+Blocking ``sqlite3`` calls run on a dedicated, bounded thread pool whose workers each keep
+their own connection, so a slow query occupies one worker instead of stalling the loop.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import chatbot.account
+import chatbot.database
+from chatbot.config import DB_EXECUTOR_WORKERS
+from chatbot.models import Account, TransferReceipt
+from chatbot.pool import pin_thread_connections
+from chatbot.shards import db_file_for_user
+from chatbot.transfer_writer import get_transfer_writer
+
+_executor: ThreadPoolExecutor = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    Get the executor that runs database calls, starting it on first use.
+
+    :return: A thread pool of ``DB_EXECUTOR_WORKERS`` threads with pinned connections.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=DB_EXECUTOR_WORKERS,
+                    thread_name_prefix="db",
+                    initializer=pin_thread_connections
+                )
+    return _executor
+
+
+def shutdown_db_executor():
+    """Wait for queued database calls to finish and stop the executor."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run a blocking database function on the database executor.
+
+    :param func: The function to call.
+    :return: Whatever the function returns, its exceptions propagate to the awaiting caller.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def auth_user(user_id: str, password: str) -> bool:
+    """See :func:`chatbot.database.auth_user`."""
+    return await run_db(chatbot.database.auth_user, user_id, password)
+
+
+async def load_accounts(user_id: str) -> list[Account]:
+    """See :func:`chatbot.database.load_accounts`."""
+    return await run_db(chatbot.database.load_accounts, user_id)
+
+
+async def load_account(user_id: str, account_number: str) -> Account:
+    """See :func:`chatbot.database.load_account`."""
+    return await run_db(chatbot.database.load_account, user_id, account_number)
+
+
+async def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Account]:
+    """See :func:`chatbot.database.load_transfer_target_accounts`."""
+    return await run_db(chatbot.database.load_transfer_target_accounts, user_id, from_account)
+
+
+async def load_transaction_history(account_number: str, days: int = 30, user_id: str = None) -> list[dict]:
+    """See :func:`chatbot.database.load_transaction_history`."""
+    return await run_db(chatbot.database.load_transaction_history, account_number, days, user_id)
+
+
+def _read_history(account_number: str, days: int, cursor: tuple[str, str], limit: int, user_id: str) -> list[dict]:
+    return list(chatbot.database.iter_transaction_history(account_number, days, cursor, limit, user_id))
+
+
+async def load_transaction_history_page(account_number: str, days: int = 30,
+                                        cursor: tuple[str, str] = None, limit: int = None,
+                                        user_id: str = None) -> list[dict]:
+    """
+    Read one stretch of history, see :func:`chatbot.database.iter_transaction_history`.
+
+    The whole stretch is read on one worker, so the generator never crosses threads.
+    """
+    return await run_db(_read_history, account_number, days, cursor, limit, user_id)
+
+
+async def load_period_summary(account_number: str, days: int = 30, user_id: str = None) -> dict:
+    """See :func:`chatbot.database.load_period_summary`."""
+    return await run_db(chatbot.database.load_period_summary, account_number, days, user_id)
+
+
+async def list_accounts(user_id: str) -> list[Account]:
+    """See :func:`chatbot.account.list_accounts`."""
+    return await run_db(chatbot.account.list_accounts, user_id)
+
+
+async def get_account(user_id: str, account_number: str) -> Account:
+    """See :func:`chatbot.account.get_account`."""
+    return await run_db(chatbot.account.get_account, user_id, account_number)
+
+
+async def list_transfer_target_accounts(user_id: str, from_account: str) -> list[Account]:
+    """See :func:`chatbot.account.list_transfer_target_accounts`."""
+    return await run_db(chatbot.account.list_transfer_target_accounts, user_id, from_account)
+
+
+async def transfer_between_accounts(user_id: str,
+                                    from_account: str, to_account: str,
+                                    amount: Decimal, idempotency_key: str = None) -> TransferReceipt:
+    """
+    Queue a transfer on the transfer writer and wait for its commit without blocking a thread.
+
+    See :func:`chatbot.account.transfer_between_accounts`.
+    """
+    future = get_transfer_writer(db_file_for_user(user_id)).submit(
+        user_id, from_account, to_account, amount, idempotency_key
+    )
+    receipt = await asyncio.wrap_future(future)
+    if not receipt.replayed:
+        chatbot.account.account_cache.invalidate(user_id)
+    return receipt
@@ -0,0 +1,304 @@
+"""Streaming CSV and JSON-lines import and export of users, accounts and transfers.
+
+Files hold one record per row or line with the field names of ``TABLES``, and money as
+decimal strings such as ``"12.50"``.  Imports insert in ``executemany`` batches with the
+table's secondary indexes dropped and rebuilt at the end, and skip records whose key is
+already loaded, so an interrupted import can simply be run again.  Exports stream from one
+read snapshot per shard and never hold more than one batch in memory.
+"""
+import csv
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+from chatbot.config import DB_SHARDS, DB_BUSY_TIMEOUT, BULK_BATCH_SIZE, BULK_CACHE_SIZE_KB
+from chatbot.migrations import LEDGER_BACKFILL_STATEMENTS, DAILY_BALANCES_REBUILD_STATEMENTS
+from chatbot.money import to_cents, format_cents
+from chatbot.pool import get_read_pool
+from chatbot.shards import db_file_for_user, shard_files
+
+
+@dataclass
+class BulkTable:
+    """How the records of one file map onto one database table."""
+
+    table: str
+    """Name of the database table."""
+
+    fields: list[tuple[str, str, bool]]
+    """``(field, column, is_money)`` in column order, ``field`` being the name used in files."""
+
+    related_tables: list[str]
+    """Other tables written as a side effect, whose indexes are deferred as well."""
+
+    user_field: str = None
+    """Field naming the owning user, None to route records by their ``from_account`` instead."""
+
+    @property
+    def field_names(self) -> list[str]:
+        return [field for field, _, _ in self.fields]
+
+
+TABLES = {
+    "users": BulkTable("UserCredentials", [
+        ("user_id", "UserId", False),
+        ("password", "Password", False),
+    ], [], user_field="user_id"),
+    "accounts": BulkTable("Accounts", [
+        ("account_number", "AccountNumber", False),
+        ("user_id", "UserId", False),
+        ("account_name", "AccountName", False),
+        ("balance", "Balance", True),
+        ("currency", "CurrencyCode", False),
+    ], [], user_field="user_id"),
+    "transfers": BulkTable("Transfers", [
+        ("transaction_number", "TransactionNumber", False),
+        ("from_account", "FromAccountNumber", False),
+        ("to_account", "ToAccountNumber", False),
+        ("datetime", "TransferDateTime", False),
+        ("amount", "Amount", True),
+        ("from_balance", "FromAccountBalance", True),
+        ("to_balance", "ToAccountBalance", True),
+    ], ["Transactions"]),
+}
+"""The tables that can be imported and exported, by the name used on the command line."""
+
+
+def detect_format(path: str, fmt: str = None) -> str:
+    """
+    Decide between ``csv`` and ``jsonl``.
+
+    :param path: The file name, whose extension decides when ``fmt`` is not given.
+    :param fmt: An explicit format.
+    :return: ``"csv"`` or ``"jsonl"``.
+    """
+    fmt = fmt or ("csv" if Path(path).suffix.lower() == ".csv" else "jsonl")
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown bulk format: {fmt!r}")
+    return fmt
+
+
+def read_records(path: str, fmt: str = None) -> Iterator[dict]:
+    """
+    Stream the records of a CSV (with a header row) or JSON-lines file.
+
+    :param path: The file to read.
+    :param fmt: ``"csv"`` or ``"jsonl"``, guessed from the extension when omitted.
+    :return: A generator of one dict per record.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if detect_format(path, fmt) == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _to_row(spec: BulkTable, record: dict, number: int) -> tuple:
+    """Convert one file record into a row in column order."""
+    try:
+        return tuple(to_cents(record[field]) if is_money else record[field]
+                     for field, _, is_money in spec.fields)
+    except KeyError as e:
+        raise ValueError(f"Record {number}: missing field {e.args[0]!r}")
+    except ValueError as e:
+        raise ValueError(f"Record {number}: {e}")
+
+
+def _account_files() -> dict[str, str]:
+    """Map every account number to the shard file that holds it."""
+    files = {}
+    for db_file in shard_files():
+        with get_read_pool(db_file).connection() as con:
+            for account_number, in con.execute("SELECT AccountNumber FROM Accounts"):
+                files[account_number] = db_file
+    return files
+
+
+class _Loader:
+    """Batched inserts into one database file with the secondary indexes deferred."""
+
+    def __init__(self, db_file: str, spec: BulkTable, post_ledger: bool):
+        self.spec = spec
+        self.post_ledger = post_ledger and "Transactions" in spec.related_tables
+        self.tables = [spec.table, *spec.related_tables] if self.post_ledger else [spec.table]
+        self.con = sqlite3.connect(db_file, timeout=DB_BUSY_TIMEOUT, isolation_level=None)
+        self.con.execute(f"PRAGMA cache_size=-{BULK_CACHE_SIZE_KB}")
+        self.con.execute("PRAGMA temp_store=MEMORY")
+        self.sql = (f"INSERT OR IGNORE INTO {spec.table} ({', '.join(c for _, c, _ in spec.fields)}) "
+                    f"VALUES ({', '.join('?' * len(spec.fields))})")
+        self.inserted = 0
+        # Keep the definitions so the indexes can be rebuilt once, after every row is in
+        self.indexes = {}
+        for table in self.tables:
+            self.indexes[table] = self.con.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+                (table,)
+            ).fetchall()
+        self._drop_indexes(self.tables)
+
+    def _drop_indexes(self, tables: list[str]):
+        self.con.execute("BEGIN IMMEDIATE")
+        for table in tables:
+            for name, _ in self.indexes[table]:
+                self.con.execute(f"DROP INDEX IF EXISTS {name}")
+        self.con.execute("COMMIT")
+
+    def _create_indexes(self, tables: list[str]):
+        self.con.execute("BEGIN IMMEDIATE")
+        for table in tables:
+            for _, sql in self.indexes[table]:
+                self.con.execute(sql.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+        self.con.execute("COMMIT")
+
+    def insert(self, rows: list[tuple]):
+        """Insert one batch in its own transaction."""
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.con.total_changes
+            self.con.executemany(self.sql, rows)
+            self.inserted += self.con.total_changes - before
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def finish(self):
+        """Rebuild the deferred indexes and, for transfers, post the ledger and rollups."""
+        self._create_indexes([self.spec.table])
+        if not self.post_ledger:
+            return
+        self.con.execute("BEGIN IMMEDIATE")
+        for statement in LEDGER_BACKFILL_STATEMENTS:
+            self.con.execute(statement)
+        self.con.execute("COMMIT")
+        self._create_indexes(self.tables[1:])
+        self.con.execute("BEGIN IMMEDIATE")
+        for statement in DAILY_BALANCES_REBUILD_STATEMENTS:
+            self.con.execute(statement)
+        self.con.execute("COMMIT")
+
+    def close(self):
+        """Put back any index still missing after a failed import and close the connection."""
+        try:
+            if self.con.in_transaction:
+                self.con.execute("ROLLBACK")
+            self._create_indexes(self.tables)
+        finally:
+            self.con.close()
+
+
+def import_records(table: str, records: Iterable[dict],
+                   batch_size: int = BULK_BATCH_SIZE, post_ledger: bool = True) -> int:
+    """
+    Insert records into the shards that own them.
+
+    Users and accounts go to their user's shard and transfers to the shard of their source account.
+    Imported transfers are history: account balances are left as they are.
+
+    :param table: A key of ``TABLES``.
+    :param records: Dicts with the table's field names, e.g. from :func:`read_records`.
+    :param batch_size: Rows per ``executemany`` and per transaction.
+    :param post_ledger: For transfers, post their ledger rows and rebuild the daily rollups.
+    :return: The number of rows inserted, records already present are skipped.
+    """
+    spec = TABLES[table]
+    user_index = spec.field_names.index(spec.user_field) if spec.user_field else None
+    account_files = _account_files() if user_index is None and DB_SHARDS > 1 else None
+    loaders: dict[str, _Loader] = {}
+    batches: dict[str, list[tuple]] = {}
+    try:
+        for number, record in enumerate(records, 1):
+            row = _to_row(spec, record, number)
+            if user_index is not None:
+                db_file = db_file_for_user(row[user_index])
+            elif account_files is not None:
+                db_file = account_files.get(row[1])
+                if db_file is None:
+                    raise ValueError(f"Record {number}: unknown account {row[1]!r}")
+            else:
+                db_file = db_file_for_user(None)
+            batch = batches.get(db_file)
+            if batch is None:
+                loaders[db_file] = _Loader(db_file, spec, post_ledger)
+                batch = batches[db_file] = []
+            batch.append(row)
+            if len(batch) >= batch_size:
+                loaders[db_file].insert(batch)
+                batch.clear()
+
+        for db_file, batch in batches.items():
+            if batch:
+                loaders[db_file].insert(batch)
+            loaders[db_file].finish()
+        return sum(loader.inserted for loader in loaders.values())
+    finally:
+        for loader in loaders.values():
+            loader.close()
+
+
+def import_file(table: str, path: str, fmt: str = None, post_ledger: bool = True) -> int:
+    """
+    Import a CSV or JSON-lines file, see :func:`import_records`.
+
+    :param table: A key of ``TABLES``.
+    :param path: The file to read.
+    :param fmt: ``"csv"`` or ``"jsonl"``, guessed from the extension when omitted.
+    :param post_ledger: For transfers, post their ledger rows and rebuild the daily rollups.
+    :return: The number of rows inserted.
+    """
+    return import_records(table, read_records(path, fmt), post_ledger=post_ledger)
+
+
+def export_records(table: str, batch_size: int = BULK_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Stream every row of a table from every shard, in storage order.
+
+    Each shard is read in one transaction, so its rows are a consistent snapshot.
+
+    :param table: A key of ``TABLES``.
+    :param batch_size: Rows fetched from SQLite at a time.
+    :return: A generator of dicts with the table's field names and money as decimal strings.
+    """
+    spec = TABLES[table]
+    columns = ", ".join(column for _, column, _ in spec.fields)
+    sql = f"SELECT {columns} FROM {spec.table}"
+    names = spec.field_names
+    money = [is_money for _, _, is_money in spec.fields]
+    for db_file in shard_files():
+        with get_read_pool(db_file).snapshot() as con:
+            cur = con.execute(sql)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield {name: format_cents(value) if is_money else value
+                           for name, value, is_money in zip(names, row, money)}
+
+
+def export_file(table: str, path: str, fmt: str = None) -> int:
+    """
+    Write a table to a CSV or JSON-lines file, see :func:`export_records`.
+
+    :param table: A key of ``TABLES``.
+    :param path: The file to write.
+    :param fmt: ``"csv"`` or ``"jsonl"``, guessed from the extension when omitted.
+    :return: The number of records written.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if detect_format(path, fmt) == "csv":
+            writer = csv.DictWriter(file, TABLES[table].field_names)
+            writer.writeheader()
+            for record in export_records(table):
+                writer.writerow(record)
+                count += 1
+        else:
+            for record in export_records(table):
+                file.write(json.dumps(record))
+                file.write("\n")
+                count += 1
+    return count
@@ -6,6 +6,62 @@ from pathlib import Path
 DB_FILE = os.environ.get("CHATBOT_DB_FILE", "bank.db")
 DB_INIT_SQL = Path(__file__).parent / "init.sql"
 
+# Users are spread over this many database files; shard 0 is DB_FILE, shard N the pattern below
+DB_SHARDS = int(os.environ.get("CHATBOT_DB_SHARDS", "1"))
+DB_SHARD_FILE = os.environ.get(
+    "CHATBOT_DB_SHARD_FILE",
+    str(Path(DB_FILE).with_name(Path(DB_FILE).stem + "-{shard}" + Path(DB_FILE).suffix))
+)
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.environ.get("CHATBOT_DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT = float(os.environ.get("CHATBOT_DB_BUSY_TIMEOUT", "5.0"))
+DB_CACHE_SIZE_KB = int(os.environ.get("CHATBOT_DB_CACHE_SIZE_KB", "8192"))
+DB_MMAP_SIZE = int(os.environ.get("CHATBOT_DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("CHATBOT_DB_STATEMENT_CACHE_SIZE", "256"))
+# NORMAL may lose the last commits on power loss, FULL syncs the WAL on every commit
+DB_SYNCHRONOUS = os.environ.get("CHATBOT_DB_SYNCHRONOUS", "NORMAL")
+
+# Read-only connections used by the account and history reads
+DB_READ_POOL_SIZE = int(os.environ.get("CHATBOT_DB_READ_POOL_SIZE", "16"))
+DB_READ_CACHE_SIZE_KB = int(os.environ.get("CHATBOT_DB_READ_CACHE_SIZE_KB", "32768"))
+
+# Worker threads that run database calls for async callers, each with its own connection
+DB_EXECUTOR_WORKERS = int(os.environ.get("CHATBOT_DB_EXECUTOR_WORKERS", "8"))
+
+# Retries when a write transaction finds the database busy
+DB_BUSY_RETRIES = int(os.environ.get("CHATBOT_DB_BUSY_RETRIES", "6"))
+DB_BUSY_RETRY_BASE_MS = float(os.environ.get("CHATBOT_DB_BUSY_RETRY_BASE_MS", "5"))
+
+# Group commit settings for the transfer writer: the window caps how long the writer keeps
+# taking already queued transfers into one batch, it never waits for new ones to arrive
+TRANSFER_BATCH_WINDOW_MS = float(os.environ.get("CHATBOT_TRANSFER_BATCH_WINDOW_MS", "2"))
+TRANSFER_BATCH_MAX = int(os.environ.get("CHATBOT_TRANSFER_BATCH_MAX", "128"))
+
+# Seconds a transfer's idempotency key is remembered, retries after that transfer again
+IDEMPOTENCY_KEY_TTL = float(os.environ.get("CHATBOT_IDEMPOTENCY_KEY_TTL", "86400"))
+
+# Per-user account cache bounds
+ACCOUNT_CACHE_TTL = float(os.environ.get("CHATBOT_ACCOUNT_CACHE_TTL", "30"))
+ACCOUNT_CACHE_MAX_USERS = int(os.environ.get("CHATBOT_ACCOUNT_CACHE_MAX_USERS", "10000"))
+
+# Bulk import and export
+BULK_BATCH_SIZE = int(os.environ.get("CHATBOT_BULK_BATCH_SIZE", "50000"))
+BULK_CACHE_SIZE_KB = int(os.environ.get("CHATBOT_BULK_CACHE_SIZE_KB", "262144"))
+
+# Monthly archive databases for transfers older than the horizon, shared by every shard
+ARCHIVE_DIR = os.environ.get("CHATBOT_ARCHIVE_DIR", str(Path(DB_FILE).with_name("archive")))
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("CHATBOT_ARCHIVE_HORIZON_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("CHATBOT_ARCHIVE_BATCH_SIZE", "20000"))
+
+# Background archiving and compaction, seconds between runs (0 disables)
+MAINTENANCE_INTERVAL = float(os.environ.get("CHATBOT_MAINTENANCE_INTERVAL", "3600"))
+# A file is vacuumed once this share of its pages is free
+VACUUM_FREE_RATIO = float(os.environ.get("CHATBOT_VACUUM_FREE_RATIO", "0.25"))
+
+# Largest page the get_transaction_history tool will return
+MAX_HISTORY_PAGE = int(os.environ.get("CHATBOT_MAX_HISTORY_PAGE", "100"))
+
 # Account number mappings (for client-side account name resolution)
 ACCOUNT_MAPPINGS = {
     "checking": "1234567890",
@@ -17,6 +73,14 @@ ACCOUNT_MAPPINGS = {
     "credit card": "3456789012"
 }
 
+# Web chat sessions, one per signed-in user
+SESSION_MAX_USERS = int(os.environ.get("CHATBOT_SESSION_MAX_USERS", "1000"))
+SESSION_IDLE_TTL = float(os.environ.get("CHATBOT_SESSION_IDLE_TTL", "1800"))
+SESSION_HISTORY_LIMIT = int(os.environ.get("CHATBOT_SESSION_HISTORY_LIMIT", "50"))
+
+# Users allowed to read the web app's session and MCP reports, comma separated
+ADMIN_USERS = {user.strip() for user in os.environ.get("CHATBOT_ADMIN_USERS", "").split(",") if user.strip()}
+
 # Default user for testing
 DEFAULT_USER_ID = "test1"
 
@@ -24,7 +88,24 @@ DEFAULT_USER_ID = "test1"
 VECTOR_DB_DIR = os.environ.get("VECTOR_DB_DIR", "./chroma_db")
 DOCS_DIRECTORY = os.environ.get("DOCS_DIRECTORY", "./rbc_documents")
 
+# Answers to banking questions reused for the same or a near-identical question: how
+# many are kept, for how long, and how close a question's embedding must be
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", "0.93"))
+# Share of content words two questions must have in common to share an answer, 1 is all
+ANSWER_CACHE_MIN_TERM_OVERLAP = float(os.environ.get("ANSWER_CACHE_MIN_TERM_OVERLAP", "1.0"))
+
 # API settings
 MCP_HOST = os.environ.get("MCP_HOST", "127.0.0.1")
 MCP_PORT = int(os.environ.get("MCP_PORT", "8050"))
 MCP_NAME = os.environ.get("MCP_NAME", "RBC-RAG-MCP")
+
+# MCP client session pool: sessions kept open, seconds between liveness probes and before
+# a probe or tool call gives up, and the reconnect backoff bounds
+MCP_POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "4"))
+MCP_PROBE_INTERVAL = float(os.environ.get("MCP_PROBE_INTERVAL", "5"))
+MCP_PROBE_TIMEOUT = float(os.environ.get("MCP_PROBE_TIMEOUT", "2"))
+MCP_CALL_TIMEOUT = float(os.environ.get("MCP_CALL_TIMEOUT", "30"))
+MCP_RECONNECT_BASE = float(os.environ.get("MCP_RECONNECT_BASE", "0.5"))
+MCP_RECONNECT_MAX = float(os.environ.get("MCP_RECONNECT_MAX", "30"))
@@ -7,6 +7,9 @@ COMMANDS = {
     "user": ["user", "switch user", "change user"]
 }
 
+# Intents detected with at least this confidence call their tool directly instead of the model
+FAST_PATH_CONFIDENCE = 0.8
+
 
 # System instructions template
 SYSTEM_INSTRUCTIONS = """
@@ -21,7 +24,8 @@ IMPORTANT INSTRUCTIONS:
    - For checking balances: use get_account_balance with account_number="1234567890" for checking/chequing or "2345678901" for savings or "3456789012" for credit card
    - For listing accounts: use list_user_accounts ONLY when explicitly asked to see accounts
    - For transfers: use transfer_funds with exact account numbers and amount as a string without $ or commas
-   - For transaction history: use get_transaction_history with the exact account number
+   - For transaction history: use get_transaction_history with the exact account number; when the user asks to see more, call it again for the same account with the cursor from the previous history reply
+   - For statements, totals or the balance over a period: use get_period_summary with the exact account number
 
 4. For general banking questions about RBC products and services, use answer_banking_question. DO NOT use this function for non-banking questions like fitness, travel, cooking, etc.
 
@@ -148,7 +152,7 @@ TOOL_DEFINITIONS = [
     },
     {
         "name": "get_transaction_history",
-        "description": "Get the transaction history for a specific account.",
+        "description": "Get one page of the transaction history for a specific account, newest first.",
         "parameters": {
             "type": "object",
             "properties": {
@@ -163,6 +167,36 @@ TOOL_DEFINITIONS = [
                 "days": {
                     "type": "integer",
                     "description": "Number of days of history to retrieve (default: 30)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of transactions to return in this page (default: 5)"
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "The cursor shown in the previous transaction history reply (after 'cursor:'), only when the user asks to see more transactions"
+                }
+            },
+            "required": ["user_id", "account_number"]
+        }
+    },
+    {
+        "name": "get_period_summary",
+        "description": "Summarize an account over a period: opening and closing balance, total debits and credits, and the number of transactions. Use for statements and questions like how much was spent this year.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "The ID of the user (will be automatically filled)"
+                },
+                "account_number": {
+                    "type": "string",
+                    "description": "The account number (must be exact account number, not name): 1234567890 for checking, 2345678901 for savings, 3456789012 for credit card"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of days in the period, ending today (default: 30)"
                 }
             },
             "required": ["user_id", "account_number"]
@@ -170,9 +204,38 @@ TOOL_DEFINITIONS = [
     }
 ]
 
+# Tools that only read, several in one model response run concurrently; any other tool
+# runs alone, in the order the model called it
+READ_ONLY_TOOLS = {
+    "answer_banking_question", "list_user_accounts", "list_target_accounts",
+    "get_account_balance", "get_transaction_history", "get_period_summary"
+}
+MAX_CONCURRENT_TOOL_CALLS = 8
+
+# Seconds a read-only tool result is reused for the same user and arguments, tools not
+# listed are never cached; transfers drop the entries of the accounts they touch
+TOOL_CACHE_TTLS = {
+    "get_account_balance": 15,
+    "list_user_accounts": 60,
+    "list_target_accounts": 60,
+    "get_transaction_history": 30,
+    "get_period_summary": 60
+}
+TOOL_CACHE_MAX_ENTRIES = 4096
+
 # Model configuration
 MODEL_CONFIG = {
     "model_name": "gemini-1.5-pro",
     "temperature": 0.1,
     "tool_calling_config": {"mode": "AUTO"}
 }
+
+# Model clients kept per configuration, and users whose system instructions are kept formatted
+MODEL_CACHE_SIZE = 8
+SYSTEM_INSTRUCTIONS_CACHE_SIZE = 1024
+
+# Conversation memory: estimated tokens of recent messages sent verbatim, and of the
+# running summary of older ones; the last few messages are always sent verbatim
+CONVERSATION_TOKEN_BUDGET = 2000
+CONVERSATION_SUMMARY_TOKENS = 400
+CONVERSATION_MIN_RECENT = 2
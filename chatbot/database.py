@@ -1,12 +1,54 @@
+import heapq
+import itertools
+import random
 import sqlite3
+import time
 import uuid
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
 from decimal import Decimal
 from pathlib import Path
-from chatbot.models import Account
-from chatbot.config import DB_FILE, DB_INIT_SQL
+from chatbot.models import Account, TransferReceipt
+from chatbot.money import to_cents, from_cents, format_cents
+from chatbot.config import DB_SHARDS, DB_INIT_SQL, DB_BUSY_RETRIES, DB_BUSY_RETRY_BASE_MS, IDEMPOTENCY_KEY_TTL
+from chatbot.pool import get_pool, get_read_pool
+from chatbot.migrations import migrate, LEDGER_BACKFILL_STATEMENTS, DAILY_BALANCES_REBUILD_STATEMENTS
+from chatbot.shards import db_file_for_user, shard_files, prune_foreign_users
+from chatbot.archive import archive_files_between, attach_archive
+
+LEDGER_DEBIT = "DR"
+"""``TransactionTypeCode`` of the ledger row taking money out of an account."""
+
+LEDGER_CREDIT = "CR"
+"""``TransactionTypeCode`` of the ledger row putting money into an account."""
+
+
+class TransferError(Exception):
+    """Raised when a transfer cannot be applied."""
+
+
+class AccountNotFoundError(TransferError):
+    """Raised when a transfer names an account the user does not own."""
+
+
+class InsufficientFundsError(TransferError):
+    """Raised when the source account balance does not cover the transfer."""
+
+
+class IdempotencyKeyReusedError(TransferError):
+    """Raised when an idempotency key that is still remembered comes back with a different transfer."""
+
+
+def account_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Account:
+    """
+    Build an account straight from an ``(AccountNumber, AccountName, Balance)`` row.
+
+    :param cursor: The cursor that produced the row.
+    :param row: The raw row tuple.
+    :return: The account.
+    """
+    return Account(*row)
 
 
 def auth_user(user_id: str, password: str) -> bool:
@@ -18,11 +60,9 @@ def auth_user(user_id: str, password: str) -> bool:
     :return: True if user ID and password are matched, False otherwise.
     """
     sql = "SELECT UserId FROM UserCredentials WHERE UserId=:user_id AND Password=:password"
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id, "password": password})
-    authenticated = cur.fetchone() is not None
-    con.close()
+    with get_pool(db_file_for_user(user_id)).connection() as con:
+        cur = con.execute(sql, {"user_id": user_id, "password": password})
+        authenticated = cur.fetchone() is not None
     return authenticated
 
 
@@ -34,22 +74,28 @@ def load_accounts(user_id: str) -> list[Account]:
     :return: All the accounts that belong the the user
     """
     sql = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id})
-    rows = cur.fetchall()
-    accounts = []
-    for row in rows:
-        account = Account()
-        account.account_number = row['AccountNumber']
-        account.account_name = row['AccountName']
-        account.balance = Decimal(str(row['Balance']))
-        accounts.append(account)
-    con.close()
+    with get_read_pool(db_file_for_user(user_id)).connection() as con:
+        cur = con.cursor()
+        cur.row_factory = account_row_factory
+        accounts = cur.execute(sql, {"user_id": user_id}).fetchall()
     return accounts
 
 
+def load_account(user_id: str, account_number: str) -> Account:
+    """
+    Query a single account of the specified user by its account number.
+
+    :param user_id: The user ID of the account owner
+    :param account_number: The account number to look up.
+    :return: The account, or None if the user has no such account.
+    """
+    sql = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE AccountNumber=:account_number AND UserId=:user_id"
+    with get_read_pool(db_file_for_user(user_id)).connection() as con:
+        cur = con.cursor()
+        cur.row_factory = account_row_factory
+        return cur.execute(sql, {"user_id": user_id, "account_number": account_number}).fetchone()
+
+
 def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Account]:
     """
     Query accounts that the specified account can trasfer fund to.
@@ -63,25 +109,206 @@ def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Accou
     FROM Accounts 
     WHERE UserId=:user_id AND AccountNumber!=:from_account
     """
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id, "from_account": from_account})
-    rows = cur.fetchall()
-    accounts = []
-    for row in rows:
-        account = Account()
-        account.account_number = row['AccountNumber']
-        account.account_name = row['AccountName']
-        account.balance = Decimal(str(row['Balance']))
-        accounts.append(account)
-    con.close()
+    with get_read_pool(db_file_for_user(user_id)).connection() as con:
+        cur = con.cursor()
+        cur.row_factory = account_row_factory
+        accounts = cur.execute(sql, {"user_id": user_id, "from_account": from_account}).fetchall()
     return accounts
 
 
+def is_busy_error(error: sqlite3.OperationalError) -> bool:
+    """
+    Tell whether an error means another connection holds the lock we need.
+
+    :param error: The error raised by sqlite3.
+    :return: True for ``SQLITE_BUSY`` and ``SQLITE_LOCKED``, including their extended codes.
+    """
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def begin_immediate(con: sqlite3.Connection):
+    """
+    Open a write transaction, taking the write lock up front.
+
+    When the database stays busy past the connection's busy timeout the attempt is
+    retried up to ``DB_BUSY_RETRIES`` times, sleeping a random fraction of an
+    exponentially growing delay so that competing writers do not retry in lockstep.
+
+    :param con: A connection in autocommit mode.
+    """
+    for attempt in range(DB_BUSY_RETRIES + 1):
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if attempt == DB_BUSY_RETRIES or not is_busy_error(e):
+                raise
+            time.sleep(random.uniform(0, DB_BUSY_RETRY_BASE_MS * (2 ** attempt)) / 1000)
+
+
+def apply_transfer(cur: sqlite3.Cursor, user_id: str,
+                   from_account: str, to_account: str,
+                   amount: Decimal, idempotency_key: str = None) -> TransferReceipt:
+    """
+    Run the statements of one transfer on a cursor whose connection already holds a transaction.
+
+    Both balance changes are guarded ``UPDATE ... RETURNING`` statements, so the new balances
+    come back without re-reading the accounts and an overdraft or unknown account matches no
+    row instead of silently recording a transfer.  The transfer is recorded in ``Transfers``
+    and posted as a debit and a credit row to the ``Transactions`` ledger, and both rows are
+    added to the day's ``DailyBalances`` rollups.  Committing or rolling back is left to the
+    caller, so several transfers can share one commit; after an error the caller must roll back.
+
+    With an idempotency key the transfer's receipt is stored under the key in the same
+    transaction.  While the key is remembered, the same transfer with the same key returns
+    the stored receipt and writes nothing.  Concurrent duplicates are safe because the
+    caller's write transaction serializes them: the second one sees the first one's key.
+    A failed transfer stores no key, so retrying it runs it again.
+
+    :param cur: A cursor inside an open transaction.
+    :param user_id: The user ID of the account owner
+    :param from_account: The account number that the fund would be transferred from.
+    :param to_account: The account number that the fund would be transferred to.
+    :param amount: The amount that is going to be transfered.
+    :param idempotency_key: Client-chosen key that makes retries of this transfer safe, None for no deduplication.
+    :return: The transaction number and the balances of both accounts after the transfer.
+    :raises IdempotencyKeyReusedError: When the key was used for a different transfer.
+    """
+    # Work in integer cents so SQLite arithmetic and the balance guard are exact
+    amount_cents = to_cents(amount)
+    if amount_cents <= 0:
+        raise TransferError(f"Transfer amount must be positive, got {amount}")
+    if from_account == to_account:
+        raise TransferError("Cannot transfer between the same account")
+    
+    now = datetime.now()
+    if idempotency_key is not None:
+        stored = cur.execute(
+            """
+            SELECT FromAccountNumber, ToAccountNumber, Amount,
+                   TransactionNumber, FromAccountBalance, ToAccountBalance
+            FROM IdempotencyKeys
+            WHERE UserId=? AND IdempotencyKey=? AND ExpiresAt>?
+            """,
+            (user_id, idempotency_key, now.isoformat())
+        ).fetchone()
+        if stored is not None:
+            if stored[:3] != (from_account, to_account, amount_cents):
+                raise IdempotencyKeyReusedError(f"Idempotency key {idempotency_key} was used for a different transfer.")
+            return TransferReceipt(
+                transaction_number=stored[3],
+                from_balance=from_cents(stored[4]),
+                to_balance=from_cents(stored[5]),
+                replayed=True
+            )
+    
+    # Deduct from source account, only when it belongs to the user and can cover the amount
+    rows = cur.execute(
+        """
+        UPDATE Accounts SET Balance = Balance - :amount
+        WHERE UserId=:user_id AND AccountNumber=:account_number AND Balance >= :amount
+        RETURNING Balance
+        """,
+        {"amount": amount_cents, "user_id": user_id, "account_number": from_account}
+    ).fetchall()
+    if not rows:
+        cur.execute("SELECT 1 FROM Accounts WHERE UserId=? AND AccountNumber=?", (user_id, from_account))
+        if cur.fetchone() is None:
+            raise AccountNotFoundError(f"Account {from_account} not found.")
+        raise InsufficientFundsError(f"Insufficient funds in account {from_account}.")
+    from_account_balance = rows[0][0]
+    
+    # Add to destination account
+    rows = cur.execute(
+        """
+        UPDATE Accounts SET Balance = Balance + :amount
+        WHERE UserId=:user_id AND AccountNumber=:account_number
+        RETURNING Balance
+        """,
+        {"amount": amount_cents, "user_id": user_id, "account_number": to_account}
+    ).fetchall()
+    if not rows:
+        raise AccountNotFoundError(f"Account {to_account} not found.")
+    to_account_balance = rows[0][0]
+    
+    # Record the transfer with balances
+    transaction_id = str(uuid.uuid4())
+    current_time = now.isoformat()
+    
+    cur.execute(
+        """
+        INSERT INTO Transfers (
+            TransactionNumber, FromAccountNumber, ToAccountNumber, 
+            TransferDateTime, Amount, FromAccountBalance, ToAccountBalance
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (transaction_id, from_account, to_account, current_time, 
+         amount_cents, from_account_balance, to_account_balance)
+    )
+    
+    # Post both sides to the per-account ledger that history is read from
+    cur.execute(
+        """
+        INSERT INTO Transactions (
+            TransactionNumber, AccountNumber, OtherAccountNumber,
+            TransactionDateTime, TransactionTypeCode, Amount, BalanceAfter
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?), (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (transaction_id, from_account, to_account, current_time,
+         LEDGER_DEBIT, -amount_cents, from_account_balance,
+         transaction_id, to_account, from_account, current_time,
+         LEDGER_CREDIT, amount_cents, to_account_balance)
+    )
+    
+    # Roll both sides into today's per-account totals
+    cur.execute(
+        """
+        INSERT INTO DailyBalances (
+            AccountNumber, Day, OpeningBalance, ClosingBalance,
+            DebitTotal, CreditTotal, TransactionCount
+        )
+        VALUES (?, ?, ?, ?, ?, 0, 1), (?, ?, ?, ?, 0, ?, 1)
+        ON CONFLICT (AccountNumber, Day) DO UPDATE SET
+            ClosingBalance = excluded.ClosingBalance,
+            DebitTotal = DebitTotal + excluded.DebitTotal,
+            CreditTotal = CreditTotal + excluded.CreditTotal,
+            TransactionCount = TransactionCount + 1
+        """,
+        (from_account, current_time[:10], from_account_balance + amount_cents,
+         from_account_balance, amount_cents,
+         to_account, current_time[:10], to_account_balance - amount_cents,
+         to_account_balance, amount_cents)
+    )
+    
+    # Remember the outcome under the key, replacing an expired entry
+    if idempotency_key is not None:
+        cur.execute(
+            """
+            INSERT OR REPLACE INTO IdempotencyKeys (
+                UserId, IdempotencyKey, FromAccountNumber, ToAccountNumber, Amount,
+                TransactionNumber, FromAccountBalance, ToAccountBalance, ExpiresAt
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (user_id, idempotency_key, from_account, to_account, amount_cents, transaction_id,
+             from_account_balance, to_account_balance,
+             (now + timedelta(seconds=IDEMPOTENCY_KEY_TTL)).isoformat())
+        )
+    return TransferReceipt(
+        transaction_number=transaction_id,
+        from_balance=from_cents(from_account_balance),
+        to_balance=from_cents(to_account_balance)
+    )
+
+
 def transfer_fund_between_accounts(user_id: str,
                                    from_account: str, to_account: str,
-                                   amount: Decimal):
+                                   amount: Decimal, idempotency_key: str = None) -> TransferReceipt:
     """
     Deduct fund from one account then add to the other account all under the same owner
     
@@ -89,6 +316,9 @@ def transfer_fund_between_accounts(user_id: str,
     :param from_account: The account number or account name that the fund would be transferred from.
     :param to_account: The account number or account name that the fund would be transferred to.
     :param amount: The amount that is going to be transfered.
+    :param idempotency_key: Client-chosen key that makes retries safe, see :func:`apply_transfer`.
+    :return: The transaction number and the balances of both accounts after the transfer.
+    :raises TransferError: When the accounts or the amount do not allow the transfer.
     """
     # Debug the parameters
     print(f"[DEBUG] transfer_fund_between_accounts: user_id={user_id}, from={from_account}, to={to_account}, amount={amount} (type: {type(amount)})")
@@ -97,92 +327,325 @@ def transfer_fund_between_accounts(user_id: str,
     if not isinstance(amount, Decimal):
         amount = Decimal(str(amount))
     
-    con = sqlite3.connect(DB_FILE)
+    pool = get_pool(db_file_for_user(user_id))
+    con = pool.acquire()
     cur = con.cursor()
     
     try:
-        # Start a transaction
-        con.execute("BEGIN TRANSACTION")
-        
-        # Convert amount to string for SQLite
-        amount_str = str(amount)
-        
-        # Deduct from source account
-        cur.execute(
-            "UPDATE Accounts SET Balance = Balance - ? WHERE UserId=? AND AccountNumber=?",
-            (amount_str, user_id, from_account)
-        )
-        
-        # Add to destination account
-        cur.execute(
-            "UPDATE Accounts SET Balance = Balance + ? WHERE UserId=? AND AccountNumber=?",
-            (amount_str, user_id, to_account)
-        )
+        # Take the write lock before reading any balance
+        begin_immediate(con)
         
-        # Get the updated balances after the transfer
-        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", 
-                   (user_id, from_account))
-        from_account_balance = cur.fetchone()[0]
-        
-        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", 
-                   (user_id, to_account))
-        to_account_balance = cur.fetchone()[0]
-        
-        # Record the transfer with balances
-        import uuid
-        import datetime
-        transaction_id = str(uuid.uuid4())
-        current_time = datetime.datetime.now().isoformat()
-        
-        cur.execute(
-            """
-            INSERT INTO Transfers (
-                TransactionNumber, FromAccountNumber, ToAccountNumber, 
-                TransferDateTime, Amount, FromAccountBalance, ToAccountBalance
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (transaction_id, from_account, to_account, current_time, 
-             amount_str, from_account_balance, to_account_balance)
-        )
+        receipt = apply_transfer(cur, user_id, from_account, to_account, amount, idempotency_key)
         
         # Commit the transaction
         con.commit()
-        print(f"[DEBUG] Transfer successful: {amount_str} from {from_account} to {to_account}")
+        if receipt.replayed:
+            print(f"[DEBUG] Transfer already done for idempotency key {idempotency_key}: {receipt.transaction_number}")
+        else:
+            print(f"[DEBUG] Transfer successful: {amount} from {from_account} to {to_account}")
+        return receipt
     except Exception as e:
         # Rollback in case of error
         con.rollback()
         print(f"[ERROR] Database error during transfer: {str(e)}")
         raise e
     finally:
-        con.close()
+        pool.release(con)
+
+
+HISTORY_PAGE_SIZE = 200
+"""Rows read per query while streaming history, bounding memory regardless of account activity."""
+
+HISTORY_CURSOR_START = ("9999-12-31T23:59:59", "")
+"""Keyset position that sorts after every stored transaction."""
+
+
+def encode_history_cursor(transaction: dict) -> str:
+    """
+    Build an opaque cursor that resumes history right after the given transaction.
+
+    :param transaction: A dict yielded by :func:`iter_transaction_history`.
+    :return: The cursor string.
+    """
+    return f"{transaction['timestamp']}|{transaction['transaction_id']}"
+
+
+def decode_history_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Split a cursor built by :func:`encode_history_cursor`.
+
+    :param cursor: The cursor string.
+    :return: The ``(TransactionDateTime, TransactionNumber)`` keyset position.
+    """
+    transfer_datetime, separator, transaction_number = cursor.partition("|")
+    if not separator or not transfer_datetime:
+        raise ValueError(f"Invalid history cursor: {cursor!r}")
+    return transfer_datetime, transaction_number
+
+
+def _iter_ledger_rows(pool, archive: str, params: dict, limit: int):
+    """Stream one account's ledger rows from the live table or one archive, in keyset pages."""
+    sql = """
+    SELECT TransactionNumber, TransactionDateTime, TransactionTypeCode,
+           Amount, OtherAccountNumber, BalanceAfter
+    FROM {schema}.Transactions
+    WHERE AccountNumber=:account_number AND TransactionDateTime>=:start_date
+      AND (TransactionDateTime, TransactionNumber) < (:cursor_datetime, :cursor_number)
+    ORDER BY TransactionDateTime DESC, TransactionNumber DESC
+    LIMIT :page_size
+    """
+    params = dict(params)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = HISTORY_PAGE_SIZE if remaining is None else min(remaining, HISTORY_PAGE_SIZE)
+        with pool.connection() as con:
+            schema = "main" if archive is None else attach_archive(con, archive)
+            rows = con.execute(sql.format(schema=schema), {**params, "page_size": page_size}).fetchall()
+
+        yield from rows
+        if len(rows) < page_size:
+            return
+        if remaining is not None:
+            remaining -= len(rows)
+        params["cursor_number"], params["cursor_datetime"] = rows[-1][0], rows[-1][1]
+
+
+def iter_transaction_history(account_number: str, days: int = 30,
+                             cursor: tuple[str, str] = None, limit: int = None,
+                             user_id: str = None):
+    """
+    Stream the transfers into and out of an account over the last few days, newest first.
+
+    History is read from the account's own rows in the ``Transactions`` ledger, a single
+    range scan on its covering (account, datetime) index.  Rows are read in keyset pages
+    of at most ``HISTORY_PAGE_SIZE`` ordered by ``(TransactionDateTime, TransactionNumber)``,
+    and no connection is held between pages.  When the window reaches back into archived
+    months, the overlapping monthly archives are attached and read the same way, newest
+    month first, and merged with the live rows.
+
+    :param account_number: The account number whose history is requested.
+    :param days: How many days back from now to include.
+    :param cursor: Resume strictly after this ``(TransactionDateTime, TransactionNumber)`` position.
+    :param limit: Stop after this many rows, None streams the whole window.
+    :param user_id: The user asking, selects the shard to read from and must own the account.
+    :return: A generator of dicts, one per transfer, with the amount signed from the account's point of view,
+             empty if the account does not exist or belongs to another user.
+    """
+    pool = get_read_pool(db_file_for_user(user_id))
+    with pool.connection() as con:
+        owned = con.execute(
+            "SELECT 1 FROM Accounts WHERE AccountNumber=? AND UserId=?", (account_number, user_id)
+        ).fetchone()
+    if owned is None:
+        return
+    now = datetime.now()
+    start_date = (now - timedelta(days=days)).isoformat()
+    cursor_datetime, cursor_number = cursor or HISTORY_CURSOR_START
+    params = {
+        "account_number": account_number,
+        "start_date": start_date,
+        "cursor_datetime": cursor_datetime,
+        "cursor_number": cursor_number,
+    }
+    rows = _iter_ledger_rows(pool, None, params, limit)
+    archives = archive_files_between(start_date, min(cursor_datetime, now.isoformat()))
+    if archives:
+        # Months never overlap, so the archives chain newest first and an older one is only
+        # read once the page reaches it; live rows can be of any age and are merged in
+        archived = itertools.chain.from_iterable(
+            _iter_ledger_rows(pool, archive, params, limit) for archive in archives
+        )
+        rows = itertools.islice(heapq.merge(rows, archived, key=lambda row: (row[1], row[0]), reverse=True), limit)
+
+    for transaction_number, transaction_datetime, type_code, amount, other_account, balance_after in rows:
+        debit = type_code == LEDGER_DEBIT
+        yield {
+            "transaction_id": transaction_number,
+            "date": transaction_datetime.split('T')[0],
+            "timestamp": transaction_datetime,
+            "description": f"Transfer to {other_account}" if debit else f"Transfer from {other_account}",
+            "amount": format_cents(amount),
+            "transaction_type": "debit" if debit else "credit",
+            "balance_after": format_cents(balance_after)
+        }
+
+
+def load_transaction_history(account_number: str, days: int = 30, user_id: str = None) -> list[dict]:
+    """
+    Query the whole transfer history of an account over the last few days, newest first.
+
+    :param account_number: The account number whose history is requested.
+    :param days: How many days back from now to include.
+    :param user_id: The user asking, selects the shard to read from and must own the account.
+    :return: One dict per transfer, see :func:`iter_transaction_history`.
+    """
+    return list(iter_transaction_history(account_number, days, user_id=user_id))
+
+
+def backfill_transactions_ledger() -> int:
+    """
+    Post ledger rows for every transfer that does not have them yet, e.g. transfers loaded by hand.
+
+    :return: The number of ledger rows written across all shards.
+    """
+    written = 0
+    for db_file in shard_files():
+        with get_pool(db_file).connection() as con:
+            begin_immediate(con)
+            try:
+                before = con.total_changes
+                for statement in LEDGER_BACKFILL_STATEMENTS:
+                    con.execute(statement)
+                written += con.total_changes - before
+                con.execute("COMMIT")
+            except Exception:
+                con.rollback()
+                raise
+    return written
+
+
+def expire_idempotency_keys() -> int:
+    """
+    Forget the idempotency keys whose time to live has passed.
+
+    :return: The number of keys deleted across all shards.
+    """
+    deleted = 0
+    now = datetime.now().isoformat()
+    for db_file in shard_files():
+        with get_pool(db_file).connection() as con:
+            begin_immediate(con)
+            try:
+                deleted += con.execute("DELETE FROM IdempotencyKeys WHERE ExpiresAt<=?", (now,)).rowcount
+                con.execute("COMMIT")
+            except Exception:
+                con.rollback()
+                raise
+    return deleted
+
+
+def load_period_summary(account_number: str, days: int = 30, user_id: str = None) -> dict:
+    """
+    Summarize an account over the last few days from its daily rollups.
+
+    Totals come from the account's ``DailyBalances`` rows in the period, one per day with
+    activity, so the cost grows with the number of days rather than the number of transfers.
+
+    :param account_number: The account number to summarize.
+    :param days: How many days back from today to include, today included.
+    :param user_id: The user asking, selects the shard to read from and must own the account.
+    :return: The period's opening and closing balances, debit and credit totals and transfer count,
+             or None if the account does not exist or belongs to another user.
+    """
+    start_day = (date.today() - timedelta(days=days - 1)).isoformat()
+    # One snapshot, so the totals and both balances describe the same moment
+    with get_read_pool(db_file_for_user(user_id)).snapshot() as con:
+        balance = con.execute(
+            "SELECT Balance FROM Accounts WHERE AccountNumber=? AND UserId=?", (account_number, user_id)
+        ).fetchone()
+        if balance is None:
+            return None
+        debits, credits, count, active_days = con.execute(
+            """
+            SELECT COALESCE(SUM(DebitTotal), 0), COALESCE(SUM(CreditTotal), 0),
+                   COALESCE(SUM(TransactionCount), 0), COUNT(*)
+            FROM DailyBalances
+            WHERE AccountNumber=? AND Day>=?
+            """,
+            (account_number, start_day)
+        ).fetchone()
+        latest = con.execute(
+            "SELECT ClosingBalance FROM DailyBalances WHERE AccountNumber=? ORDER BY Day DESC LIMIT 1",
+            (account_number,)
+        ).fetchone()
+        closing = latest[0] if latest else balance[0]
+        opening = closing
+        if active_days:
+            opening = con.execute(
+                "SELECT OpeningBalance FROM DailyBalances WHERE AccountNumber=? AND Day>=? ORDER BY Day LIMIT 1",
+                (account_number, start_day)
+            ).fetchone()[0]
+
+    return {
+        "account_number": account_number,
+        "start_date": start_day,
+        "end_date": date.today().isoformat(),
+        "opening_balance": format_cents(opening),
+        "closing_balance": format_cents(closing),
+        "total_debits": format_cents(debits),
+        "total_credits": format_cents(credits),
+        "transaction_count": count,
+        "active_days": active_days
+    }
+
+
+def rebuild_daily_balances() -> int:
+    """
+    Recompute every daily rollup from the ``Transactions`` ledger, e.g. after loading transfers by hand.
+
+    :return: The number of rollup rows written across all shards.
+    """
+    written = 0
+    for db_file in shard_files():
+        with get_pool(db_file).connection() as con:
+            begin_immediate(con)
+            try:
+                for statement in DAILY_BALANCES_REBUILD_STATEMENTS:
+                    con.execute(statement)
+                written += con.execute("SELECT COUNT(*) FROM DailyBalances").fetchone()[0]
+                con.execute("COMMIT")
+            except Exception:
+                con.rollback()
+                raise
+    return written
 
 
 def init_db():
     """
-    Create the database and add inital test data.
+    Create the database and add inital test data, then apply any pending schema migrations.
+
+    With several shards every shard file is brought up to date, and a new shard keeps only
+    the test users that belong on it.
+    """
+    for shard, db_file in enumerate(shard_files()):
+        init_db_file(db_file, shard)
+
+
+def init_db_file(db_file: str, shard: int = 0):
+    """
+    Create or migrate one database file.
+
+    :param db_file: Path of the database file.
+    :param shard: The shard index the file holds.
     """
     # Check if database file already exists and has tables
-    db_exists = Path(DB_FILE).exists()
+    db_exists = Path(db_file).exists()
     
     if db_exists:
         # Check if tables already exist
-        con = sqlite3.connect(DB_FILE)
+        con = sqlite3.connect(db_file, isolation_level=None)
         cur = con.cursor()
         cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='UserCredentials'")
         table_exists = cur.fetchone() is not None
-        con.close()
         
         if table_exists:
-            print(f"Database {DB_FILE} already initialized.")
+            migrate(con)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.close()
+            print(f"Database {db_file} already initialized.")
             return
+        con.close()
     
     # Create and initialize the database
     with open(DB_INIT_SQL) as sql_file:
         sql = sql_file.read()
-        con = sqlite3.connect(DB_FILE)
+        con = sqlite3.connect(db_file, isolation_level=None)
         cur = con.cursor()
         cur.executescript(sql)
-        con.commit()
+        migrate(con)
+        if DB_SHARDS > 1:
+            prune_foreign_users(con, shard)
+        # WAL is persistent, so read-only connections get snapshots from the start
+        con.execute("PRAGMA journal_mode=WAL")
         con.close()
-        print(f"Database {DB_FILE} initialized successfully.")
+        print(f"Database {db_file} initialized successfully.")
@@ -1,3 +1,6 @@
+-- Base schema, schema version 0.  Later changes live in chatbot/migrations.py.
+-- Money here is in dollars; migration 3 converts every amount to integer cents.
+
 
 CREATE TABLE IF NOT EXISTS UserCredentials (
   UserId   TEXT    NOT NULL PRIMARY KEY,
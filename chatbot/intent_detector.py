@@ -1,30 +1,182 @@
 """Intent detection for the banking assistant."""
+import re
+from dataclasses import dataclass, field
 from typing import Optional, Tuple
+from chatbot.config import ACCOUNT_MAPPINGS
 from chatbot.config_client import COMMANDS
 
+
+@dataclass
+class Intent:
+    """A request that maps onto one MCP tool call."""
+
+    name: str
+    """Name of the MCP tool to call."""
+
+    arguments: dict = field(default_factory=dict)
+    """Tool arguments, without ``user_id`` which the client fills in."""
+
+    confidence: float = 0.0
+    """How sure the rules are, from 0 to 1."""
+
+
+ACCOUNT_NUMBER_PATTERN = re.compile(r"\b\d{10}\b")
+
+# Longest aliases first, so "credit card" wins over "credit"
+ACCOUNT_ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(alias) for alias in sorted(ACCOUNT_MAPPINGS, key=len, reverse=True)) + r")\b"
+)
+
+INTENT_PATTERNS = {
+    "get_account_balance": [
+        (re.compile(r"\bbalances?\b"), 0.95),
+        (re.compile(r"\bhow much (money |cash )?(do i have|have i got|is (there |left )?(in|on))\b"), 0.9),
+        (re.compile(r"\bwhat is (left )?(in|on) my\b"), 0.85),
+    ],
+    "list_user_accounts": [
+        (re.compile(r"\b(show|list|see|view|display|what are|which are|give me)\b.*\b(my|all)\b.*\baccounts\b"), 0.95),
+        (re.compile(r"^(all )?(of )?my accounts$"), 0.9),
+        (re.compile(r"\bwhat accounts do i have\b"), 0.95),
+        (re.compile(r"\b(list|show)\b.*\baccounts\b"), 0.85),
+    ],
+    "get_transaction_history": [
+        (re.compile(r"\b(transaction|transfer|account|payment) history\b"), 0.95),
+        (re.compile(r"\b(recent|latest|last|past) (transactions|transfers|activity)\b"), 0.95),
+        (re.compile(r"\b(history|transactions|transfers|activity)\b"), 0.85),
+    ],
+}
+"""Per tool, ``(pattern, confidence)`` rules, the best matching rule sets the confidence."""
+
+FALLBACK_PATTERN = re.compile(
+    r"\b(transfer(?! history)|move|send|pay|deposit|withdraw|e ?transfer|open|close|apply|rates?|fees?|interest|"
+    r"why|how do|how can|should|can i|statement|summary|total|spent|spend|minimum|average|"
+    r"balance transfers?|and|or|also|then)\b"
+)
+"""Words that need the model: money movement, advice, product questions or compound requests."""
+
+NEGATION_PATTERN = re.compile(r"\b(not|dont|don't|never|no|without)\b")
+
+DAYS_PATTERN = re.compile(r"\b(?:last|past|previous)\s+(\d+|a|one|two|three|six)\s+(day|week|month|year)s?\b")
+DAYS_PHRASES = [
+    (re.compile(r"\btoday\b"), 1),
+    (re.compile(r"\byesterday\b"), 2),
+    (re.compile(r"\b(this|last|past) week\b"), 7),
+    (re.compile(r"\b(this|last|past) month\b"), 30),
+    (re.compile(r"\b(this|last|past) year\b"), 365),
+]
+NUMBER_WORDS = {"a": 1, "one": 1, "two": 2, "three": 3, "six": 6}
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+MAX_FAST_PATH_WORDS = 15
+"""Longer messages lose confidence, they tend to carry more than one request."""
+
+
+def normalize(text: str) -> str:
+    """Lower-case, expand "what's" and drop punctuation other than apostrophes."""
+    text = text.strip().lower().replace("what's", "what is").replace("whats", "what is")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
 class IntentDetector:
     """Detects user commands from input text."""
-    
+
     @staticmethod
     def detect_command(text: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Detect if the text contains a command.
-        
+
         Returns:
             Tuple of (command_type, command_arg) or (None, None) if no command detected
         """
         text_lower = text.strip().lower()
-        
+
         # Check for exit command
         if any(text_lower == cmd for cmd in COMMANDS["exit"]):
             return ("exit", None)
-            
+
         # Check for clear command
         if any(text_lower == cmd for cmd in COMMANDS["clear"]):
             return ("clear", None)
-            
+
         # Check for user command
         if text_lower.startswith("user "):
             return ("user", text[5:].strip())
-            
+
         return (None, None)
+
+    @staticmethod
+    def resolve_accounts(text: str) -> list[str]:
+        """
+        Find the accounts a message names, by number or through ``ACCOUNT_MAPPINGS``.
+
+        :param text: The normalized message.
+        :return: The distinct account numbers in order of appearance.
+        """
+        found = [(match.start(), match.group()) for match in ACCOUNT_NUMBER_PATTERN.finditer(text)]
+        found += [(match.start(), ACCOUNT_MAPPINGS[match.group()]) for match in ACCOUNT_ALIAS_PATTERN.finditer(text)]
+        accounts = []
+        for _, account_number in sorted(found):
+            if account_number not in accounts:
+                accounts.append(account_number)
+        return accounts
+
+    @staticmethod
+    def detect_days(text: str, default: int = 30) -> int:
+        """
+        Read the history window of a message, e.g. "last 2 weeks" or "this month".
+
+        :param text: The normalized message.
+        :param default: Days when the message names no period.
+        :return: The number of days.
+        """
+        match = DAYS_PATTERN.search(text)
+        if match:
+            count = NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+            return max(1, count * UNIT_DAYS[match.group(2)])
+        for pattern, days in DAYS_PHRASES:
+            if pattern.search(text):
+                return days
+        return default
+
+    @staticmethod
+    def detect_intent(text: str) -> Optional[Intent]:
+        """
+        Classify a message as a balance, account list or history request with keyword rules.
+
+        Only unambiguous requests are recognized: exactly one intent, the one account it
+        needs, and none of the words that call for the model (transfers, advice, product
+        questions, compound requests).  Everything else returns None and goes to the model.
+
+        :param text: The user's message.
+        :return: The intent with its tool arguments and confidence, or None.
+        """
+        normalized = normalize(text)
+        if not normalized or FALLBACK_PATTERN.search(normalized):
+            return None
+
+        scores = {}
+        for name, rules in INTENT_PATTERNS.items():
+            best = max((confidence for pattern, confidence in rules if pattern.search(normalized)), default=0.0)
+            if best:
+                scores[name] = best
+        if len(scores) != 1:
+            return None
+        name, confidence = scores.popitem()
+
+        accounts = IntentDetector.resolve_accounts(normalized)
+        if name == "list_user_accounts":
+            arguments = {}
+        elif len(accounts) == 1:
+            arguments = {"account_number": accounts[0]}
+            if name == "get_transaction_history":
+                arguments["days"] = IntentDetector.detect_days(normalized)
+        else:
+            # Which account is meant is the model's question to ask
+            return None
+
+        if NEGATION_PATTERN.search(normalized):
+            confidence -= 0.3
+        if len(normalized.split()) > MAX_FAST_PATH_WORDS:
+            confidence -= 0.15
+        return Intent(name, arguments, round(confidence, 2))
@@ -0,0 +1,114 @@
+"""Maintenance commands for the banking database.
+
+Usage: python -m chatbot.manage <command> [options]
+"""
+import argparse
+from chatbot.config import DB_SHARDS, ARCHIVE_HORIZON_DAYS, VACUUM_FREE_RATIO
+from chatbot.database import init_db, backfill_transactions_ledger, rebuild_daily_balances
+from chatbot.shards import shard_files, rebalance_shards
+from chatbot.bulk import TABLES, import_file, export_file
+from chatbot.archive import archive_transfers, compact_database
+
+
+def backfill_ledger(args):
+    """Post missing ledger rows for transfers already in the database."""
+    written = backfill_transactions_ledger()
+    print(f"Posted {written} ledger rows to {', '.join(shard_files())}.")
+    if written:
+        # The new ledger rows are not in the daily rollups yet
+        rebuild_rollups(args)
+
+
+def rebuild_rollups(args):
+    """Recompute the daily balance rollups from the ledger."""
+    written = rebuild_daily_balances()
+    print(f"Rebuilt {written} daily balance rows in {', '.join(shard_files())}.")
+
+
+def rebalance(args):
+    """Move users from the old shard layout to the one configured by ``CHATBOT_DB_SHARDS``."""
+    sources = sorted(set(shard_files(args.from_shards)) | set(shard_files(DB_SHARDS)))
+    moved = rebalance_shards(sources, DB_SHARDS)
+    for db_file, users in moved.items():
+        print(f"Moved {users} users into {db_file}.")
+    for db_file in shard_files(args.from_shards)[DB_SHARDS:]:
+        print(f"{db_file} is no longer a shard and can be removed.")
+
+
+def import_data(args):
+    """Load users, accounts or transfers from a CSV or JSON-lines file."""
+    inserted = import_file(args.table, args.path, args.format, post_ledger=not args.no_ledger)
+    print(f"Imported {inserted} {args.table} from {args.path}.")
+
+
+def export_data(args):
+    """Write users, accounts or transfers to a CSV or JSON-lines file."""
+    written = export_file(args.table, args.path, args.format)
+    print(f"Exported {written} {args.table} to {args.path}.")
+
+
+def archive(args):
+    """Move transfers older than the horizon into the monthly archive databases."""
+    archived = archive_transfers(args.horizon_days)
+    for month, count in sorted(archived.items()):
+        print(f"Archived {count} transfers from {month}.")
+    if not archived:
+        print("No transfers older than the horizon.")
+
+
+def compact(args):
+    """Vacuum every shard whose free pages exceed the configured ratio."""
+    for db_file in shard_files():
+        vacuumed = compact_database(db_file, 0.0 if args.force else VACUUM_FREE_RATIO)
+        print(f"{'Vacuumed' if vacuumed else 'Skipped'} {db_file}.")
+
+
+BULK_ARGUMENTS = [
+    (["table"], {"choices": sorted(TABLES), "help": "What to load or dump"}),
+    (["path"], {"help": "The .csv or .jsonl file"}),
+    (["--format"], {"choices": ["csv", "jsonl"], "help": "File format, guessed from the extension by default"}),
+]
+
+COMMANDS = {
+    "backfill-ledger": (backfill_ledger, "Post Transactions ledger rows for existing Transfers"),
+    "rebuild-rollups": (rebuild_rollups, "Recompute the DailyBalances rollups from the Transactions ledger"),
+    "rebalance-shards": (rebalance, "Split or merge shards: move every user to its shard under CHATBOT_DB_SHARDS", [
+        (["--from-shards"], {"type": int, "required": True, "help": "Number of shards the data is spread over now"}),
+    ]),
+    "import": (import_data, "Bulk load users, accounts or transfers from a CSV or JSON-lines file", [
+        *BULK_ARGUMENTS,
+        (["--no-ledger"], {"action": "store_true", "help": "Do not post ledger rows and rollups for imported transfers"}),
+    ]),
+    "export": (export_data, "Stream users, accounts or transfers to a CSV or JSON-lines file", BULK_ARGUMENTS),
+    "archive": (archive, "Move old transfers and their ledger rows into monthly archive databases", [
+        (["--horizon-days"], {"type": int, "default": ARCHIVE_HORIZON_DAYS,
+                              "help": "Archive transfers older than this many days"}),
+    ]),
+    "compact": (compact, "VACUUM the shards that have enough free pages, e.g. after archiving", [
+        (["--force"], {"action": "store_true", "help": "Vacuum every shard regardless of its free pages"}),
+    ]),
+}
+"""Sub-commands as ``name: (handler, help[, [(flags, add_argument kwargs), ...]])``."""
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser with one sub-command per entry in ``COMMANDS``."""
+    parser = argparse.ArgumentParser(prog="python -m chatbot.manage", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, *arguments) in COMMANDS.items():
+        command = commands.add_parser(name, help=help_text)
+        for flags, options in (arguments[0] if arguments else []):
+            command.add_argument(*flags, **options)
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = build_parser().parse_args(argv)
+    # Bring the schema up to date before any command touches it
+    init_db()
+    handler = COMMANDS[args.command][0]
+    handler(args)
+
+
+if __name__ == "__main__":
+    main()
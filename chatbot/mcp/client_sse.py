@@ -4,59 +4,85 @@ import asyncio
 import sys
 import json
 import random
+import uuid
 from typing import Dict, List, Any, Optional, Tuple
 
 # Add the parent directory to the Python path to import from src and chatbot
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from mcp import ClientSession
-from mcp.client.sse import sse_client
 import google.generativeai as genai
 from dotenv import load_dotenv
 
 # Import custom modules
-from chatbot.config import DEFAULT_USER_ID, ACCOUNT_MAPPINGS
+from chatbot.config import DEFAULT_USER_ID, ACCOUNT_MAPPINGS, SESSION_HISTORY_LIMIT
 from chatbot.config_client import (
-    SYSTEM_INSTRUCTIONS, 
-    TOOL_DEFINITIONS, MODEL_CONFIG
+    TOOL_DEFINITIONS, MODEL_CONFIG, FAST_PATH_CONFIDENCE
 )
 from chatbot.response_formatter import ResponseFormatter
 from chatbot.intent_detector import IntentDetector
+from chatbot.model_cache import ModelCache, system_instructions
+from chatbot.memory import ConversationMemory
+from chatbot.tool_dispatcher import dispatch_tool_calls
+from chatbot.mcp.session_pool import MCPSessionPool, sse_connector
+from chatbot.mcp.tool_cache import ToolResultCache, MISSING
 
 # Load environment variables
 load_dotenv("../../.env")
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
+
+def build_model(model_name, temperature, tool_calling_config):
+    """Build a Gemini client with the banking tools."""
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=genai.GenerationConfig(temperature=temperature),
+        tools=[{"function_declarations": TOOL_DEFINITIONS}],
+        tool_config={"function_calling_config": tool_calling_config}
+    )
+
+
+# One client per model configuration, shared by every assistant in the process
+MODELS = ModelCache(build_model)
+
+# Recent read-only tool results, shared by every assistant in the process
+TOOL_RESULTS = ToolResultCache()
+
 class InteractiveBankingAssistant:
     """Interactive banking agent using Gemini and MCP."""
     
-    def __init__(self):
-        """Initialize the banking assistant."""
-        self.conversation_history = []
-        self.user_id = DEFAULT_USER_ID
-        self.session = None
-        self.read_stream = None
-        self.write_stream = None
+    def __init__(self, user_id=DEFAULT_USER_ID, session=None, allow_user_switch=True,
+                 history_limit=SESSION_HISTORY_LIMIT, pool=None):
+        """
+        Initialize the banking assistant.
+
+        :param user_id: The user the assistant acts for.
+        :param session: An MCP session to share instead of opening one in ``initialize_session``.
+        :param allow_user_switch: Whether the ``user <id>`` command may change the user.
+        :param history_limit: Most messages kept verbatim in the conversation history.
+        :param pool: An MCP session pool, started by ``initialize_session`` instead of a new one.
+        """
+        self.conversation_history = ConversationMemory(max_messages=history_limit)
+        self.user_id = user_id
+        self.allow_user_switch = allow_user_switch
+        self.session = session if session is not None else pool
+        self.pool = pool
         self.account_mappings = ACCOUNT_MAPPINGS
     
     async def initialize_session(self):
-        """Initialize the MCP session."""
+        """Open a pool of MCP sessions, used as this assistant's session."""
         from chatbot.config import MCP_HOST, MCP_PORT
         
-        mcp_url = f"http://{MCP_HOST}:{MCP_PORT}/sse"
-        self.sse_client = sse_client(mcp_url)
-        self.read_stream, self.write_stream = await self.sse_client.__aenter__()
-        self.session = ClientSession(self.read_stream, self.write_stream)
-        await self.session.__aenter__()
-        await self.session.initialize()
+        if self.pool is None:
+            mcp_url = f"http://{MCP_HOST}:{MCP_PORT}/sse"
+            self.pool = MCPSessionPool(sse_connector(mcp_url))
+        await self.pool.start()
+        self.session = self.pool
         print("\n🔄 Connected to RBC Banking Agent")
     
     async def close_session(self):
-        """Close the MCP session."""
-        if self.session:
-            await self.session.__aexit__(None, None, None)
-        if hasattr(self, 'sse_client'):
-            await self.sse_client.__aexit__(None, None, None)
+        """Drain and close the MCP session pool, if this assistant opened it."""
+        if self.pool:
+            await self.pool.drain()
     
     async def _process_response(self, response):
         """Process the response from Gemini, handling function calls."""
@@ -65,6 +91,7 @@ class InteractiveBankingAssistant:
             if hasattr(response, 'parts'):
                 result = []
                 has_function_call = False
+                calls = []
                 
                 for part in response.parts:
                     # Handle text parts
@@ -82,7 +109,7 @@ class InteractiveBankingAssistant:
                     if hasattr(part, 'function_call'):
                         has_function_call = True
                     
-                    # Handle function calls
+                    # Collect function calls, keeping their place among the text parts
                     if hasattr(part, 'function_call'):
                         func_call = part.function_call
                         function_name = func_call.name
@@ -91,22 +118,18 @@ class InteractiveBankingAssistant:
                         if not function_name or function_name.strip() == "":
                             continue
                         
-                        # Execute the function call through MCP and wait for result
-                        try:
-                            # Call the function through the MCP session and await the result
-                            function_result = await self._execute_function_call(function_name, func_call.args)
-                            
-                            # Parse the function result to extract actual data
-                            parsed_result = self._parse_function_result(function_result)
-                            
-                            # Format the result using the ResponseFormatter
-                            formatted_result = ResponseFormatter.format_response(function_name, parsed_result)
-                            if formatted_result:
-                                result.append(formatted_result)
-                                
-                        except Exception as e:
-                            error_msg = f"I'm sorry, I couldn't complete that action: {str(e)}"
-                            result.append(error_msg)
+                        calls.append((function_name, func_call.args))
+                        result.append(len(calls) - 1)
+                
+                # Execute the function calls through MCP, read-only ones concurrently
+                call_results = await dispatch_tool_calls(calls, self._run_function_call)
+                for position, item in enumerate(result):
+                    if isinstance(item, int):
+                        call_result = call_results[item]
+                        if isinstance(call_result, Exception):
+                            call_result = f"I'm sorry, I couldn't complete that action: {str(call_result)}"
+                        result[position] = call_result
+                result = [item for item in result if item]
                 
                 # For simple greetings with no function calls, provide a friendly response
                 if not has_function_call and not result:
@@ -123,6 +146,17 @@ class InteractiveBankingAssistant:
         except Exception as e:
             return f"Error processing response: {str(e)}"
     
+    async def _run_function_call(self, function_name, args):
+        """Execute a function call through MCP and format its result for the user."""
+        # Call the function through the MCP session and await the result
+        function_result = await self._execute_function_call(function_name, args)
+        
+        # Parse the function result to extract actual data
+        parsed_result = self._parse_function_result(function_result)
+        
+        # Format the result using the ResponseFormatter
+        return ResponseFormatter.format_response(function_name, parsed_result)
+    
     def _parse_function_result(self, result):
         """Parse the function result to extract the actual data."""
         try:
@@ -194,10 +228,37 @@ class InteractiveBankingAssistant:
             if function_name != "answer_banking_question" and "user_id" not in mcp_args:
                 mcp_args["user_id"] = self.user_id
             
+            # One key per requested transfer, so a retried call cannot move the money twice
+            if function_name == "transfer_funds":
+                mcp_args.setdefault("idempotency_key", str(uuid.uuid4()))
+            
+            # Reuse a recent result of the same read for the same user
+            cache_user = mcp_args.get("user_id", self.user_id)
+            if TOOL_RESULTS.cacheable(function_name):
+                cached = TOOL_RESULTS.get(function_name, cache_user, mcp_args)
+                if cached is not MISSING:
+                    print(f"\n🔧 Cached result: {function_name} with args: {mcp_args}")
+                    return cached
+            version = TOOL_RESULTS.version
+            
             print(f"\n🔧 Executing function: {function_name} with args: {mcp_args}")
                 
             # Call the function through MCP
-            result = await self.session.call_tool(function_name, mcp_args)
+            try:
+                result = await self.session.call_tool(function_name, mcp_args)
+            finally:
+                # Whatever came back, even a timeout or a lost session, the server may have
+                # committed the transfer, so balances, listings and histories of both accounts go
+                if function_name == "transfer_funds":
+                    TOOL_RESULTS.invalidate(
+                        user_ids=[cache_user],
+                        accounts=[str(mcp_args.get("from_account", "")), str(mcp_args.get("to_account", ""))]
+                    )
+            
+            result_text = self._result_text(result)
+            if (function_name != "transfer_funds" and not getattr(result, "isError", False)
+                    and not self._is_error_result(result)):
+                TOOL_RESULTS.put(function_name, cache_user, mcp_args, result, version, result_text)
             
             # Format the result for logging
             result_str = self._format_result_for_logging(result)
@@ -212,6 +273,31 @@ class InteractiveBankingAssistant:
             print(f"\n❌ {error_msg}")
             return {"error": error_msg}
     
+    async def _dispatch_intent(self, intent):
+        """
+        Answer a detected intent with its tool and the response formatter, without the model.
+
+        :param intent: The intent from ``IntentDetector.detect_intent``.
+        :return: The formatted answer, or None when the call failed and the model should answer.
+        """
+        print(f"\n⚡ Fast path: {intent.name} (confidence {intent.confidence})")
+        function_result = await self._execute_function_call(intent.name, intent.arguments)
+        if (isinstance(function_result, dict) or getattr(function_result, "isError", False)
+                or self._is_error_result(function_result)):
+            return None
+        parsed_result = self._parse_function_result(function_result)
+        return ResponseFormatter.format_response(intent.name, parsed_result) or None
+    
+    def _result_text(self, result):
+        """Join the text contents of an MCP result."""
+        return "\n".join(content.text for content in getattr(result, "content", None) or []
+                         if hasattr(content, "text"))
+    
+    def _is_error_result(self, result):
+        """Whether a tool answered with an error payload, such as an unknown account."""
+        parsed = self._parse_function_result(result)
+        return isinstance(parsed, dict) and "error" in parsed
+    
     def _format_result_for_logging(self, result):
         """Format a result object for logging."""
         try:
@@ -223,18 +309,10 @@ class InteractiveBankingAssistant:
             return str(result)
     
     def build_prompt(self, user_input):
-        """Build the prompt with conversation history."""
-        # Get system instructions from config and format with user_id
-        system_prompt = SYSTEM_INSTRUCTIONS.format(user_id=self.user_id)
-        
-        # Add conversation history
-        history = "\n\n".join([f"User: {msg['content']}" 
-                              if msg['role'] == 'user' else f"Assistant: {msg['content']}" 
-                              for msg in self.conversation_history])
-        
-        # Add current user input
-        full_prompt = f"{system_prompt}\n\n{history}\n\nUser: {user_input}\n\nAssistant:"
-        return full_prompt
+        """Build the prompt contents: system instructions, then the conversation ending with the user's message."""
+        # The memory already holds user_input as its latest message
+        transcript = self.conversation_history.render()
+        return [system_instructions(self.user_id), transcript or f"User: {user_input}"]
     
     async def send_message(self, user_input):
         """Send a message to the assistant and get a response."""
@@ -250,37 +328,31 @@ class InteractiveBankingAssistant:
             if command == "exit":
                 return "Goodbye! Thank you for using RBC Banking Agent."
             elif command == "clear":
-                self.conversation_history = []
+                self.conversation_history.clear()
                 return "Conversation history cleared."
             elif command == "user" and arg:
+                if not self.allow_user_switch:
+                    return "Switching users is not available in this session."
                 self.user_id = arg
                 return f"User ID changed to: {self.user_id}"
         
+        # Structured requests the rules are sure of go straight to their tool
+        intent = IntentDetector.detect_intent(user_input)
+        if intent and intent.confidence >= FAST_PATH_CONFIDENCE:
+            assistant_response = await self._dispatch_intent(intent)
+            if assistant_response:
+                print("\n🔁 Assistant (fast path):")
+                print(assistant_response)
+                self.conversation_history.append({"role": "assistant", "content": assistant_response})
+                return assistant_response
+        
         # For non-greetings, build the prompt with history
         try:
-            # Create a model with the tools from config
-            tool_config = [{
-                "function_declarations": TOOL_DEFINITIONS
-            }]
-            
-            # Create a model with the tools
-            model = genai.GenerativeModel(
-                model_name=MODEL_CONFIG["model_name"],
-                generation_config=genai.GenerationConfig(
-                    temperature=MODEL_CONFIG["temperature"]
-                ),
-                tools=tool_config,
-                tool_config={"function_calling_config": MODEL_CONFIG["tool_calling_config"]}
-            )
-            
-            # Let the LLM handle all queries, including short ones and account queries
+            # Reuse the client built for this configuration
+            model = MODELS.get(**MODEL_CONFIG)
             
-            # Generate content with system instructions from config
-            system_instructions = SYSTEM_INSTRUCTIONS.format(user_id=self.user_id)
-            response = await asyncio.to_thread(
-                model.generate_content,
-                [system_instructions, user_input]
-            )
+            # Generate content from the system instructions and the conversation, without holding a thread
+            response = await model.generate_content_async(self.build_prompt(user_input))
                     
             # Process and print response
             assistant_response = await self._process_response(response)
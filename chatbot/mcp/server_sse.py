@@ -1,9 +1,9 @@
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 from decimal import Decimal
+import asyncio
 import os
 import sys
-import datetime
 
 # Add the parent directory to the Python path to import from src and chatbot
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
@@ -13,9 +13,13 @@ print(f"Added to Python path: {parent_dir}")
 # Import RAG components
 from chatbot.rag.rag_chatbot import RBCChatbot
 
-# Import the actual database functions
-from chatbot.account import list_accounts, list_transfer_target_accounts, transfer_between_accounts
-from chatbot.database import init_db
+# Import the actual database functions, run off the event loop
+from chatbot.async_database import (
+    list_accounts, get_account, list_transfer_target_accounts, transfer_between_accounts,
+    load_transaction_history_page, load_period_summary
+)
+from chatbot.database import init_db, encode_history_cursor, decode_history_cursor
+from chatbot.archive import start_maintenance_scheduler
 from chatbot.models import Account
 
 # Load environment variables from .env file
@@ -28,14 +32,14 @@ init_db()
 chatbot = RBCChatbot()
 
 # Import configuration
-from chatbot.config import MCP_NAME, MCP_HOST, MCP_PORT, DEFAULT_USER_ID
+from chatbot.config import MCP_NAME, MCP_HOST, MCP_PORT, DEFAULT_USER_ID, MAX_HISTORY_PAGE
 
 # Create the MCP server
 mcp = FastMCP(name=MCP_NAME, host=MCP_HOST, port=MCP_PORT)
 
 # RAG Tool: Answer questions using the RAG system
 @mcp.tool()
-def answer_banking_question(question: str) -> dict:
+async def answer_banking_question(question: str) -> dict:
     """
     Answer a banking question using the RAG system with RBC documentation.
     Only for banking, financial services, or RBC-related questions.
@@ -45,7 +49,7 @@ def answer_banking_question(question: str) -> dict:
     
     # Process the question - the model should determine if it's banking-related
     # based on the system instructions
-    result = chatbot.answer_question(question)
+    result = await asyncio.to_thread(chatbot.answer_question, question)
     print(f"[RAG] Found answer with {len(result['sources'])} sources")
     return {
         "answer": result["answer"],
@@ -54,27 +58,31 @@ def answer_banking_question(question: str) -> dict:
 
 # Tool 1: List all accounts belonging to a user
 @mcp.tool()
-def list_user_accounts(user_id: str) -> list[dict]:
+async def list_user_accounts(user_id: str) -> list[dict]:
     """List all accounts for a given user."""
-    accounts = list_accounts(user_id)
+    accounts = await list_accounts(user_id)
     print(f"[DEBUG] list_user_accounts called with user_id={user_id}")
     print(f"[DEBUG] Accounts: {accounts}")
-    return [account.__dict__ for account in accounts]
+    return [account.to_dict() for account in accounts]
 
 # Tool 2: List target accounts that can receive transfers
 @mcp.tool()
-def list_target_accounts(user_id: str, from_account: str) -> list[dict]:
+async def list_target_accounts(user_id: str, from_account: str) -> list[dict]:
     """List all other accounts this user can transfer to."""
-    accounts = list_transfer_target_accounts(user_id, from_account)
+    accounts = await list_transfer_target_accounts(user_id, from_account)
     print(f"[DEBUG] list_target_accounts called with user_id={user_id}, from_account={from_account}")
     print(f"[DEBUG] Transfer targets: {accounts}")
-    return [account.__dict__ for account in accounts]
+    return [account.to_dict() for account in accounts]
 
 # Tool 3: Transfer funds between two accounts
 @mcp.tool()
-def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str) -> str:
-    """Transfer funds from one account to another."""
-    print(f"[DEBUG] transfer_funds called with user_id={user_id}, from_account={from_account}, to_account={to_account}, amount={amount}")
+async def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str,
+                         idempotency_key: str = "") -> str:
+    """
+    Transfer funds from one account to another.
+    Retrying with the same idempotency_key returns the first result instead of transferring twice.
+    """
+    print(f"[DEBUG] transfer_funds called with user_id={user_id}, from_account={from_account}, to_account={to_account}, amount={amount}, idempotency_key={idempotency_key}")
     try:
         # Convert amount to Decimal, handling any formatting issues
         clean_amount = amount.replace('$', '').replace(',', '')
@@ -86,7 +94,8 @@ def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str
         print(f"[DEBUG] to_account: {to_account} (type: {type(to_account)})")
         
         # Call the transfer function
-        transfer_between_accounts(user_id, from_account, to_account, decimal_amount)
+        await transfer_between_accounts(user_id, from_account, to_account, decimal_amount,
+                                        idempotency_key or None)
         return f"✅ Transferred ${clean_amount} from {from_account} to {to_account}."
     except Exception as e:
         print(f"[ERROR] Transfer failed: {str(e)}")
@@ -94,91 +103,64 @@ def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str
 
 # Tool 4: Get account balance
 @mcp.tool()
-def get_account_balance(user_id: str, account_number: str) -> dict:
+async def get_account_balance(user_id: str, account_number: str) -> dict:
     """Get the balance of a specific account."""
     print(f'[DEBUG] get_account_balance called with user_id={user_id}, account_number={account_number}')
     
-    # Find the account in the user's accounts
-    accounts = list_accounts(user_id)
-    for account in accounts:
-        if account.account_number == account_number:
-            return {
-                "account_number": account.account_number,
-                "account_name": account.account_name,
-                "balance": str(account.balance),
-                "currency": "CAD"
-            }
+    # Look the account up by its number, served from the account cache when warm
+    account = await get_account(user_id, account_number)
+    if account is not None:
+        return {**account.to_dict(), "currency": "CAD"}
     
     return {"error": f"Account {account_number} not found."}
 
 # Tool 5: Get transaction history
 @mcp.tool()
-def get_transaction_history(user_id: str, account_number: str, days: int = 30) -> list[dict]:
-    """Get the transaction history for a specific account."""
-    print(f"[DEBUG] get_transaction_history called with user_id={user_id}, account_number={account_number}, days={days}")
-    
-    # Connect to the database to get transaction history
-    import sqlite3
-    from chatbot.database import DB_FILE
-    
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    
-    # Calculate the date range
-    today = datetime.datetime.now()
-    start_date = (today - datetime.timedelta(days=days)).isoformat()
-    
-    # Query for transactions with balances
-    cur.execute("""
-        SELECT 
-            TransactionNumber, 
-            TransferDateTime, 
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN 'debit' 
-                ELSE 'credit' 
-            END as transaction_type,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN -Amount 
-                ELSE Amount 
-            END as amount,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN 'Transfer to ' || ToAccountNumber
-                ELSE 'Transfer from ' || FromAccountNumber
-            END as description,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN FromAccountBalance
-                ELSE ToAccountBalance
-            END as balance_after
-        FROM Transfers
-        WHERE (FromAccountNumber = :account_number OR ToAccountNumber = :account_number)
-        AND TransferDateTime >= :start_date
-        ORDER BY TransferDateTime DESC
-    """, {"account_number": account_number, "start_date": start_date})
-    
-    rows = cur.fetchall()
+async def get_transaction_history(user_id: str, account_number: str, days: int = 30,
+                                  limit: int = 5, cursor: str = "") -> dict:
+    """
+    Get one page of the transaction history for a specific account, newest first.
+    Pass the returned next_cursor back as cursor to get the following page.
+    """
+    print(f"[DEBUG] get_transaction_history called with user_id={user_id}, account_number={account_number}, days={days}, limit={limit}, cursor={cursor}")
     
-    # Create transaction objects using stored balances
-    transactions = []
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
+    try:
+        position = decode_history_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Only the owner may read the history, the same cached lookup the balance tool uses
+    if await get_account(user_id, account_number) is None:
+        return {"error": f"Account {account_number} not found."}
+
+    # Read one row past the page to learn whether another page exists
+    transactions = await load_transaction_history_page(account_number, days, position, limit + 1, user_id)
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        next_cursor = encode_history_cursor(transactions[-1])
     
-    for row in rows:
-        amount = Decimal(str(row['amount']))
-        
-        transaction = {
-            "transaction_id": row['TransactionNumber'],
-            "date": row['TransferDateTime'].split('T')[0],  # Just the date part
-            "description": row['description'],
-            "amount": str(amount),
-            "transaction_type": row['transaction_type'],
-            "balance_after": str(row['balance_after'])
-        }
-        transactions.append(transaction)
+    print(f"[DEBUG] Returning: {len(transactions)} transactions, next_cursor={next_cursor}")
+    return {"transactions": transactions, "next_cursor": next_cursor}
+
+# Tool 6: Summarize an account over a period
+@mcp.tool()
+async def get_period_summary(user_id: str, account_number: str, days: int = 30) -> dict:
+    """
+    Summarize an account over the last few days: opening and closing balance,
+    total money out and in, and the number of transactions.
+    """
+    print(f"[DEBUG] get_period_summary called with user_id={user_id}, account_number={account_number}, days={days}")
     
-    con.close()
-    print(f"[DEBUG] Returning: {len(transactions)} transactions")
-    return transactions
+    summary = await load_period_summary(account_number, max(1, days), user_id)
+    if summary is None:
+        return {"error": f"Account {account_number} not found."}
+    return summary
 
 # Run the MCP server using SSE transport
 if __name__ == "__main__":
     print("[INFO] Starting MCP server on http://127.0.0.1:8050 using SSE transport...")
+    # Archive old transfers and compact the shards in the background while serving
+    start_maintenance_scheduler()
     mcp.run(transport="sse")
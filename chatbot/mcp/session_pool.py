@@ -0,0 +1,333 @@
+"""Pool of MCP client sessions with liveness probes and reconnects."""
+import asyncio
+import contextlib
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+from chatbot.config import (
+    MCP_POOL_SIZE, MCP_PROBE_INTERVAL, MCP_PROBE_TIMEOUT, MCP_CALL_TIMEOUT,
+    MCP_RECONNECT_BASE, MCP_RECONNECT_MAX
+)
+from chatbot.tool_dispatcher import is_read_only
+
+Connector = Callable[[], Awaitable[tuple[Any, Callable[[], Awaitable[None]]]]]
+"""Opens a session, returning it with a coroutine function that closes it."""
+
+
+def sse_connector(url: str) -> Connector:
+    """
+    Open initialized ``ClientSession`` objects over SSE.
+
+    Each connection lives in its own task, which enters and leaves the SSE and session
+    contexts, so a connection can be closed from any other task.
+
+    :param url: The server's SSE endpoint, e.g. ``http://127.0.0.1:8050/sse``.
+    :return: The connector.
+    """
+    async def connect():
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        ready = asyncio.get_running_loop().create_future()
+        closing = asyncio.Event()
+
+        async def hold():
+            try:
+                async with sse_client(url) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        await session.initialize()
+                        ready.set_result(session)
+                        await closing.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+
+        task = asyncio.create_task(hold())
+
+        async def close():
+            closing.set()
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await task
+
+        try:
+            return await ready, close
+        except BaseException:
+            task.cancel()
+            raise
+
+    return connect
+
+
+class _Connection:
+    """One open session; ``lost`` is set once it is found broken."""
+
+    __slots__ = ("session", "close", "lost")
+
+    def __init__(self, session: Any, close: Callable[[], Awaitable[None]]):
+        self.session = session
+        self.close = close
+        self.lost = asyncio.Event()
+
+
+class _Slot:
+    """A place in the pool, holding a connection or reconnecting one."""
+
+    __slots__ = ("index", "connection", "reconnecting", "in_flight", "calls", "losses", "reconnects")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.connection: Optional[_Connection] = None
+        self.reconnecting = False
+        self.in_flight = 0
+        self.calls = 0
+        self.losses = 0
+        self.reconnects = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.connection is not None and not self.connection.lost.is_set()
+
+
+class MCPSessionPool:
+    """
+    A fixed number of MCP sessions, used through ``call_tool`` like a single ``ClientSession``.
+
+    Each call goes to the healthy session with the fewest calls in flight.  A session is
+    taken out of rotation when a liveness probe (``send_ping``) fails, either on the
+    periodic sweep or right after one of its calls failed, and is reconnected in the
+    background with jittered exponential backoff.  Calls in flight on a lost session fail
+    at once instead of waiting out their timeout.  A call that failed because its session
+    was lost is retried once on another session when that is safe: read-only tools, and
+    transfers carrying an idempotency key.  While no session is healthy, calls wait for
+    one up to the call timeout.
+    """
+
+    def __init__(self, connect: Connector, size: int = MCP_POOL_SIZE,
+                 probe_interval: float = MCP_PROBE_INTERVAL, probe_timeout: float = MCP_PROBE_TIMEOUT,
+                 call_timeout: float = MCP_CALL_TIMEOUT, backoff_base: float = MCP_RECONNECT_BASE,
+                 backoff_max: float = MCP_RECONNECT_MAX):
+        """
+        :param connect: Opens one session, e.g. :func:`sse_connector`.
+        :param size: Sessions kept open.
+        :param probe_interval: Seconds between liveness sweeps, 0 disables them.
+        :param probe_timeout: Seconds a probe waits for its ping.
+        :param call_timeout: Seconds a tool call, a connect, or a wait for a healthy session may take.
+        :param backoff_base: First reconnect delay in seconds, doubled on every failed attempt.
+        :param backoff_max: Longest reconnect delay in seconds.
+        """
+        self.connect = connect
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.call_timeout = call_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = [_Slot(index) for index in range(size)]
+        self._available = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: set[asyncio.Task] = set()
+        self._probe_task: Optional[asyncio.Task] = None
+        self.draining = False
+        self.retries = 0
+        self.probe_failures = 0
+        self.wait_timeouts = 0
+
+    async def start(self):
+        """Open every session, those that fail keep reconnecting in the background."""
+        await asyncio.gather(*(self._connect(slot) for slot in self._slots))
+        if self.probe_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _connect(self, slot: _Slot):
+        try:
+            session, close = await asyncio.wait_for(self.connect(), self.call_timeout)
+        except Exception as e:
+            print(f"[ERROR] MCP session {slot.index} failed to connect: {e}")
+            self._schedule_reconnect(slot)
+            return
+        slot.connection = _Connection(session, close)
+        self._available.set()
+
+    def _mark_lost(self, slot: _Slot, connection: _Connection):
+        """Take a broken connection out of rotation and reconnect its slot, once per connection."""
+        if connection.lost.is_set():
+            return
+        connection.lost.set()
+        slot.losses += 1
+        if not any(other.healthy for other in self._slots):
+            self._available.clear()
+        print(f"[ERROR] MCP session {slot.index} lost, reconnecting")
+        self._schedule_reconnect(slot)
+
+    def _schedule_reconnect(self, slot: _Slot):
+        if slot.reconnecting or self.draining:
+            return
+        slot.reconnecting = True
+        task = asyncio.create_task(self._reconnect(slot))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reconnect(self, slot: _Slot):
+        try:
+            if slot.connection is not None:
+                connection, slot.connection = slot.connection, None
+                with contextlib.suppress(Exception, asyncio.TimeoutError):
+                    await asyncio.wait_for(connection.close(), self.probe_timeout)
+            attempt = 0
+            while not self.draining:
+                # Jitter keeps the pool's sessions from reconnecting in lockstep
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                try:
+                    session, close = await asyncio.wait_for(self.connect(), self.call_timeout)
+                except Exception as e:
+                    print(f"[DEBUG] MCP session {slot.index} reconnect attempt {attempt} failed: {e}")
+                    continue
+                slot.connection = _Connection(session, close)
+                slot.reconnects += 1
+                self._available.set()
+                print(f"[DEBUG] MCP session {slot.index} reconnected after {attempt} attempt(s)")
+                return
+        finally:
+            slot.reconnecting = False
+
+    async def _probe(self, slot: _Slot, connection: _Connection) -> bool:
+        """Ping a connection, marking it lost if it does not answer in time."""
+        if connection.lost.is_set():
+            return False
+        try:
+            await asyncio.wait_for(connection.session.send_ping(), self.probe_timeout)
+            return True
+        except Exception:
+            self.probe_failures += 1
+            self._mark_lost(slot, connection)
+            return False
+
+    async def _probe_loop(self):
+        while not self.draining:
+            await asyncio.sleep(self.probe_interval)
+            await asyncio.gather(*(
+                self._probe(slot, slot.connection) for slot in self._slots if slot.healthy
+            ))
+
+    async def _acquire(self) -> _Slot:
+        """Return the healthy slot with the fewest calls in flight, waiting for one if needed."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.call_timeout
+        while True:
+            if self.draining:
+                raise ConnectionError("The MCP session pool is draining")
+            healthy = [slot for slot in self._slots if slot.healthy]
+            if healthy:
+                return min(healthy, key=lambda slot: (slot.in_flight, slot.calls))
+            self._available.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.wait_timeouts += 1
+                raise ConnectionError("No MCP session is available")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._available.wait(), remaining)
+
+    async def _call(self, slot: _Slot, connection: _Connection, name: str, arguments: dict):
+        """Run one call, failing as soon as its connection is marked lost."""
+        call = asyncio.ensure_future(connection.session.call_tool(name, arguments))
+        lost = asyncio.ensure_future(connection.lost.wait())
+        try:
+            done, _ = await asyncio.wait({call, lost}, timeout=self.call_timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lost.cancel()
+            if not call.done():
+                call.cancel()
+        if call in done:
+            return call.result()
+        raise ConnectionError(f"MCP session {slot.index} was lost" if lost in done
+                              else f"{name} timed out after {self.call_timeout}s")
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> Any:
+        """
+        Call a tool on the least busy healthy session.
+
+        :param name: The tool name.
+        :param arguments: The tool arguments.
+        :return: The session's ``call_tool`` result.
+        :raises ConnectionError: When no session became available, or the call's session
+            was lost and the call could not be retried.
+        """
+        arguments = arguments or {}
+        retryable = is_read_only(name) or bool(arguments.get("idempotency_key"))
+        for attempt in range(2 if retryable else 1):
+            slot = await self._acquire()
+            connection = slot.connection
+            slot.in_flight += 1
+            slot.calls += 1
+            self._idle.clear()
+            try:
+                return await self._call(slot, connection, name, arguments)
+            except Exception as e:
+                # A session that still answers pings failed the call itself, pass that on
+                if await self._probe(slot, connection) or attempt or not retryable:
+                    raise
+                self.retries += 1
+                print(f"[DEBUG] Retrying {name} on another MCP session after: {e}")
+            finally:
+                slot.in_flight -= 1
+                if not any(other.in_flight for other in self._slots):
+                    self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop taking calls, wait for those in flight, then close every session.
+
+        :param timeout: Seconds to wait for calls in flight, defaults to the call timeout.
+        :return: True if every call in flight finished before the sessions were closed.
+        """
+        self.draining = True
+        # Wake calls waiting for a session so they see the pool is draining
+        self._available.set()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.call_timeout if timeout is None else timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+        tasks = list(self._tasks) + ([self._probe_task] if self._probe_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for slot in self._slots:
+            if slot.connection is not None:
+                connection, slot.connection = slot.connection, None
+                connection.lost.set()
+                with contextlib.suppress(Exception, asyncio.TimeoutError):
+                    await asyncio.wait_for(connection.close(), self.probe_timeout)
+        return drained
+
+    def metrics(self) -> dict:
+        """
+        Report the pool's state and counters.
+
+        :return: Pool-wide totals and one entry per session.
+        """
+        sessions = [{
+            "index": slot.index,
+            "healthy": slot.healthy,
+            "reconnecting": slot.reconnecting,
+            "in_flight": slot.in_flight,
+            "calls": slot.calls,
+            "losses": slot.losses,
+            "reconnects": slot.reconnects,
+        } for slot in self._slots]
+        return {
+            "size": len(sessions),
+            "healthy": sum(session["healthy"] for session in sessions),
+            "in_flight": sum(session["in_flight"] for session in sessions),
+            "calls": sum(session["calls"] for session in sessions),
+            "losses": sum(session["losses"] for session in sessions),
+            "reconnects": sum(session["reconnects"] for session in sessions),
+            "retries": self.retries,
+            "probe_failures": self.probe_failures,
+            "wait_timeouts": self.wait_timeouts,
+            "draining": self.draining,
+            "sessions": sessions,
+        }
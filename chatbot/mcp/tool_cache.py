@@ -0,0 +1,198 @@
+"""Client-side cache of read-only MCP tool results."""
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from chatbot.config_client import TOOL_CACHE_TTLS, TOOL_CACHE_MAX_ENTRIES
+
+ACCOUNT_NUMBER_PATTERN = re.compile(r"\b\d{10}\b")
+
+MISSING = object()
+"""Returned by :meth:`ToolResultCache.get` when there is no live entry."""
+
+
+def normalize_arguments(arguments: dict) -> str:
+    """
+    Canonical form of tool arguments, so equivalent calls share an entry.
+
+    ``user_id`` is dropped (it is part of the key already), as are empty values; whole
+    floats, which the model sends for integer parameters, become ints and strings are
+    stripped.
+
+    :param arguments: The tool arguments.
+    :return: The arguments as JSON with sorted keys.
+    """
+    normalized = {}
+    for key, value in arguments.items():
+        if key == "user_id" or value is None or value == "":
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+class _Entry:
+    """One cached result and what it is indexed under."""
+
+    __slots__ = ("result", "expires_at", "user_id", "accounts")
+
+    def __init__(self, result: Any, expires_at: float, user_id: str, accounts: frozenset):
+        self.result = result
+        self.expires_at = expires_at
+        self.user_id = user_id
+        self.accounts = accounts
+
+
+class ToolResultCache:
+    """
+    Results of read-only tools keyed by (tool, user, normalized arguments), with per-tool TTLs.
+
+    Entries are bounded by a least recently used size and indexed by user, by every account
+    in their arguments and by every account number in their result, so a transfer can drop
+    exactly the entries it may have changed, including other users' entries for the target
+    account.
+    A result fetched while an invalidation happened is not stored, so the cache never
+    serves a pre-transfer balance after the transfer returned.
+    """
+
+    def __init__(self, ttls: Optional[dict] = None, max_entries: int = TOOL_CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param ttls: Seconds each tool's results stay valid, tools not listed are not cached.
+        :param max_entries: Most entries kept before the least recently used one is evicted.
+        :param clock: Returns the current time in seconds.
+        """
+        self.ttls = TOOL_CACHE_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._by_user: dict[str, set] = {}
+        self._by_account: dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidated = 0
+
+    def cacheable(self, tool: str) -> bool:
+        """Whether a tool's results are cached at all."""
+        return self.ttls.get(tool, 0) > 0
+
+    def _remove(self, key: tuple):
+        """Drop an entry and its index references, must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for index, names in ((self._by_user, (entry.user_id,)), (self._by_account, entry.accounts)):
+            for name in names:
+                keys = index.get(name)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[name]
+
+    def get(self, tool: str, user_id: str, arguments: dict) -> Any:
+        """
+        Look up a live result.
+
+        :param tool: The tool name.
+        :param user_id: The user the call is made for.
+        :param arguments: The tool arguments.
+        :return: The cached result, or ``MISSING``.
+        """
+        key = (tool, user_id, normalize_arguments(arguments))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.result
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+
+    def put(self, tool: str, user_id: str, arguments: dict, result: Any, version: int, text: str = ""):
+        """
+        Store a result fetched while the cache was at ``version``.
+
+        :param tool: The tool name.
+        :param user_id: The user the call was made for.
+        :param arguments: The tool arguments.
+        :param result: The result to hand back on later hits.
+        :param version: :attr:`version` read before the call was made.
+        :param text: The result's text, scanned for more account numbers to index the entry under.
+        """
+        if not self.cacheable(tool):
+            return
+        normalized = normalize_arguments(arguments)
+        key = (tool, user_id, normalized)
+        accounts = frozenset(ACCOUNT_NUMBER_PATTERN.findall(text)).union(
+            str(value) for name, value in arguments.items() if "account" in name and value
+        )
+        with self._lock:
+            if version != self.version:
+                return
+            self._remove(key)
+            self._entries[key] = _Entry(result, self.clock() + self.ttls[tool], user_id, accounts)
+            self._by_user.setdefault(user_id, set()).add(key)
+            for account in accounts:
+                self._by_account.setdefault(account, set()).add(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_ids: Iterable[str] = (), accounts: Iterable[str] = ()) -> int:
+        """
+        Drop every entry of the given users or mentioning the given accounts.
+
+        :param user_ids: Users whose entries are dropped.
+        :param accounts: Account numbers whose entries are dropped.
+        :return: How many entries were dropped.
+        """
+        with self._lock:
+            self.version += 1
+            keys = set()
+            for user_id in user_ids:
+                keys |= self._by_user.get(user_id, set())
+            for account in accounts:
+                keys |= self._by_account.get(account, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidated += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_account.clear()
+
+    def stats(self) -> dict:
+        """
+        Report the cache counters.
+
+        :return: Entries, hits, misses, hit rate, stores, evictions and invalidated entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+            }
@@ -0,0 +1,142 @@
+"""Conversation memory that keeps prompts inside a token budget."""
+import re
+from collections import deque
+from typing import Callable, Iterator, Optional
+
+from chatbot.config_client import (
+    CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKENS, CONVERSATION_MIN_RECENT
+)
+
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the tokens of a text without a tokenizer, at about four characters per token.
+
+    :param text: The text.
+    :return: The estimated token count, at least 1.
+    """
+    return len(text) // 4 + 1
+
+
+def summarize_message(message: dict) -> str:
+    """
+    Condense one message into a summary line: its first sentence, clipped.
+
+    Account numbers and amounts usually sit in the first sentence of a banking exchange,
+    so they survive the fold.
+
+    :param message: A ``{"role", "content"}`` message.
+    :return: The summary line.
+    """
+    text = re.sub(r"\s+", " ", message["content"]).strip()
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(sentence) > SUMMARY_LINE_CHARS:
+        sentence = sentence[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return f"{message['role'].capitalize()}: {sentence}"
+
+
+class ConversationMemory:
+    """
+    Recent messages inside a token budget, with older ones folded into a running summary.
+
+    Appending a message that takes the window over ``token_budget`` folds the oldest
+    messages, one summary line each, into the summary.  The summary keeps its newest
+    lines within ``summary_tokens``, so folding costs the same on turn 200 as on turn 2
+    and nothing is ever re-summarized.  Iterating yields the messages still in the window,
+    so the memory stands in for a plain history list.
+    """
+
+    def __init__(self, token_budget: int = CONVERSATION_TOKEN_BUDGET,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS,
+                 min_recent: int = CONVERSATION_MIN_RECENT, max_messages: Optional[int] = None,
+                 summarizer: Callable[[dict], str] = summarize_message):
+        """
+        :param token_budget: Most estimated tokens of recent messages kept verbatim.
+        :param summary_tokens: Most estimated tokens of summary kept.
+        :param min_recent: Messages kept verbatim even when they alone exceed the budget.
+        :param max_messages: Most messages kept verbatim, whatever their size.
+        :param summarizer: Condenses one folded message into a summary line.
+        """
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.min_recent = min_recent
+        self.max_messages = max_messages
+        self.summarizer = summarizer
+        self._recent: deque[tuple[dict, int]] = deque()
+        self._recent_tokens = 0
+        self._summary: deque[tuple[str, int]] = deque()
+        self._summary_tokens = 0
+        self._summary_text: Optional[str] = ""
+        self.folded = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        return (message for message, _ in self._recent)
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    @property
+    def summary(self) -> str:
+        """The running summary of the folded messages, joined once per change."""
+        if self._summary_text is None:
+            self._summary_text = "\n".join(line for line, _ in self._summary)
+        return self._summary_text
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of the recent messages and the summary."""
+        return self._recent_tokens + self._summary_tokens
+
+    def append(self, message: dict):
+        """
+        Add a message, folding the oldest ones into the summary while over budget.
+
+        :param message: A ``{"role", "content"}`` message.
+        """
+        tokens = estimate_tokens(message["content"])
+        self._recent.append((message, tokens))
+        self._recent_tokens += tokens
+        while len(self._recent) > self.min_recent and (
+                self._recent_tokens > self.token_budget
+                or (self.max_messages is not None and len(self._recent) > self.max_messages)):
+            self._fold()
+
+    def _fold(self):
+        """Move the oldest recent message into the summary."""
+        message, tokens = self._recent.popleft()
+        self._recent_tokens -= tokens
+        line = self.summarizer(message)
+        line_tokens = estimate_tokens(line)
+        self._summary.append((line, line_tokens))
+        self._summary_tokens += line_tokens
+        while len(self._summary) > 1 and self._summary_tokens > self.summary_tokens:
+            _, dropped = self._summary.popleft()
+            self._summary_tokens -= dropped
+        self._summary_text = None
+        self.folded += 1
+
+    def clear(self):
+        """Forget the conversation."""
+        self._recent.clear()
+        self._recent_tokens = 0
+        self._summary.clear()
+        self._summary_tokens = 0
+        self._summary_text = ""
+
+    def render(self) -> str:
+        """
+        Render the summary and the recent messages as a transcript for the prompt.
+
+        :return: The transcript, empty when nothing has been said.
+        """
+        parts = []
+        if self._summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        if self._recent:
+            parts.append("Recent conversation:\n" + "\n".join(
+                f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+                for message, _ in self._recent
+            ))
+        return "\n\n".join(parts)
@@ -0,0 +1,182 @@
+"""Versioned schema migrations tracked with ``PRAGMA user_version``."""
+import sqlite3
+
+LEDGER_BACKFILL_STATEMENTS = [
+    """
+    INSERT OR IGNORE INTO Transactions (
+        TransactionNumber, AccountNumber, OtherAccountNumber,
+        TransactionDateTime, TransactionTypeCode, Amount, BalanceAfter
+    )
+    SELECT TransactionNumber, FromAccountNumber, ToAccountNumber,
+           TransferDateTime, 'DR', -Amount, FromAccountBalance
+    FROM Transfers
+    """,
+    """
+    INSERT OR IGNORE INTO Transactions (
+        TransactionNumber, AccountNumber, OtherAccountNumber,
+        TransactionDateTime, TransactionTypeCode, Amount, BalanceAfter
+    )
+    SELECT TransactionNumber, ToAccountNumber, FromAccountNumber,
+           TransferDateTime, 'CR', Amount, ToAccountBalance
+    FROM Transfers
+    """
+]
+"""Post the two ledger rows of every transfer that does not have them yet."""
+
+DAILY_BALANCES_REBUILD_STATEMENTS = [
+    # Days before the oldest ledger row were archived, their rollups cannot be recomputed here
+    """
+    DELETE FROM DailyBalances
+    WHERE Day >= (SELECT COALESCE(substr(MIN(TransactionDateTime), 1, 10), '') FROM Transactions)
+    """,
+    """
+    INSERT INTO DailyBalances (
+        AccountNumber, Day, OpeningBalance, ClosingBalance,
+        DebitTotal, CreditTotal, TransactionCount
+    )
+    SELECT AccountNumber, Day, FirstBalanceAfter - FirstAmount, LastBalanceAfter,
+           DebitTotal, CreditTotal, TransactionCount
+    FROM (
+        SELECT AccountNumber,
+               substr(TransactionDateTime, 1, 10) AS Day,
+               FIRST_VALUE(BalanceAfter) OVER day AS FirstBalanceAfter,
+               FIRST_VALUE(Amount) OVER day AS FirstAmount,
+               LAST_VALUE(BalanceAfter) OVER day AS LastBalanceAfter,
+               SUM(CASE WHEN Amount < 0 THEN -Amount ELSE 0 END) OVER day AS DebitTotal,
+               SUM(CASE WHEN Amount > 0 THEN Amount ELSE 0 END) OVER day AS CreditTotal,
+               COUNT(*) OVER day AS TransactionCount,
+               ROW_NUMBER() OVER day AS RowNumber
+        FROM Transactions
+        WINDOW day AS (
+            PARTITION BY AccountNumber, substr(TransactionDateTime, 1, 10)
+            ORDER BY TransactionDateTime, TransactionNumber
+            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+        )
+    )
+    WHERE RowNumber = 1
+    """
+]
+"""Recompute the daily rollups of every day still in the ``Transactions`` ledger."""
+
+MIGRATIONS = [
+    (1, "Covering index for outgoing transfers by account and time", [
+        """
+        CREATE INDEX IF NOT EXISTS IX_Transfers_From_DateTime
+        ON Transfers (FromAccountNumber, TransferDateTime, TransactionNumber,
+                      ToAccountNumber, Amount, FromAccountBalance)
+        """
+    ]),
+    (2, "Covering index for incoming transfers by account and time", [
+        """
+        CREATE INDEX IF NOT EXISTS IX_Transfers_To_DateTime
+        ON Transfers (ToAccountNumber, TransferDateTime, TransactionNumber,
+                      FromAccountNumber, Amount, ToAccountBalance)
+        """
+    ]),
+    (3, "Store money as integer cents", [
+        "UPDATE Accounts SET Balance = CAST(ROUND(Balance * 100) AS INTEGER)",
+        """
+        UPDATE Transfers
+        SET Amount = CAST(ROUND(Amount * 100) AS INTEGER),
+            FromAccountBalance = CAST(ROUND(FromAccountBalance * 100) AS INTEGER),
+            ToAccountBalance = CAST(ROUND(ToAccountBalance * 100) AS INTEGER)
+        """,
+        """
+        UPDATE Transactions
+        SET Amount = CAST(ROUND(Amount * 100) AS INTEGER),
+            BalanceAfter = CAST(ROUND(BalanceAfter * 100) AS INTEGER)
+        """
+    ]),
+    (4, "Covering index for per-account ledger history and backfill from Transfers", [
+        """
+        CREATE INDEX IF NOT EXISTS IX_Transactions_Account_DateTime
+        ON Transactions (AccountNumber, TransactionDateTime, TransactionNumber,
+                         TransactionTypeCode, Amount, OtherAccountNumber, BalanceAfter)
+        """,
+        *LEDGER_BACKFILL_STATEMENTS
+    ]),
+    (5, "Daily per-account balance rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS DailyBalances (
+          AccountNumber    TEXT    NOT NULL,
+          Day              TEXT    NOT NULL,
+          OpeningBalance   INTEGER NOT NULL,
+          ClosingBalance   INTEGER NOT NULL,
+          DebitTotal       INTEGER NOT NULL,
+          CreditTotal      INTEGER NOT NULL,
+          TransactionCount INTEGER NOT NULL,
+          PRIMARY KEY (AccountNumber, Day),
+          FOREIGN KEY(AccountNumber) REFERENCES Accounts(AccountNumber)
+        ) WITHOUT ROWID
+        """,
+        *DAILY_BALANCES_REBUILD_STATEMENTS
+    ]),
+    (6, "Idempotency keys of transfers", [
+        """
+        CREATE TABLE IF NOT EXISTS IdempotencyKeys (
+          UserId             TEXT    NOT NULL,
+          IdempotencyKey     TEXT    NOT NULL,
+          FromAccountNumber  TEXT    NOT NULL,
+          ToAccountNumber    TEXT    NOT NULL,
+          Amount             INTEGER NOT NULL,
+          TransactionNumber  TEXT    NOT NULL,
+          FromAccountBalance INTEGER NOT NULL,
+          ToAccountBalance   INTEGER NOT NULL,
+          ExpiresAt          TEXT    NOT NULL,
+          PRIMARY KEY (UserId, IdempotencyKey),
+          FOREIGN KEY(UserId) REFERENCES UserCredentials(UserId)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS IX_IdempotencyKeys_ExpiresAt ON IdempotencyKeys (ExpiresAt)"
+    ]),
+    (7, "Drop the Transfers covering indexes, history is read from the Transactions ledger", [
+        "DROP INDEX IF EXISTS IX_Transfers_From_DateTime",
+        "DROP INDEX IF EXISTS IX_Transfers_To_DateTime"
+    ]),
+]
+"""Ordered ``(version, description, statements)`` entries.  Never edit a released entry, append a new one."""
+
+
+def schema_version(con: sqlite3.Connection) -> int:
+    """
+    Read the schema version stored in the database header.
+
+    :param con: An open connection.
+    :return: The current ``user_version``, 0 for a database that was never migrated.
+    """
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> int:
+    """
+    Apply every migration newer than the database's schema version.
+
+    Each migration runs in its own ``BEGIN IMMEDIATE`` transaction together with the
+    ``user_version`` bump, so an interrupted upgrade resumes at the failed step.  The
+    version is read again once the write lock is held, so when several processes migrate
+    the same database each migration is applied by exactly one of them.
+
+    :param con: An open connection in autocommit mode (``isolation_level=None``).
+    :return: The schema version after migrating.
+    """
+    current = schema_version(con)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            current = schema_version(con)
+            if version <= current:
+                # Another connection applied it while this one waited for the lock
+                con.execute("COMMIT")
+                continue
+            for statement in statements:
+                con.execute(statement)
+            con.execute(f"PRAGMA user_version={version}")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        print(f"Applied migration {version}: {description}")
+        current = version
+    return current
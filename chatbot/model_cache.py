@@ -0,0 +1,67 @@
+"""Model clients and system instructions reused across requests."""
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable
+
+from chatbot.config_client import SYSTEM_INSTRUCTIONS, MODEL_CACHE_SIZE, SYSTEM_INSTRUCTIONS_CACHE_SIZE
+
+
+class ModelCache:
+    """
+    Model clients keyed by their configuration, bounded by a least recently used size.
+
+    Building a client converts the whole tool declaration payload, so each configuration is
+    built once and the same client is handed back for every later request.  Clients are
+    stateless between calls, which makes sharing one across users and tasks safe.
+    """
+
+    def __init__(self, factory: Callable[..., Any], max_size: int = MODEL_CACHE_SIZE):
+        """
+        :param factory: Builds a client from the configuration passed to :meth:`get`.
+        :param max_size: Most configurations kept before the least recently used one is dropped.
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self._models: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, **config) -> Any:
+        """
+        Return the client for a configuration, building it on first use.
+
+        :param config: Keyword arguments for the factory, e.g. ``MODEL_CONFIG``.
+        :return: The cached client.
+        """
+        key = json.dumps(config, sort_keys=True, default=str)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+            model = self.factory(**config)
+            self._models[key] = model
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+            return model
+
+    def clear(self):
+        """Drop every client, e.g. after the API key or tool declarations change."""
+        with self._lock:
+            self._models.clear()
+
+
+@lru_cache(maxsize=SYSTEM_INSTRUCTIONS_CACHE_SIZE)
+def system_instructions(user_id: str) -> str:
+    """
+    Format ``SYSTEM_INSTRUCTIONS`` for a user, once per user while they stay in the cache.
+
+    :param user_id: The user the assistant is helping.
+    :return: The formatted instructions.
+    """
+    return SYSTEM_INSTRUCTIONS.format(user_id=user_id)
@@ -1,11 +1,18 @@
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
+from chatbot.money import from_cents, format_cents
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Account:
-    """Represent an account of a user""" 
+    """
+    Represent an account of a user
+
+    Instances are slotted and built positionally from ``(AccountNumber, AccountName, Balance)``
+    rows.  They are frozen because cached accounts are shared between callers, so a new
+    balance means a new instance (``dataclasses.replace``).
+    """
 
     account_number: str
     """The unique account number."""
@@ -13,13 +20,38 @@ class Account:
     account_name: str
     """Name of the account."""
 
-    balance: Decimal
-    """The current balance of the account."""
+    balance_cents: int
+    """The current balance of the account in cents."""
+    
+    @property
+    def balance(self) -> Decimal:
+        """The current balance of the account."""
+        return from_cents(self.balance_cents)
     
-    def __init__(self):
-        self.account_number = ""
-        self.account_name = ""
-        self.balance = Decimal("0")
+    def to_dict(self) -> dict:
+        """Serialize the account for a tool result, with the balance as a decimal string."""
+        return {
+            "account_number": self.account_number,
+            "account_name": self.account_name,
+            "balance": format_cents(self.balance_cents)
+        }
     
     def __str__(self):
-        return f"{self.account_name} ({self.account_number}): {self.balance}"
\ No newline at end of file
+        return f"{self.account_name} ({self.account_number}): {format_cents(self.balance_cents)}"
+
+
+@dataclass
+class TransferReceipt:
+    """Represent the outcome of a committed transfer"""
+
+    transaction_number: str
+    """The unique number recorded for the transfer."""
+
+    from_balance: Decimal
+    """Balance of the source account after the transfer."""
+
+    to_balance: Decimal
+    """Balance of the destination account after the transfer."""
+
+    replayed: bool = False
+    """True when an earlier transfer with the same idempotency key is returned instead of a new one."""
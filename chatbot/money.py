@@ -0,0 +1,52 @@
+"""Money codec between Decimal amounts and the integer cents stored in the database."""
+from decimal import Decimal, InvalidOperation
+
+CENTS_PER_UNIT = 100
+
+FLOAT_EXACT_LIMIT = 10 ** 15
+"""Magnitude in cents below which ``cents / 100`` formats exactly to two decimal places."""
+
+
+def to_cents(amount) -> int:
+    """
+    Convert an amount in currency units to integer cents.
+
+    :param amount: A Decimal, int, float or numeric string such as ``"12.50"``.
+    :return: The amount in cents.
+    :raises ValueError: If the amount is not a finite number or has fractions of a cent.
+    """
+    if isinstance(amount, int):
+        return amount * CENTS_PER_UNIT
+    try:
+        value = amount if isinstance(amount, Decimal) else Decimal(str(amount).strip())
+        cents = value.scaleb(2)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if not cents.is_finite() or cents != cents.to_integral_value():
+        raise ValueError(f"Amount must be a whole number of cents: {amount!r}")
+    return int(cents)
+
+
+def from_cents(cents: int) -> Decimal:
+    """
+    Convert integer cents to a Decimal amount with two decimal places.
+
+    :param cents: The amount in cents.
+    :return: The amount in currency units, e.g. ``Decimal("12.50")`` for 1250.
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents: int) -> str:
+    """
+    Render integer cents as a plain decimal string.
+
+    Below ``FLOAT_EXACT_LIMIT`` the float quotient is within half a cent of the true value,
+    so rounding it to two places is exact and much cheaper than building a Decimal.
+
+    :param cents: The amount in cents.
+    :return: The amount in currency units, e.g. ``"-12.50"`` for -1250.
+    """
+    if -FLOAT_EXACT_LIMIT < cents < FLOAT_EXACT_LIMIT:
+        return f"{cents / CENTS_PER_UNIT:.2f}"
+    return str(from_cents(cents))
@@ -0,0 +1,215 @@
+"""Pooled, reusable SQLite connections for the chatbot database layer."""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from chatbot.config import (
+    DB_FILE, DB_POOL_SIZE, DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE, DB_SYNCHRONOUS,
+    DB_READ_POOL_SIZE, DB_READ_CACHE_SIZE_KB
+)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of SQLite connections to a single database file.
+
+    Connections are opened lazily, tuned with PRAGMAs once when they are created and
+    returned to the pool after use, so their page cache and prepared statement cache
+    survive between calls.  Connections run in autocommit mode; callers that need a
+    transaction issue ``BEGIN`` themselves.
+
+    A ``read_only`` pool opens the file with ``mode=ro`` and ``query_only`` and a larger page
+    cache.  In WAL mode its readers work from a snapshot of the last commit and never take
+    a lock the writer waits for.
+
+    Threads that called :func:`pin_thread_connections` instead get a dedicated connection,
+    opened on first use outside the pool's size and reused for as long as the thread lives.
+    """
+
+    def __init__(self, db_file: str, size: int = DB_POOL_SIZE, read_only: bool = False):
+        """
+        :param db_file: Path of the SQLite database file.
+        :param size: Maximum number of connections the pool will open.
+        :param read_only: Open connections that can only read.
+        """
+        self.db_file = db_file
+        self.size = size
+        self.read_only = read_only
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pinned = threading.local()
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and tune a new connection."""
+        if self.read_only:
+            database = f"{Path(self.db_file).absolute().as_uri()}?mode=ro"
+        else:
+            database = self.db_file
+        con = sqlite3.connect(
+            database,
+            timeout=DB_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            uri=self.read_only
+        )
+        if self.read_only:
+            con.execute("PRAGMA query_only=ON")
+            con.execute(f"PRAGMA cache_size=-{DB_READ_CACHE_SIZE_KB}")
+        else:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+            con.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        con.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        con.execute("PRAGMA temp_store=MEMORY")
+        return con
+
+    def acquire(self, timeout: float = None) -> sqlite3.Connection:
+        """
+        Take a connection from the pool, opening a new one while the pool is below its size.
+
+        :param timeout: Seconds to wait for a connection when the pool is exhausted, None waits forever.
+        :return: A connection that must be handed back with :meth:`release`.
+        """
+        if getattr(_thread_state, "pin", False):
+            con = getattr(self._pinned, "con", None)
+            if con is None:
+                con = self._pinned.con = self._open()
+            return con
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        return self._idle.get(timeout=timeout)
+
+    def release(self, con: sqlite3.Connection):
+        """
+        Hand a connection back to the pool, rolling back anything the caller left open.
+
+        :param con: A connection previously returned by :meth:`acquire`.
+        """
+        pinned = con is getattr(self._pinned, "con", None)
+        try:
+            if con.in_transaction:
+                con.rollback()
+        except sqlite3.Error:
+            if pinned:
+                self._pinned.con = None
+                con.close()
+                return
+            # The connection is unusable, drop it so a fresh one can be opened
+            con.close()
+            with self._lock:
+                self._created -= 1
+            return
+        if not pinned:
+            self._idle.put_nowait(con)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block."""
+        con = self.acquire()
+        try:
+            yield con
+        finally:
+            self.release(con)
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Borrow a connection inside a read transaction, so every query in the ``with`` block
+        sees the database as of the same commit.
+        """
+        with self.connection() as con:
+            con.execute("BEGIN")
+            try:
+                yield con
+            finally:
+                if con.in_transaction:
+                    con.execute("COMMIT")
+
+    def close(self):
+        """Close every idle connection held by the pool."""
+        while True:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            con.close()
+            with self._lock:
+                self._created -= 1
+
+
+_thread_state = threading.local()
+
+
+def pin_thread_connections():
+    """
+    Give the calling thread a dedicated connection to every database it uses from now on.
+
+    Meant for long-lived worker threads, e.g. as an executor ``initializer``, so their
+    queries never wait on the shared pool.
+    """
+    _thread_state.pin = True
+
+
+_pools: dict[tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file: str = None) -> ConnectionPool:
+    """
+    Get the shared pool for a database file, creating it on first use.
+
+    :param db_file: Path of the database file, defaults to ``DB_FILE``.
+    :return: The pool for that file.
+    """
+    return _get_pool(db_file, False)
+
+
+def get_read_pool(db_file: str = None) -> ConnectionPool:
+    """
+    Get the shared read-only pool for a database file, creating it on first use.
+
+    :param db_file: Path of the database file, defaults to ``DB_FILE``.
+    :return: The read-only pool for that file.
+    """
+    return _get_pool(db_file, True)
+
+
+def _get_pool(db_file: str, read_only: bool) -> ConnectionPool:
+    key = (os.path.abspath(db_file or DB_FILE), read_only)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key[0], DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE, read_only)
+                _pools[key] = pool
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool, e.g. before replacing a database file."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
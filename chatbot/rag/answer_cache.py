@@ -0,0 +1,247 @@
+"""Cache of RAG answers for repeated and near-duplicate questions."""
+import math
+import operator
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+
+from chatbot.config import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MIN_TERM_OVERLAP
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CONTRACTIONS = {
+    "whats": "what is", "what's": "what is", "hows": "how is", "how's": "how is",
+    "wheres": "where is", "where's": "where is", "whos": "who is", "who's": "who is",
+    "its": "it is", "it's": "it is", "dont": "do not", "don't": "do not", "doesnt": "does not",
+    "doesn't": "does not", "cant": "cannot", "can't": "cannot", "im": "i am", "i'm": "i am"
+}
+FILLER_WORDS = {"please", "hi", "hello", "hey", "um", "thanks"}
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "do", "does", "did", "i", "me", "my", "you", "your",
+    "we", "our", "it", "to", "of", "in", "on", "for", "at", "by", "with", "and", "or", "what", "how",
+    "which", "can", "could", "would", "should", "will", "there", "this", "that", "tell", "about",
+    "explain", "am", "any", "some", "from", "into", "if", "know", "like", "work", "works"
+}
+STEM_LENGTH = 6
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical text of a question: lower case, contractions expanded, punctuation and filler dropped.
+
+    :param question: The question as asked.
+    :return: The normalized question, e.g. ``"what is a tfsa"`` for ``"Whats a TFSA?"``.
+    """
+    words = []
+    for word in re.findall(r"[a-z0-9']+", question.lower().replace("’", "'")):
+        word = CONTRACTIONS.get(word, word.strip("'"))
+        if word and word not in FILLER_WORDS:
+            words.append(word)
+    return " ".join(words)
+
+
+def content_terms(normalized: str) -> frozenset:
+    """
+    The content words of a normalized question, crudely stemmed.
+
+    Words are cut to their first few letters, so "contribute" and "contribution" or
+    "withdraw" and "withdrawals" match while "tfsa" and "rrsp" do not.
+
+    :param normalized: A question from :func:`normalize_question`.
+    :return: The stems of its words other than stop words.
+    """
+    return frozenset(word[:STEM_LENGTH] for word in normalized.split() if word not in STOP_WORDS)
+
+
+def _unit(vector: Sequence[float]):
+    """Scale a vector to length 1, so a dot product is the cosine similarity."""
+    if numpy is not None:
+        array = numpy.asarray(vector, dtype=numpy.float32)
+        norm = float(numpy.linalg.norm(array))
+        return array / norm if norm else array
+    norm = math.sqrt(sum(value * value for value in vector))
+    return tuple(value / norm for value in vector) if norm else tuple(vector)
+
+
+def _dot(a, b) -> float:
+    if numpy is not None:
+        return float(numpy.dot(a, b))
+    return sum(map(operator.mul, a, b))
+
+
+class _Entry:
+    """One cached answer."""
+
+    __slots__ = ("answer", "vector", "terms", "expires_at")
+
+    def __init__(self, answer: dict, vector, terms: frozenset, expires_at: float):
+        self.answer = answer
+        self.vector = vector
+        self.terms = terms
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    Answers keyed by normalized question, with a second tier matching on embedding similarity.
+
+    A lookup first tries the normalized text, then, if an embedding function is given, the
+    cached question whose embedding is closest, accepted when the cosine similarity reaches
+    ``similarity`` and the two questions share at least ``min_term_overlap`` of their
+    content words (embeddings alone rate "what is a TFSA" and "what is an RRSP" as close,
+    so by default every content word must match and only phrasing may differ).
+    Entries are bounded by a least recently used size and a time to live, and everything
+    is dropped when the vector store version changes.
+    """
+
+    def __init__(self, embed: Optional[Callable[[str], Sequence[float]]] = None,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL,
+                 similarity: float = ANSWER_CACHE_SIMILARITY,
+                 min_term_overlap: float = ANSWER_CACHE_MIN_TERM_OVERLAP,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param embed: Embeds a question, e.g. the vector store's ``embed_query``; None disables the second tier.
+        :param max_entries: Most answers kept before the least recently used one is evicted.
+        :param ttl: Seconds an answer stays valid.
+        :param similarity: Least cosine similarity for a second-tier match.
+        :param min_term_overlap: Least share (Jaccard) of content words for a second-tier match.
+        :param clock: Returns the current time in seconds.
+        """
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.min_term_overlap = min_term_overlap
+        self.clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # Embeddings of recent misses, so storing their answer does not embed them again
+        self._pending: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = None
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def sync_version(self, version) -> bool:
+        """
+        Drop every answer if the vector store changed since the last call.
+
+        :param version: Anything that changes when the store is rebuilt, e.g. its file's mtime.
+        :return: True if the cache was cleared.
+        """
+        with self._lock:
+            if version == self.version:
+                return False
+            changed = self.version is not None
+            self.version = version
+            if changed:
+                self._entries.clear()
+                self._pending.clear()
+                self.invalidations += 1
+            return changed
+
+    def _embed(self, normalized: str):
+        try:
+            return _unit(self.embed(normalized))
+        except Exception as e:
+            print(f"[ERROR] Could not embed the question for the answer cache: {e}")
+            return None
+
+    def get(self, question: str) -> Optional[dict]:
+        """
+        Look up the answer to a question, or to a near-identical one.
+
+        :param question: The question as asked.
+        :return: The cached answer, or None.
+        """
+        normalized = normalize_question(question)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(normalized)
+                self.exact_hits += 1
+                return entry.answer
+            if entry is not None:
+                del self._entries[normalized]
+            if self.embed is None or not self._entries:
+                self.misses += 1
+                return None
+
+        vector = self._embed(normalized)
+        terms = content_terms(normalized)
+        with self._lock:
+            if vector is not None:
+                self._pending[normalized] = vector
+                while len(self._pending) > 256:
+                    self._pending.popitem(last=False)
+                best, best_score = None, self.similarity
+                for key, candidate in self._entries.items():
+                    if candidate.vector is None or candidate.expires_at <= now:
+                        continue
+                    union = len(terms | candidate.terms)
+                    if union and len(terms & candidate.terms) / union < self.min_term_overlap:
+                        continue
+                    score = _dot(vector, candidate.vector)
+                    if score >= best_score:
+                        best, best_score = key, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.similar_hits += 1
+                    return self._entries[best].answer
+            self.misses += 1
+            return None
+
+    def put(self, question: str, answer: dict):
+        """
+        Store the answer to a question.
+
+        :param question: The question as asked.
+        :param answer: The answer to return on later hits.
+        """
+        normalized = normalize_question(question)
+        with self._lock:
+            vector = self._pending.pop(normalized, None)
+        if vector is None and self.embed is not None:
+            vector = self._embed(normalized)
+        with self._lock:
+            self._entries[normalized] = _Entry(answer, vector, content_terms(normalized), self.clock() + self.ttl)
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every answer."""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """
+        Report the cache counters.
+
+        :return: Entries, hits per tier, misses, hit rate, evictions and invalidations.
+        """
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
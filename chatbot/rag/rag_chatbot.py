@@ -9,9 +9,11 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 try:
     from chatbot.rag.vector_store import load_vector_store, create_vector_store
     from chatbot.rag.document_loader import load_documents, split_documents
+    from chatbot.rag.answer_cache import AnswerCache
 except ImportError:
     from vector_store import load_vector_store, create_vector_store
     from document_loader import load_documents, split_documents
+    from answer_cache import AnswerCache
 
 load_dotenv()
 
@@ -41,6 +43,11 @@ class RBCChatbot:
         # Initialize the vector store
         self._ensure_vector_store_exists(persist_directory)
         self.vector_store = load_vector_store(persist_directory)
+        self.persist_directory = persist_directory
+        
+        # Answers reused for repeated questions, the second tier compares query embeddings
+        self.answer_cache = AnswerCache(embed=self.vector_store.embeddings.embed_query)
+        self.answer_cache.sync_version(self._vector_store_version())
         
         # Initialize the LLM with explicit API key
         api_key = os.getenv("GEMINI_API_KEY")
@@ -84,8 +91,20 @@ class RBCChatbot:
                 # Create an empty vector store
                 create_vector_store([], persist_directory)
     
+    def _vector_store_version(self):
+        """Modification time of the persisted store, which changes whenever it is rebuilt"""
+        path = os.path.join(self.persist_directory, "chroma.sqlite3")
+        try:
+            return os.stat(path if os.path.exists(path) else self.persist_directory).st_mtime_ns
+        except OSError:
+            return None
+    
     def answer_question(self, question):
-        """Answer a question using RAG"""
+        """Answer a question using RAG, reusing the answer to the same or a near-identical question"""
+        self.answer_cache.sync_version(self._vector_store_version())
+        cached = self.answer_cache.get(question)
+        if cached is not None:
+            return dict(cached)
         try:
             # Enhance the system prompt to emphasize banking-only responses
             enhanced_prompt = f"""
@@ -117,10 +136,12 @@ class RBCChatbot:
                 sources = []
             
             # Return the answer and unique sources
-            return {
+            response = {
                 "answer": answer,
                 "sources": list(set(sources))
             }
+            self.answer_cache.put(question, response)
+            return dict(response)
         except Exception as e:
             return {
                 "answer": f"I encountered an error: {str(e)}",
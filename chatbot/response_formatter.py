@@ -93,34 +93,39 @@ class ResponseFormatter:
     def format_get_transaction_history(result: Any) -> str:
         """Format transaction history."""
         try:
-            # Handle both list and single transaction object formats
+            # Handle paged, list and single transaction object formats
             transactions = []
+            next_cursor = None
+            
+            if isinstance(result, str):
+                # Try to parse JSON string
+                try:
+                    result = json.loads(result)
+                except:
+                    pass
             
             if isinstance(result, list):
                 transactions = result
+            elif isinstance(result, dict) and "transactions" in result:
+                # A page from the paginated history tool
+                transactions = result["transactions"] or []
+                next_cursor = result.get("next_cursor")
             elif isinstance(result, dict):
+                if "error" in result:
+                    return ResponseFormatter.format_generic(result)
                 # Single transaction as a dict
                 transactions = [result]
-            elif isinstance(result, str):
-                # Try to parse JSON string
-                try:
-                    json_data = json.loads(result)
-                    if isinstance(json_data, list):
-                        transactions = json_data
-                    elif isinstance(json_data, dict):
-                        transactions = [json_data]
-                except:
-                    pass
             
             if transactions and len(transactions) > 0:
                 lines = ["Here are the recent transactions for your account:"]
-                for i, transaction in enumerate(transactions[:5]):  # Show only first 5 transactions
+                for transaction in transactions:
                     date = transaction.get('date', 'Unknown date')
                     desc = transaction.get('description', 'Transaction')
                     amount = transaction.get('amount', '0.00')
                     lines.append(f"- {date}: {desc}: ${amount}")
-                if len(transactions) > 5:
-                    lines.append(f"...and {len(transactions) - 5} more transactions.")
+                if next_cursor:
+                    # The reply is all the conversation keeps, so it carries the cursor for "show more"
+                    lines.append(f"There are more transactions, just ask to see more (cursor: {next_cursor}).")
                 return "\n".join(lines)
             else:
                 return "I couldn't find any transactions for this account."
@@ -128,6 +133,28 @@ class ResponseFormatter:
             print(f"Error formatting transaction history: {e}")
             return "I found your transaction history but couldn't format it properly."
     
+    @staticmethod
+    def format_get_period_summary(result: Any) -> str:
+        """Format a period summary."""
+        try:
+            if isinstance(result, str):
+                try:
+                    result = json.loads(result)
+                except:
+                    pass
+            
+            if isinstance(result, dict) and "opening_balance" in result:
+                return (f"From {result.get('start_date')} to {result.get('end_date')}, account "
+                        f"{result.get('account_number', '')} went from ${result.get('opening_balance')} "
+                        f"to ${result.get('closing_balance')}.\n"
+                        f"- Money out: ${result.get('total_debits')}\n"
+                        f"- Money in: ${result.get('total_credits')}\n"
+                        f"- Transactions: {result.get('transaction_count', 0)}")
+            return ResponseFormatter.format_generic(result)
+        except Exception as e:
+            print(f"Error formatting period summary: {e}")
+            return "I found your account summary but couldn't format it properly."
+    
     @staticmethod
     def format_answer_banking_question(result: Any) -> str:
         """Format RAG answer."""
@@ -0,0 +1,136 @@
+"""Per-user chat sessions for the web app."""
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from chatbot.config import SESSION_MAX_USERS, SESSION_IDLE_TTL
+
+
+class ChatSession:
+    """The assistant of one signed-in user."""
+
+    __slots__ = ("user_id", "assistant", "lock", "created_at", "last_used", "messages")
+
+    def __init__(self, user_id: str, assistant: Any):
+        self.user_id = user_id
+        self.assistant = assistant
+        # One message at a time per user, so replies and history stay in order
+        self.lock = asyncio.Lock()
+        self.created_at = self.last_used = time.monotonic()
+        self.messages = 0
+
+
+class SessionManager:
+    """
+    Chat sessions keyed by user, bounded by an idle time to live and a least recently used size.
+
+    Sessions are ordered by last use, so idle ones are swept from the front whenever a
+    session is looked up.  Messages of one user run one at a time on their session's lock,
+    messages of different users run concurrently on the caller's event loop.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_users: int = SESSION_MAX_USERS,
+                 idle_ttl: float = SESSION_IDLE_TTL):
+        """
+        :param factory: Builds the assistant of a new session from the user id.
+        :param max_users: Most sessions kept before the least recently used one is evicted.
+        :param idle_ttl: Seconds without a message before a session is evicted.
+        """
+        self.factory = factory
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def _evict_idle(self, now: float):
+        """Drop sessions idle for longer than the time to live, must hold the lock."""
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_idle += 1
+
+    def get(self, user_id: str) -> ChatSession:
+        """
+        Return the session of a user, creating it on first use.
+
+        :param user_id: The signed-in user, e.g. the JWT subject.
+        :return: The session, marked as just used.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = ChatSession(user_id, self.factory(user_id))
+                self._sessions[user_id] = session
+                self.created += 1
+                while len(self._sessions) > self.max_users:
+                    self._sessions.popitem(last=False)
+                    self.evicted_lru += 1
+            else:
+                self._sessions.move_to_end(user_id)
+            session.last_used = now
+            return session
+
+    async def send_message(self, user_id: str, message: str):
+        """
+        Send a message to a user's assistant.
+
+        :param user_id: The signed-in user.
+        :param message: The message text.
+        :return: The assistant's reply.
+        """
+        session = self.get(user_id)
+        async with session.lock:
+            session.messages += 1
+            reply = await session.assistant.send_message(message)
+            session.last_used = time.monotonic()
+            return reply
+
+    def evict_idle(self) -> int:
+        """
+        Drop idle sessions now instead of on the next lookup.
+
+        :return: How many sessions were dropped.
+        """
+        with self._lock:
+            before = self.evicted_idle
+            self._evict_idle(time.monotonic())
+            return self.evicted_idle - before
+
+    def memory_report(self) -> dict:
+        """
+        Count the sessions and estimate the memory their conversation histories and summaries hold.
+
+        :return: Session and message counts, history bytes, the largest history and eviction counters.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        messages = history_bytes = largest = 0
+        for session in sessions:
+            history = list(session.assistant.conversation_history)
+            size = sys.getsizeof(history) + sum(
+                sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+                for entry in history
+            )
+            size += sys.getsizeof(getattr(session.assistant.conversation_history, "summary", ""))
+            messages += len(history)
+            history_bytes += size
+            largest = max(largest, size)
+        return {
+            "sessions": len(sessions),
+            "messages": messages,
+            "history_bytes": history_bytes,
+            "largest_history_bytes": largest,
+            "created": self.created,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+        }
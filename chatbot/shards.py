@@ -0,0 +1,185 @@
+"""Route users to one of several database files and move users between them.
+
+Every shard holds the same schema and the whole of each user's data, so any request for
+one user is served by one file and the writers of different shards never wait on each
+other.  Users are placed with jump consistent hashing: growing from N to N + 1 shards
+moves only about 1 / (N + 1) of them.
+"""
+import hashlib
+import os
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from chatbot.config import DB_FILE, DB_SHARDS, DB_SHARD_FILE, DB_BUSY_TIMEOUT
+
+USER_TABLES = [
+    ("UserCredentials", "UserId IN (SELECT UserId FROM temp.MovingUsers)"),
+    ("Accounts", "UserId IN (SELECT UserId FROM temp.MovingUsers)"),
+    ("Transfers", "FromAccountNumber IN (SELECT AccountNumber FROM temp.MovingAccounts)"),
+    ("Transactions", "AccountNumber IN (SELECT AccountNumber FROM temp.MovingAccounts)"),
+    ("DailyBalances", "AccountNumber IN (SELECT AccountNumber FROM temp.MovingAccounts)"),
+    ("IdempotencyKeys", "UserId IN (SELECT UserId FROM temp.MovingUsers)"),
+]
+"""Tables holding per-user rows, parents first, with the condition selecting the moving users' rows."""
+
+
+def _jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash of a 64-bit key into ``buckets`` buckets (Lamping and Veach)."""
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+@lru_cache(maxsize=65536)
+def shard_for_user(user_id: str, shards: int = DB_SHARDS) -> int:
+    """
+    Find the shard that holds a user.
+
+    :param user_id: The user ID.
+    :param shards: The number of shards.
+    :return: The shard index, from 0 to ``shards - 1``.
+    """
+    key = int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "big")
+    return _jump_hash(key, shards)
+
+
+def shard_file(shard: int) -> str:
+    """
+    Get the database file of a shard.
+
+    :param shard: The shard index.
+    :return: ``DB_FILE`` for shard 0, ``DB_SHARD_FILE`` filled in with the index otherwise.
+    """
+    return DB_FILE if shard == 0 else DB_SHARD_FILE.format(shard=shard)
+
+
+def shard_files(shards: int = DB_SHARDS) -> list[str]:
+    """
+    List the database files of every shard.
+
+    :param shards: The number of shards.
+    :return: One path per shard, in shard order.
+    """
+    return [shard_file(shard) for shard in range(shards)]
+
+
+def db_file_for_user(user_id: str) -> str:
+    """
+    Get the database file that holds a user's data.
+
+    :param user_id: The user ID, None for the first shard.
+    :return: The path of the user's shard.
+    """
+    if DB_SHARDS == 1 or user_id is None:
+        return DB_FILE
+    return shard_file(shard_for_user(user_id))
+
+
+def _select_moving_users(con: sqlite3.Connection, keep_shard: bool, shard: int, shards: int) -> int:
+    """Fill the temp tables with the users of ``con`` that are (or are not) on ``shard``."""
+    con.create_function("shard_of", 1, lambda user_id: shard_for_user(user_id, shards), deterministic=True)
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS MovingUsers (UserId TEXT PRIMARY KEY)")
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS MovingAccounts (AccountNumber TEXT PRIMARY KEY)")
+    con.execute("DELETE FROM temp.MovingUsers")
+    con.execute("DELETE FROM temp.MovingAccounts")
+    con.execute(
+        f"""
+        INSERT INTO temp.MovingUsers
+        SELECT UserId FROM (SELECT UserId FROM main.UserCredentials UNION SELECT UserId FROM main.Accounts)
+        WHERE (shard_of(UserId) = :shard) = :keep_shard
+        """,
+        {"shard": shard, "keep_shard": keep_shard}
+    )
+    con.execute(
+        """
+        INSERT INTO temp.MovingAccounts
+        SELECT AccountNumber FROM main.Accounts WHERE UserId IN (SELECT UserId FROM temp.MovingUsers)
+        """
+    )
+    return con.execute("SELECT COUNT(*) FROM temp.MovingUsers").fetchone()[0]
+
+
+def _delete_moving_users(con: sqlite3.Connection, schema: str):
+    """Delete the rows of the users in the temp tables from one attached schema."""
+    for table, condition in reversed(USER_TABLES):
+        con.execute(f"DELETE FROM {schema}.{table} WHERE {condition}")
+
+
+def prune_foreign_users(con: sqlite3.Connection, shard: int, shards: int = DB_SHARDS) -> int:
+    """
+    Delete every user that does not belong on a shard, e.g. seed users copied into a new shard.
+
+    :param con: An autocommit connection to the shard's file.
+    :param shard: The shard index of that file.
+    :param shards: The number of shards.
+    :return: The number of users deleted.
+    """
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        pruned = _select_moving_users(con, False, shard, shards)
+        _delete_moving_users(con, "main")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return pruned
+
+
+def _move_users(con: sqlite3.Connection, shard: int, shards: int) -> int:
+    """Move the users of the main database that belong on ``shard`` into the attached ``target``."""
+    # Copy first and delete in a second transaction: a crash in between leaves a copy
+    # behind, never a loss, and rerunning copies again from the still authoritative source
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        moved = _select_moving_users(con, True, shard, shards)
+        _delete_moving_users(con, "target")
+        for table, condition in USER_TABLES:
+            con.execute(f"INSERT INTO target.{table} SELECT * FROM main.{table} WHERE {condition}")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    if moved:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            _delete_moving_users(con, "main")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+    return moved
+
+
+def rebalance_shards(source_files: list[str], shards: int = DB_SHARDS) -> dict[str, int]:
+    """
+    Move every user in the source files to the shard that holds them under ``shards`` shards.
+
+    Used to split or merge shards: list the files of the old layout as sources after the
+    new layout's files were created.  Run it while the server is stopped, transfers made
+    during the move may be lost.
+
+    :param source_files: Database files that may hold users in the wrong place.
+    :param shards: The number of shards in the new layout.
+    :return: How many users were moved into each target file.
+    """
+    targets = shard_files(shards)
+    moved = {target: 0 for target in targets}
+    for source in source_files:
+        if not Path(source).exists():
+            continue
+        con = sqlite3.connect(source, timeout=DB_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            for shard, target in enumerate(targets):
+                if os.path.abspath(target) == os.path.abspath(source):
+                    continue
+                con.execute("ATTACH DATABASE ? AS target", (target,))
+                try:
+                    moved[target] += _move_users(con, shard, shards)
+                finally:
+                    con.execute("DETACH DATABASE target")
+        finally:
+            con.close()
+    return moved
@@ -0,0 +1,55 @@
+"""Runs the tool calls of one model response, read-only ones concurrently."""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from chatbot.config_client import READ_ONLY_TOOLS, MAX_CONCURRENT_TOOL_CALLS
+
+
+def is_read_only(function_name: str) -> bool:
+    """
+    Whether a tool only reads, unknown tools are treated as mutating.
+
+    :param function_name: The tool name.
+    :return: True if the tool is in ``READ_ONLY_TOOLS``.
+    """
+    return function_name in READ_ONLY_TOOLS
+
+
+async def dispatch_tool_calls(calls: list[tuple[str, dict]],
+                              execute: Callable[[str, dict], Awaitable[Any]],
+                              max_concurrent: int = MAX_CONCURRENT_TOOL_CALLS) -> list:
+    """
+    Run tool calls, consecutive read-only calls together and mutating calls one at a time.
+
+    Mutating calls split the list into runs: each run of read-only calls is gathered
+    after the previous mutating call finished and before the next one starts, so reads
+    see every write the model asked for before them and writes keep their order.
+
+    :param calls: ``(function_name, args)`` pairs in the order the model made them.
+    :param execute: Runs one call and returns its result.
+    :param max_concurrent: Most calls in flight at once.
+    :return: The results in the order of ``calls``, an exception in place of a failed call.
+    """
+    results = [None] * len(calls)
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def run(index):
+        function_name, args = calls[index]
+        try:
+            async with semaphore:
+                results[index] = await execute(function_name, args)
+        except Exception as e:
+            results[index] = e
+
+    reads = []
+    for index, (function_name, _) in enumerate(calls):
+        if is_read_only(function_name):
+            reads.append(index)
+            continue
+        if reads:
+            await asyncio.gather(*(run(i) for i in reads))
+            reads = []
+        await run(index)
+    if reads:
+        await asyncio.gather(*(run(i) for i in reads))
+    return results
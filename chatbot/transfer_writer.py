@@ -0,0 +1,191 @@
+"""Group-commit writer that batches concurrent transfers into shared transactions."""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from decimal import Decimal
+from chatbot.config import DB_FILE, TRANSFER_BATCH_WINDOW_MS, TRANSFER_BATCH_MAX
+from chatbot.database import apply_transfer, begin_immediate
+from chatbot.pool import get_pool
+
+
+class _TransferRequest:
+    """A queued transfer and the future its caller is waiting on."""
+
+    __slots__ = ("user_id", "from_account", "to_account", "amount", "idempotency_key", "future")
+
+    def __init__(self, user_id: str, from_account: str, to_account: str, amount: Decimal,
+                 idempotency_key: str = None):
+        self.user_id = user_id
+        self.from_account = from_account
+        self.to_account = to_account
+        self.amount = amount
+        self.idempotency_key = idempotency_key
+        self.future = Future()
+
+
+class TransferWriter:
+    """
+    Serialize transfers for one database file through a single writer thread.
+
+    Requests are taken from a FIFO queue and every request that queued up while the previous
+    batch was committing joins the next one, up to ``max_batch`` requests or ``window_ms``
+    spent taking them off the queue.  The writer never waits for more requests to arrive,
+    so a lone request is not held back waiting for company.  Every transfer in a batch runs
+    under its own ``SAVEPOINT`` so a failing transfer is rolled back alone, and the whole
+    batch is made durable by one ``COMMIT``.
+    Because one thread applies requests in arrival order, transfers touching the same
+    account are applied in the order they were submitted.
+    """
+
+    def __init__(self, db_file: str = None,
+                 window_ms: float = TRANSFER_BATCH_WINDOW_MS,
+                 max_batch: int = TRANSFER_BATCH_MAX):
+        """
+        :param db_file: Path of the database file, defaults to ``DB_FILE``.
+        :param window_ms: Longest time spent taking already queued requests into one batch, in milliseconds.
+        :param max_batch: Most transfers committed together.
+        """
+        self.db_file = db_file or DB_FILE
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.transfers = 0
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        # Taken by submit and close, so nothing is queued behind the stop marker
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="transfer-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: str, from_account: str, to_account: str, amount: Decimal,
+               idempotency_key: str = None) -> Future:
+        """
+        Queue a transfer without waiting for it.
+
+        :param user_id: The user ID of the account owner.
+        :param from_account: The account number that the fund will be transferred from.
+        :param to_account: The account number that the fund will be transferred to.
+        :param amount: The amount to transfer.
+        :param idempotency_key: Client-chosen key that makes retries safe, see :func:`chatbot.database.apply_transfer`.
+        :return: A future that resolves to the transfer's receipt once the batch holding it has
+                 committed, or raises the error that made this transfer fail.
+        :raises RuntimeError: When the writer is closing or closed.
+        """
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))
+        request = _TransferRequest(user_id, from_account, to_account, amount, idempotency_key)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Transfer writer is closed")
+            self._queue.put(request)
+        return request.future
+
+    def transfer(self, user_id: str, from_account: str, to_account: str, amount: Decimal,
+                 idempotency_key: str = None):
+        """Queue a transfer and block until it is committed, see :meth:`submit`."""
+        return self.submit(user_id, from_account, to_account, amount, idempotency_key).result()
+
+    def close(self):
+        """Stop accepting transfers and wait for the queued ones to commit."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _TransferRequest) -> tuple[list[_TransferRequest], bool]:
+        """Gather the batch that starts with ``first``, reporting whether a stop was requested."""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch and time.monotonic() < deadline:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        pool = get_pool(self.db_file)
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch, stopping = self._collect(request)
+            try:
+                with pool.connection() as con:
+                    self._commit(con, batch)
+            except Exception as e:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+        # Nothing is queued after the stop marker, but never leave a caller waiting forever
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and not request.future.done():
+                request.future.set_exception(RuntimeError("Transfer writer is closed"))
+
+    def _commit(self, con, batch: list[_TransferRequest]):
+        """Apply a batch in one transaction and resolve each caller's future."""
+        outcomes = []
+        cur = con.cursor()
+        try:
+            begin_immediate(con)
+            for request in batch:
+                cur.execute("SAVEPOINT transfer")
+                try:
+                    receipt = apply_transfer(cur, request.user_id, request.from_account,
+                                             request.to_account, request.amount, request.idempotency_key)
+                    cur.execute("RELEASE transfer")
+                    outcomes.append((receipt, None))
+                except Exception as e:
+                    cur.execute("ROLLBACK TO transfer")
+                    cur.execute("RELEASE transfer")
+                    outcomes.append((None, e))
+            con.execute("COMMIT")
+        except Exception as e:
+            if con.in_transaction:
+                con.rollback()
+            print(f"[ERROR] Database error during transfer batch: {str(e)}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.transfers += len(batch)
+        for request, (receipt, error) in zip(batch, outcomes):
+            if error is None:
+                request.future.set_result(receipt)
+            else:
+                print(f"[ERROR] Database error during transfer: {str(error)}")
+                request.future.set_exception(error)
+
+
+_writers: dict[str, TransferWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_transfer_writer(db_file: str = None) -> TransferWriter:
+    """
+    Get the shared writer for a database file, starting it on first use.
+
+    :param db_file: Path of the database file, defaults to ``DB_FILE``.
+    :return: The writer for that file.
+    """
+    path = os.path.abspath(db_file or DB_FILE)
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = TransferWriter(path)
+                _writers[path] = writer
+    return writer